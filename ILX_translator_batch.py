@@ -0,0 +1,222 @@
+"""
+Headless batch translator.
+
+Translates every notification template of an Intelex Application Translation export in a single run,
+without the GUI. It uses the same extraction and replacement logic as the Translation and HTML replacer tab.
+
+Translated templates (created through "Export Translation Template") are expected in one folder,
+named <RecordID>_<Locale>.xlsx, e.g. 3f2b8c1e-0a4d-4e3b-9a59-1c2d3e4f5a6b_fr-FR.xlsx
+Multi-locale templates (English and one column per locale) are named <RecordID>.xlsx
+
+Templates are generated in parallel over a process pool, the output order does not depend on the pool.
+
+Usage:
+    python ILX_translator_batch.py <application_translation_export.xlsx> <template_folder> <output.xlsx>
+                                   [--workers N] [--chunksize N] [--cache-dir [FOLDER]]
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from ILX_translator_engine import get_structure, generate_html
+from ILX_translator_cache import configure_disk_cache, DEFAULT_CACHE_FOLDER
+from ILX_translator_extract import field_names
+from ILX_translator_profiling import profiler
+from ILX_translator_excel import read_translation_template, read_locale_template, parse_template_filename
+from ILX_translator_export import RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, TRANSLATED_COLUMN, is_html
+import argparse
+import math
+import os
+import sys
+import time
+
+TranslationJob = namedtuple("TranslationJob", ["record_id", "locale", "english_html", "translation_dict"])
+TranslationResult = namedtuple("TranslationResult", ["record_id", "locale", "translated_html", "missing_lines"])
+
+
+def read_application_translation_export(filename):
+    """
+    :param filename: Intelex Application Translation export (Excel)
+    :return: DataFrame with one row per RecordID/Locale/field
+    """
+    import pandas as pd  # Imported on first use, see ILX_translator_excel
+    with profiler.stage("read export"):
+        df = pd.read_excel(filename, dtype=str)
+    profiler.count("export bytes read", os.path.getsize(filename))
+    missing_columns = [column for column in (RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, TRANSLATED_COLUMN)
+                       if column not in df.columns]
+    if missing_columns:
+        raise ValueError(f"{filename} is not an Application Translation export, "
+                         f"missing column(s): {', '.join(missing_columns)}")
+    return df
+
+
+def english_html_by_record_id(export_df):
+    """
+    :param export_df: Application Translation export
+    :return: Dictionary { RecordID : English html of the notification body }
+    """
+    english_html = {}
+    for record_id, value in zip(export_df[RECORD_ID_COLUMN], export_df[ENGLISH_COLUMN]):
+        if is_html(value) and record_id not in english_html:
+            english_html[record_id] = value
+    return english_html
+
+
+def collect_jobs(export_df, template_folder):
+    """
+    Matches the translated templates in template_folder with the English html in the export by RecordID
+    :param export_df: Application Translation export
+    :param template_folder: Folder with <RecordID>_<Locale>.xlsx translation templates,
+                            and <RecordID>.xlsx multi-locale templates
+    :return: List of TranslationJob, sorted by RecordID and Locale, and a list of skipped template files
+    """
+    english_html = english_html_by_record_id(export_df)
+    jobs = []
+    skipped = []
+    for filename in sorted(os.listdir(template_folder)):
+        path = os.path.join(template_folder, filename)
+        stem, extension = os.path.splitext(filename)
+        parsed = parse_template_filename(filename)
+        if parsed is not None and parsed[0] in english_html:
+            record_id, locale = parsed
+            translation_dicts = {locale: read_translation_template(path)}
+        elif stem in english_html and extension.lower() in (".xlsx", ".xls"):
+            record_id = stem
+            translation_dicts = read_locale_template(path)  # Empty for a template without locale columns
+        else:
+            translation_dicts = {}
+        if not translation_dicts:
+            skipped.append(filename)
+            continue
+        for locale, translation_dict in translation_dicts.items():
+            jobs.append(TranslationJob(record_id, locale, english_html[record_id], translation_dict))
+    jobs.sort(key=lambda job: (job.record_id, job.locale))
+    return jobs, skipped
+
+
+def run_job(job):
+    """
+    Same as pasting the English html, importing the translated template and pressing "Generate HTML"
+    Lines of the English html which are not in the template are replaced by their ILX fields,
+    which is the default value in the Translation tab.
+    :param job: TranslationJob
+    :return: TranslationResult
+    """
+    structure = get_structure(job.english_html)
+    translation_dict = {}
+    missing_lines = []
+    # One translation per phrase, repeated lines and other spellings (case, spaces) of a line share it
+    for line, translation in zip(structure.unique_lines(), structure.phrases.translations(job.translation_dict)):
+        if translation is None:
+            translation = field_names(line)
+            missing_lines.append(line)
+        translation_dict[line] = translation
+    # Template lines which are not in the extracted lines (e.g. edited English html) are still replaced
+    for line, translation in job.translation_dict.items():
+        translation_dict.setdefault(line, translation)
+
+    translated_html = generate_html(job.english_html, translation_dict)
+    return TranslationResult(job.record_id, job.locale, translated_html, missing_lines)
+
+
+def default_chunksize(job_count, workers):
+    """
+    Around 4 chunks per worker: large enough to keep pickling overhead low, small enough to balance the load
+    :param job_count: Number of TranslationJobs
+    :param workers: Number of worker processes
+    :return: Number of TranslationJobs sent to a worker at once
+    """
+    return max(1, math.ceil(job_count / (workers * 4)))
+
+
+def generate_all(jobs, workers=None, chunksize=None, cache_folder=None):
+    """
+    Runs run_job for every job, fanned out over a ProcessPoolExecutor
+    :param jobs: List of TranslationJob
+    :param workers: Number of worker processes, None = number of CPUs, 1 = no pool (in this process)
+    :param chunksize: Number of jobs per task sent to a worker, None = default_chunksize
+    :param cache_folder: Folder of the on-disk cache shared by the workers and later runs, None = memory only
+    :return: List of TranslationResult, in the same order as jobs
+    """
+    configure_disk_cache(cache_folder)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [run_job(job) for job in jobs]
+
+    chunksize = chunksize or default_chunksize(len(jobs), workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_disk_cache,
+                             initargs=(cache_folder,)) as executor:
+        # executor.map yields the results in the order of the jobs, regardless of which worker finishes first
+        return list(executor.map(run_job, jobs, chunksize=chunksize))
+
+
+def build_import_workbook(export_df, results):
+    """
+    Steps 8 and 9 of the instructions: copy the English row, change the Locale and set the Translated Value
+    :param export_df: Application Translation export
+    :param results: Iterable of TranslationResult
+    :return: DataFrame in the Application Translation import format
+    """
+    body_rows = {}
+    for index, row in export_df.iterrows():
+        if is_html(row[ENGLISH_COLUMN]) and row[RECORD_ID_COLUMN] not in body_rows:
+            body_rows[row[RECORD_ID_COLUMN]] = row
+
+    import pandas as pd
+    rows = []
+    for result in results:
+        row = body_rows[result.record_id].copy()
+        row[LOCALE_COLUMN] = result.locale
+        row[TRANSLATED_COLUMN] = result.translated_html
+        rows.append(row)
+    return pd.DataFrame(rows, columns=export_df.columns)
+
+
+def translate_batch(export_filename, template_folder, output_filename, workers=None, chunksize=None,
+                    cache_folder=None):
+    """
+    :param export_filename: Intelex Application Translation export (Excel)
+    :param template_folder: Folder with <RecordID>_<Locale>.xlsx translation templates
+    :param output_filename: Import-ready Excel workbook
+    :param workers: Number of worker processes, see generate_all
+    :param chunksize: Number of jobs per task sent to a worker, see generate_all
+    :param cache_folder: Folder of the on-disk cache, see generate_all
+    :return: List of TranslationResult and list of skipped template files
+    """
+    export_df = read_application_translation_export(export_filename)
+    jobs, skipped = collect_jobs(export_df, template_folder)
+    results = generate_all(jobs, workers=workers, chunksize=chunksize, cache_folder=cache_folder)
+    build_import_workbook(export_df, results).to_excel(output_filename, index=False)
+    return results, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate Intelex notification templates without the GUI")
+    parser.add_argument("export", help="Intelex Application Translation export (.xlsx)")
+    parser.add_argument("templates", help="Folder with translated templates named <RecordID>_<Locale>.xlsx")
+    parser.add_argument("output", help="Import-ready Excel workbook (.xlsx)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs, 1 = no process pool)")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Number of templates sent to a worker at once (default: about 4 chunks per worker)")
+    parser.add_argument("--cache-dir", nargs="?", const=DEFAULT_CACHE_FOLDER, default=None,
+                        help=f"Cache extraction and generation results on disk, unchanged templates are not "
+                             f"processed again in later runs (default folder: {DEFAULT_CACHE_FOLDER})")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results, skipped = translate_batch(args.export, args.templates, args.output,
+                                       workers=args.workers, chunksize=args.chunksize, cache_folder=args.cache_dir)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        for line in result.missing_lines:
+            print(f"Missing translation {result.record_id} {result.locale}: {line}", file=sys.stderr)
+    for filename in skipped:
+        print(f"Skipped {filename}: no matching RecordID in export", file=sys.stderr)
+    print(f"Translated {len(results)} template(s) in {elapsed:.2f}s > {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
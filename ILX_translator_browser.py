@@ -0,0 +1,253 @@
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QTableView, QHeaderView, \
+    QDialogButtonBox, QAbstractItemView, QLabel, QPushButton, QFileDialog
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+import os
+
+
+class ExportRecordModel(QAbstractTableModel):
+    """
+    Records of an ExportIndex (see ILX_translator_export): RecordID, subject title and translated locales
+    """
+    headers = ["RecordID", "Subject", "Locales"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.records = []
+
+    def set_records(self, records):
+        self.beginResetModel()
+        self.records = records
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        record = self.records[index.row()]
+        if index.column() == 0:
+            return record.record_id
+        if index.column() == 1:
+            return record.subject
+        return ", ".join(record.locales())
+
+
+class TemplateBrowserDialog(QDialog):
+    """
+    Picks a notification template of an Application Translation export.
+    The search bar filters on RecordID and subject title, when the user has stopped typing.
+    """
+
+    def __init__(self, export_index, parent=None):
+        """
+        :param export_index: ExportIndex of the opened export
+        :param parent: Main window
+        """
+        super().__init__(parent)
+        self.export_index = export_index
+        self.setWindowTitle(f"Notification templates - {export_index.filename}")
+        self.resize(900, 500)
+
+        self.lineEdit_search = QLineEdit(self, placeholderText="Search RecordID or subject title")
+        self.lineEdit_search.setClearButtonEnabled(True)
+        self.model = ExportRecordModel(self)
+        self.tableView_records = QTableView(self)
+        self.tableView_records.setModel(self.model)
+        self.tableView_records.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tableView_records.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.tableView_records.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tableView_records.setWordWrap(False)
+        self.tableView_records.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.tableView_records.horizontalHeader().setStretchLastSection(True)
+        self.tableView_records.verticalHeader().hide()
+        self.tableView_records.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # Uniform row heights
+        self.label_count = QLabel(self)
+        buttons = QDialogButtonBox(QDialogButtonBox.Open | QDialogButtonBox.Cancel, self)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.lineEdit_search)
+        layout.addWidget(self.tableView_records)
+        layout.addWidget(self.label_count)
+        layout.addWidget(buttons)
+
+        # Filtered when the user has stopped typing, see the Search Bar timers of the main window
+        self.search_timer = QTimer(self, interval=300, singleShot=True)
+        self.search_timer.timeout.connect(self.search)
+        self.lineEdit_search.textChanged.connect(self.search_timer.start)
+        self.lineEdit_search.returnPressed.connect(self.search)
+        self.tableView_records.doubleClicked.connect(self.accept)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        self.search()
+        self.tableView_records.setColumnWidth(0, 300)
+        self.tableView_records.setColumnWidth(1, 400)
+
+    def search(self):
+        self.search_timer.stop()
+        self.model.set_records(self.export_index.search(self.lineEdit_search.text()))
+        self.label_count.setText(f"{len(self.model.records)} of {len(self.export_index)} templates")
+        if self.model.records:
+            self.tableView_records.selectRow(0)
+
+    def selected_record(self):
+        """
+        :return: Selected ExportRecord, None when no template is selected
+        """
+        rows = self.tableView_records.selectionModel().selectedRows()
+        return self.model.records[rows[0].row()] if rows else None
+
+    def accept(self):
+        if self.selected_record() is not None:
+            super().accept()
+
+
+class SearchHitModel(QAbstractTableModel):
+    """
+    SearchHit results of the full-text index (see ILX_translator_fulltext)
+    """
+    headers = ["Template", "Locale", "Field", "Match", "File"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hits = []
+
+    def set_hits(self, hits):
+        self.beginResetModel()
+        self.hits = hits
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.hits)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        hit = self.hits[index.row()]
+        if index.column() == 4:
+            return hit.source if role == Qt.ToolTipRole else os.path.basename(hit.source)
+        return (hit.record_id, hit.locale or "English", hit.field, hit.snippet)[index.column()]
+
+
+class FullTextSearchDialog(QDialog):
+    """
+    Searches all indexed notification templates, in every locale.
+    Indexing runs as a background task of the main window: the dialog requests it with update_requested,
+    and the main window calls indexed() when it is done.
+    """
+    update_requested = pyqtSignal(list)  # Files and folders to add, empty list = update the indexed files
+    hit_opened = pyqtSignal(object)  # SearchHit to open in the editor
+
+    def __init__(self, search_index, parent=None):
+        """
+        :param search_index: SearchIndex of the GUI thread
+        :param parent: Main window
+        """
+        super().__init__(parent)
+        self.search_index = search_index
+        self.setWindowTitle("Search all templates")
+        self.resize(1000, 550)
+
+        self.lineEdit_search = QLineEdit(self, placeholderText='Words, "exact phrase" or {#field name}')
+        self.lineEdit_search.setClearButtonEnabled(True)
+        self.model = SearchHitModel(self)
+        self.tableView_hits = QTableView(self)
+        self.tableView_hits.setModel(self.model)
+        self.tableView_hits.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tableView_hits.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.tableView_hits.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tableView_hits.setWordWrap(False)
+        self.tableView_hits.horizontalHeader().setStretchLastSection(True)
+        self.tableView_hits.verticalHeader().hide()
+        self.tableView_hits.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # Uniform row heights
+        self.label_status = QLabel(self)
+        button_add_files = QPushButton("Add files...", self)
+        button_add_folder = QPushButton("Add folder...", self)
+        button_update = QPushButton("Update index", self, toolTip="Index new and changed files")
+        button_open = QPushButton("Open", self, default=True)
+        button_close = QPushButton("Close", self)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(button_add_files)
+        buttons.addWidget(button_add_folder)
+        buttons.addWidget(button_update)
+        buttons.addStretch()
+        buttons.addWidget(button_open)
+        buttons.addWidget(button_close)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.lineEdit_search)
+        layout.addWidget(self.tableView_hits)
+        layout.addWidget(self.label_status)
+        layout.addLayout(buttons)
+
+        # Searched when the user has stopped typing, see the Search Bar timers of the main window
+        self.search_timer = QTimer(self, interval=300, singleShot=True)
+        self.search_timer.timeout.connect(self.search)
+        self.lineEdit_search.textChanged.connect(self.search_timer.start)
+        self.lineEdit_search.returnPressed.connect(self.search)
+        self.tableView_hits.doubleClicked.connect(self.open_hit)
+        button_add_files.clicked.connect(self.add_files)
+        button_add_folder.clicked.connect(self.add_folder)
+        button_update.clicked.connect(lambda: self.update_requested.emit([]))
+        button_open.clicked.connect(self.open_hit)
+        button_close.clicked.connect(self.close)
+
+        self.tableView_hits.setColumnWidth(0, 250)
+        self.tableView_hits.setColumnWidth(3, 450)
+        self.show_status()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_requested.emit([])  # Files changed since the dialog was closed
+
+    def add_files(self):
+        filenames, _ = QFileDialog.getOpenFileNames(self, "Add exports and html files", "",
+                                                    "Exports and html (*.xlsx *.xls *.htm *.html);;All files (*.*)")
+        if filenames:
+            self.update_requested.emit(filenames)
+
+    def add_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Add folder with exports and html files")
+        if folder:
+            self.update_requested.emit([folder])
+
+    def indexed(self, result):
+        """
+        :param result: (number of indexed files, number of removed files) of SearchIndex.update
+        """
+        self.show_status(result)
+        self.search()
+
+    def show_status(self, result=None):
+        text = f"{self.search_index.document_count()} documents in {len(self.search_index.sources())} files"
+        if result is not None and any(result):
+            text += f" (indexed {result[0]}, removed {result[1]})"
+        self.label_status.setText(text)
+
+    def search(self):
+        self.search_timer.stop()
+        self.model.set_hits(self.search_index.search(self.lineEdit_search.text()))
+        if self.model.hits:
+            self.tableView_hits.selectRow(0)
+
+    def open_hit(self):
+        rows = self.tableView_hits.selectionModel().selectedRows()
+        if rows:
+            self.hit_opened.emit(self.model.hits[rows[0].row()])
@@ -0,0 +1,182 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+DEFAULT_CACHE_FOLDER = os.path.join(os.path.expanduser("~"), ".ilx_translator", "cache")
+
+
+def content_key(*parts):
+    """
+    :param parts: Strings (e.g. html) or dictionaries (e.g. translation dictionary)
+    :return: SHA-256 hash of the content, identical content gives an identical key
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(list(part.items()) if isinstance(part, dict) else part, ensure_ascii=False)
+        encoded = part.encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "little"))  # Separates the parts: ("ab", "c") != ("a", "bc")
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ContentCache:
+    """
+    Cache of results keyed by content_key:
+    - in-memory tier: least recently used items are dropped when there are more than max_items
+    - optional on-disk tier (pickle files): least recently used files are removed when above max_disk_bytes
+    """
+
+    def __init__(self, name, max_items=64, folder=None, max_disk_bytes=256 * 1024 * 1024):
+        """
+        :param name: Name of the cache, sub folder of the on-disk tier
+        :param max_items: Number of items kept in memory
+        :param folder: Folder of the on-disk tier, None = memory only
+        :param max_disk_bytes: Maximum size of the on-disk tier
+        """
+        self.name = name
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.lock = threading.Lock()  # Used from the GUI thread and from worker threads
+        self.hits = 0
+        self.misses = 0
+        self.folder = None
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_bytes = 0
+        if folder:
+            self.set_folder(folder)
+
+    def set_folder(self, folder, max_disk_bytes=None):
+        """
+        :param folder: Folder of the on-disk tier, None = memory only
+        :param max_disk_bytes: Maximum size of the on-disk tier, None = unchanged
+        """
+        if max_disk_bytes is not None:
+            self.max_disk_bytes = max_disk_bytes
+        self.folder = os.path.join(folder, self.name) if folder else None
+        self.disk_bytes = 0
+        if self.folder:
+            os.makedirs(self.folder, exist_ok=True)
+            self.disk_bytes = sum(size for path, size, modified in self.disk_files())
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    # ---------------------- Memory tier ----------------------
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+        value = self.disk_get(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.memory_put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.memory_put(key, value)
+        self.disk_put(key, value)
+
+    def memory_put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        :param key: content_key of the input
+        :param compute: Function without arguments, called when the key is not cached
+        :return: Cached or computed value
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    # ---------------------- Disk tier ----------------------
+    def disk_path(self, key):
+        return os.path.join(self.folder, key[:2], f"{key}.pickle")
+
+    def disk_files(self):
+        """
+        :return: List of (path, size, modified time) of the on-disk tier
+        """
+        files = []
+        for directory, folders, filenames in os.walk(self.folder):
+            for filename in filenames:
+                if filename.endswith(".pickle"):
+                    path = os.path.join(directory, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:  # Removed by another process
+                        continue
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def disk_get(self, key):
+        if not self.folder:
+            return None
+        path = self.disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # Recently used, evicted last
+            return value
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def disk_put(self, key, value):
+        if not self.folder:
+            return
+        path = self.disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written to a temporary file first, other processes never read a partially written file
+        handle, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(handle, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self.disk_bytes += os.path.getsize(path)
+        if self.disk_bytes > self.max_disk_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        :return: Removes the least recently used files until the on-disk tier is below 80% of max_disk_bytes
+        """
+        files = sorted(self.disk_files(), key=lambda file: file[2])
+        self.disk_bytes = sum(size for path, size, modified in files)
+        for path, size, modified in files:
+            if self.disk_bytes <= self.max_disk_bytes * 0.8:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_bytes -= size
+
+
+# Extracted TemplateStructures by html, and generated html by html and translation dictionary
+structure_cache = ContentCache("structure", max_items=32)
+generation_cache = ContentCache("generation", max_items=128)
+
+
+def configure_disk_cache(folder=DEFAULT_CACHE_FOLDER, max_disk_bytes=256 * 1024 * 1024):
+    """
+    Enables the on-disk tier of the caches (also used as ProcessPoolExecutor initializer)
+    :param folder: Folder of the on-disk tier, None = memory only
+    :param max_disk_bytes: Maximum size per cache
+    """
+    for cache in (structure_cache, generation_cache):
+        cache.set_folder(folder, max_disk_bytes)
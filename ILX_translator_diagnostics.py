@@ -0,0 +1,87 @@
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QFileDialog
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtCore import QTimer
+from ILX_translator_profiling import profiler
+
+
+def report_text(snapshot, extra):
+    """
+    :param snapshot: Profiler.snapshot()
+    :param extra: Additional sections, { Section : { Name : { Key : Value } } }
+    :return: Stages, counters and extra sections as aligned text
+    """
+    lines = [f"{'Stage':<48}{'Count':>8}{'Total ms':>12}{'Mean ms':>10}{'Max ms':>10}{'Last ms':>10}"]
+    for name, stage in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["total_ms"]):
+        lines.append(f"{name:<48}{stage['count']:>8}{stage['total_ms']:>12.1f}{stage['mean_ms']:>10.2f}"
+                     f"{stage['max_ms']:>10.2f}{stage['last_ms']:>10.2f}")
+    lines.append("")
+    lines.append(f"{'Counter':<48}{'Value':>20}")
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"{name:<48}{value:>20,}")
+    for section, items in extra.items():
+        lines.append("")
+        lines.append(section.capitalize())
+        for name, values in items.items():
+            lines.append(f"  {name:<46}" + "  ".join(f"{key}: {value}" for key, value in values.items()))
+    return "\n".join(lines)
+
+
+class DiagnosticsDialog(QDialog):
+    """
+    Shows the stage timings and counters of the profiler (see ILX_translator_profiling), refreshed while open.
+    The report can be saved as JSON, and the statistics can be reset before measuring an action.
+    """
+
+    def __init__(self, extra=None, parent=None):
+        """
+        :param extra: Optional function returning additional sections of the report, e.g. cache statistics
+        :param parent: Main window
+        """
+        super().__init__(parent)
+        self.extra = extra or dict
+        self.setWindowTitle("Diagnostics")
+        self.resize(800, 500)
+
+        self.textEdit_report = QPlainTextEdit(self, readOnly=True)
+        self.textEdit_report.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        button_reset = QPushButton("Reset", self)
+        button_save = QPushButton("Save JSON...", self)
+        button_close = QPushButton("Close", self)
+        button_reset.clicked.connect(self.reset)
+        button_save.clicked.connect(self.save_json)
+        button_close.clicked.connect(self.close)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(button_reset)
+        buttons.addStretch()
+        buttons.addWidget(button_save)
+        buttons.addWidget(button_close)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.textEdit_report)
+        layout.addLayout(buttons)
+
+        self.refresh_timer = QTimer(self, interval=1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        text = report_text(profiler.snapshot(), self.extra())
+        if text != self.textEdit_report.toPlainText():  # Keeps the selection and scroll position
+            self.textEdit_report.setPlainText(text)
+
+    def reset(self):
+        profiler.reset()
+        self.refresh()
+
+    def save_json(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Save diagnostics", "diagnostics.json", "JSON (*.json)")
+        if filename:
+            profiler.dump_json(filename, **self.extra())
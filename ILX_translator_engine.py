@@ -0,0 +1,322 @@
+from functools import lru_cache
+from html import escape
+from ILX_translator_extract import iter_lines, normalize
+from ILX_translator_cache import structure_cache, generation_cache, content_key
+from ILX_translator_profiling import profiler
+import re
+
+MULTIPLE_SPACES = re.compile(' +')
+
+# Changed whenever the (pickled) TemplateStructure changes, older entries in the on-disk cache are then not used
+STRUCTURE_FORMAT = "TemplateStructure 3"
+# Changed whenever the splicing rules of TemplateStructure.generate change, older generated html is then not used
+GENERATION_FORMAT = "Generation 4"
+
+
+def is_field(text):
+    """
+    :param text: English text of a single line
+    :return: True when the whole text is one Intelex field ({#[text]}), which must be left untouched
+    """
+    return text.startswith("{#") and text.endswith("}")
+
+
+def trie_pattern(keys):
+    """
+    Builds one regular expression from the keys, factored like a trie (shared prefixes are matched once).
+    A plain alternation (key1|key2|...) is tried key by key at every position of the html,
+    the trie only follows the branches which match the next character.
+    At every position the longest key wins (greedy optional suffixes).
+    :param keys: Iterable of lowercase strings
+    :return: Regular expression (string)
+    """
+    end = ""  # Marks the end of a key within the trie
+    trie = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[end] = None
+
+    def node_pattern(node):
+        alternatives = []
+        for char, child in node.items():
+            if char == end:
+                continue
+            # Follow single-child chains iteratively, long lines would otherwise exceed the recursion limit
+            chain = [char]
+            while len(child) == 1 and end not in child:
+                (char, child), = child.items()
+                chain.append(char)
+            alternatives.append(re.escape("".join(chain)) + node_pattern(child))
+        if not alternatives:
+            return ""
+        pattern = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if end in node:  # A key ends here, the longer keys are optional
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return node_pattern(trie)
+
+
+class ReplacementEngine:
+    """
+    Replaces English lines in an HTML document with their translation in a single pass.
+
+    All English keys are compiled once into one combined, case-insensitive matcher, factored like a trie.
+    At any position the longest English line wins (leftmost-longest, like an Aho-Corasick automaton).
+    The HTML is then walked once from left to right, and each English line is replaced at its
+    first (leftmost-longest) match only.
+
+    Unlike the original one-regex-per-line loop, which replaced the lines in line order, overlapping
+    lines are resolved by position: with the lines "World" and "Hello World", "Hello World World"
+    becomes "HW W" instead of "Hello W World".
+
+    The engine only depends on the English lines, so one engine can be reused to generate
+    every locale of the same template.
+    """
+
+    def __init__(self, english_lines):
+        """
+        :param english_lines: Iterable of English lines (the keys of the translation dictionary)
+        """
+        self.keys = {}  # lowercase English text : English text as given (first one wins)
+        for line in english_lines:
+            clean_line = line.strip()
+            if clean_line and clean_line.lower() not in self.keys:
+                self.keys[clean_line.lower()] = clean_line
+
+        if self.keys:
+            self.pattern = re.compile(trie_pattern(self.keys), re.IGNORECASE | re.DOTALL)
+        else:
+            self.pattern = None
+
+    def generate(self, html, translation_dict):
+        """
+        :param html: Original (English) html
+        :param translation_dict: Dictionary { English : Translation }
+        :return: Translated html. Multiple spaces are collapsed, like the original html replacer.
+        """
+        cleaned_html = MULTIPLE_SPACES.sub(' ', html)  # Removes duplicate/multiple spaces from original html
+        if self.pattern is None:
+            return cleaned_html
+
+        # Lookup on the lowercase English text, as the matcher is case-insensitive
+        translations = {}
+        for old_text, new_text in translation_dict.items():
+            lower_text = old_text.strip().lower()
+            if lower_text in self.keys and lower_text not in translations:
+                translations[lower_text] = new_text
+
+        parts = []
+        replaced = set()
+        position = 0
+        matches = 0
+        match = self.pattern.search(cleaned_html, position)
+        while match is not None:
+            matches += 1
+            matched_text = match.group(0)
+            lower_text = matched_text.lower()
+            if lower_text in replaced or lower_text not in translations or is_field(matched_text):
+                # Already replaced, no translation, or an ILX field: keep the text,
+                # and continue one character further so overlapping lines can still be found
+                parts.append(cleaned_html[position:match.start() + 1])
+                position = match.start() + 1
+            else:
+                parts.append(cleaned_html[position:match.start()])
+                parts.append(translations[lower_text])
+                replaced.add(lower_text)
+                position = match.end()
+                if len(replaced) == len(translations):
+                    break
+            match = self.pattern.search(cleaned_html, position)
+
+        parts.append(cleaned_html[position:])
+        profiler.count("patterns matched", matches)
+        return "".join(parts)
+
+
+class PhraseTable:
+    """
+    Interned unique English phrases of a template.
+    Lines which only differ in case or spacing (see ILX_translator_extract.normalize) are the same phrase,
+    every occurrence refers to its phrase id. A phrase is translated once, and every occurrence gets the translation.
+    """
+
+    def __init__(self, lines=()):
+        """
+        :param lines: Iterable of English lines
+        """
+        self.phrases = []  # Phrase id : English text of the first occurrence
+        self.ids = {}  # Normalized English text : Phrase id
+        for line in lines:
+            self.intern(line)
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def __iter__(self):
+        return iter(self.phrases)
+
+    def intern(self, text):
+        """
+        :param text: English line
+        :return: Phrase id of the line, a new id when the phrase is not in the table yet
+        """
+        key = normalize(text)
+        phrase_id = self.ids.get(key)
+        if phrase_id is None:
+            phrase_id = self.ids[key] = len(self.phrases)
+            self.phrases.append(text)
+        return phrase_id
+
+    def phrase_id(self, text):
+        """
+        :return: Phrase id of the English line, None when the phrase is not in the table
+        """
+        return self.ids.get(normalize(text))
+
+    def translations(self, translation_dict):
+        """
+        :param translation_dict: Dictionary { English : Translation }
+        :return: List with the Translation of every phrase id, None when the phrase is not in the dictionary.
+                 The exact English text wins over other spellings of the same phrase.
+        """
+        translations = [None] * len(self.phrases)
+        for english, translation in translation_dict.items():
+            phrase_id = self.phrase_id(english)
+            if phrase_id is not None and (translations[phrase_id] is None or english == self.phrases[phrase_id]):
+                translations[phrase_id] = translation
+        return translations
+
+
+class TemplateStructure:
+    """
+    Structure of one English html: the translatable lines and the source spans of their text nodes.
+    Generating a translation is a single splice pass over these known spans:
+    - the first text node of a line gets the translation, the other text nodes of the line are emptied
+      (inline tags such as <b> remain, entities and &nbsp; are handled by the extractor)
+    - every occurrence of a line is translated, ILX field lines ({#[text]}) are left untouched
+    - repeated lines are one phrase (see PhraseTable), translated once
+    - multiple spaces are collapsed afterwards, like the original html replacer
+    The html is extracted once, the structure is reused for every locale.
+
+    Differences with the original html replacer (a regular expression search of every English line):
+    - a translation is text: it is escaped, so "<b>" or "&amp;" typed in a Translation cell appear literally
+    - the formatting within a line is lost: for "Dear <b>{#Name}</b>" the translation replaces "Dear "
+      and the text of <b> is emptied, leaving an empty <b></b>
+    """
+
+    def __init__(self, html, lines=None):
+        """
+        :param html: Original (English) html
+        :param lines: Previously extracted Lines of the html (e.g. from a project file), None = extract the html
+        """
+        self.html = html
+        if lines is None:
+            with profiler.stage("extract html"):
+                lines = list(iter_lines(html))
+            profiler.count("html characters extracted", len(html))
+            profiler.count("lines extracted", len(lines))
+        self.lines = list(lines)
+        self.phrases = PhraseTable()
+        self.line_phrases = [self.phrases.intern(line.text) for line in self.lines]  # Phrase id of every line
+
+    def english_lines(self):
+        """
+        :return: Every extracted line, in document order (repeated lines included)
+        """
+        return [line.text for line in self.lines]
+
+    def unique_lines(self):
+        """
+        :return: The unique phrases in order of their first occurrence, the lines of the Translation tab and template
+        """
+        return list(self.phrases)
+
+    def splice(self, replacements):
+        """
+        :param replacements: List of (start, end, text) in document order, without overlaps
+        :return: html with html[start:end] replaced by text
+        """
+        parts = []
+        position = 0
+        for start, end, text in replacements:
+            parts.append(self.html[position:start])
+            parts.append(text)
+            position = end
+        parts.append(self.html[position:])
+        return "".join(parts)
+
+    def generate(self, translation_dict):
+        """
+        :param translation_dict: Dictionary { English : Translation }
+        :return: Translated html
+        """
+        with profiler.stage("generate html"):
+            # One lookup per phrase: exact text first, then ignoring case and spacing (e.g. edited template)
+            translations = [None if translation is None else escape(translation, quote=False)
+                            for translation in self.phrases.translations(translation_dict)]
+
+            replacements = []
+            replaced_lines = 0
+            for line, phrase_id in zip(self.lines, self.line_phrases):
+                translation = translations[phrase_id]
+                if translation is None or is_field(line.text) or not line.segments:
+                    continue
+                first, *others = line.segments
+                replacements.append((first.start, first.end, translation))
+                replacements.extend((segment.start, segment.end, "") for segment in others)
+                replaced_lines += 1
+
+            translated_html = MULTIPLE_SPACES.sub(' ', self.splice(replacements))
+        profiler.count("lines replaced", replaced_lines)
+
+        # Translations of lines which are not in this html (e.g. template of an older html version)
+        # are still searched in the html, like the original html replacer. Escaped like the spliced translations.
+        unused = {old_text: escape(new_text, quote=False) for old_text, new_text in translation_dict.items()
+                  if old_text.strip() and self.phrases.phrase_id(old_text) is None}
+        if unused:
+            with profiler.stage("text search (template lines not in the html)"):
+                translated_html = get_engine(unused.keys()).generate(translated_html, unused)
+        return translated_html
+
+
+def get_structure(html):
+    """
+    :param html: Original (English) html
+    :return: TemplateStructure of the html, cached by the content of the html (see ILX_translator_cache)
+    """
+    return structure_cache.get_or_compute(content_key(STRUCTURE_FORMAT, html), lambda: TemplateStructure(html))
+
+
+def cache_structure(structure):
+    """
+    :param structure: TemplateStructure which is already known (e.g. from a project file),
+                      get_structure then returns it without extracting the html
+    """
+    structure_cache.memory_put(content_key(STRUCTURE_FORMAT, structure.html), structure)
+
+
+@lru_cache(maxsize=32)
+def _cached_engine(english_lines):
+    return ReplacementEngine(english_lines)
+
+
+def get_engine(english_lines):
+    """
+    :param english_lines: Iterable of English lines
+    :return: ReplacementEngine for these lines, reused when the same lines are requested again
+    """
+    return _cached_engine(tuple(english_lines))
+
+
+def generate_html(html, translation_dict):
+    """
+    Replaces the English text in the html with the translated text, see TemplateStructure
+    :param html: Original (English) html
+    :param translation_dict: Dictionary { English : Translation }
+    :return: Translated html, cached by the content of the html and translation dictionary
+    """
+    key = content_key(GENERATION_FORMAT, html, translation_dict)
+    return generation_cache.get_or_compute(key, lambda: get_structure(html).generate(translation_dict))
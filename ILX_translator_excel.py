@@ -0,0 +1,291 @@
+# openpyxl (and pandas for .xls) are imported on first use, keeping the start-up of the program fast
+from ILX_translator_profiling import profiler
+import os
+import re
+
+# Column names of the Translation template (see MyMainWindow.button_clicked_export)
+TEMPLATE_ENGLISH_COLUMN = "English"
+TEMPLATE_TRANSLATION_COLUMN = "Translation"
+
+INVALID_SHEET_CHARACTERS = re.compile(r'[\[\]:*?/\\]')
+MAXIMUM_SHEET_NAME_LENGTH = 31
+# Path separators, and characters or names which are not allowed in a Windows file name
+INVALID_FILENAME_CHARACTERS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+RESERVED_FILENAMES = {"CON", "PRN", "AUX", "NUL", *(f"COM{number}" for number in range(1, 10)),
+                      *(f"LPT{number}" for number in range(1, 10))}
+
+
+def parse_template_filename(filename):
+    """
+    :param filename: Translation template filename, <RecordID>_<Locale>.xlsx
+    :return: (RecordID, Locale) or None when the name does not follow the convention
+    """
+    stem, extension = os.path.splitext(os.path.basename(filename))
+    if extension.lower() not in (".xlsx", ".xls") or "_" not in stem:
+        return None
+    record_id, locale = stem.split("_", 1)  # A RecordID (GUID) never contains an underscore
+    if not record_id or not locale:
+        return None
+    return record_id, locale
+
+
+def cell_text(value):
+    """
+    :param value: Cell value, None for an empty cell
+    :return: Cell value as text, empty string for an empty cell
+    """
+    return "" if value is None else str(value)
+
+
+def sheet_names(filename):
+    """
+    :param filename: Excel workbook (.xlsx)
+    :return: Names of the sheets, without reading the cells
+    """
+    from openpyxl import load_workbook
+    workbook = load_workbook(filename, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def template_header(filename, sheet_name=None):
+    """
+    :param filename: Translation template (.xlsx)
+    :param sheet_name: Sheet to read, None = first sheet
+    :return: Column names (first row) of the template, without reading the other rows
+    """
+    if os.path.splitext(filename)[1].lower() == ".xls":  # Not supported by openpyxl
+        import pandas as pd
+        return [str(column) for column in pd.read_excel(filename, sheet_name=sheet_name or 0, nrows=0).columns]
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(filename, read_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        return [cell_text(value) for value in next(worksheet.iter_rows(values_only=True), ())]
+    finally:
+        workbook.close()
+
+
+def template_locales(header):
+    """
+    A multi-locale template has an English column and one column per locale (e.g. "fr-FR", "de-DE"),
+    instead of the Translation column.
+    :param header: Column names of the template, see template_header
+    :return: Locales of a multi-locale template, empty list for a (single locale) Translation template
+    """
+    if TEMPLATE_TRANSLATION_COLUMN in header or TEMPLATE_ENGLISH_COLUMN not in header:
+        return []
+    return [column for column in header if column and column != TEMPLATE_ENGLISH_COLUMN]
+
+
+def template_column_indices(filename, header, columns):
+    """
+    :param filename: Translation template, for the error message
+    :param header: Column names of the template
+    :param columns: Translation columns to read
+    :return: Indices of the English column and the columns, ValueError when a column is missing
+    """
+    if TEMPLATE_ENGLISH_COLUMN not in header or any(column not in header for column in columns):
+        raise ValueError(f"{filename} is not a Translation template, "
+                         f"expected the columns {TEMPLATE_ENGLISH_COLUMN} and {', '.join(columns)}")
+    return [header.index(column) for column in (TEMPLATE_ENGLISH_COLUMN, *columns)]
+
+
+def iter_template_rows(filename, sheet_name=None, columns=(TEMPLATE_TRANSLATION_COLUMN,)):
+    """
+    Streams the rows of a Translation template, one row at a time (openpyxl read-only mode),
+    so memory does not grow with the size of the workbook.
+    The workbook is closed when all rows are read, or when the generator is closed.
+    :param filename: Translation template (.xlsx), created with "Export Translation Template"
+    :param sheet_name: Sheet to read, None = first sheet
+    :param columns: Translation columns to read, e.g. the locales of a multi-locale template
+    :return: Generator of (English, Translation), or (English, *columns) for other columns
+    """
+    profiler.count("template bytes read", os.path.getsize(filename))
+    if os.path.splitext(filename)[1].lower() == ".xls":  # Not supported by openpyxl
+        import pandas as pd
+        df = pd.read_excel(filename, sheet_name=sheet_name or 0, dtype=str, keep_default_na=False)
+        indices = template_column_indices(filename, [str(column) for column in df.columns], columns)
+        yield from zip(*(df.iloc[:, index] for index in indices))
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(filename, read_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        header = [cell_text(value) for value in next(rows, ())]
+        indices = template_column_indices(filename, header, columns)
+
+        row_count = 0
+        try:
+            for row in rows:
+                values = tuple(cell_text(row[index]) if index < len(row) else "" for index in indices)
+                if values[0]:
+                    row_count += 1
+                    yield values
+        finally:
+            profiler.count("template rows read", row_count)
+    finally:
+        workbook.close()
+
+
+def read_translation_template(filename, sheet_name=None):
+    """
+    :param filename: Translated template, created with "Export Translation Template"
+    :param sheet_name: Sheet to read, None = first sheet
+    :return: Dictionary { English : Translation }
+    """
+    return dict(iter_template_rows(filename, sheet_name))
+
+
+def read_locale_template(filename, sheet_name=None):
+    """
+    :param filename: Translated multi-locale template (English and one column per locale)
+    :param sheet_name: Sheet to read, None = first sheet
+    :return: Dictionary { Locale : { English : Translation } }, empty for a (single locale) Translation template
+    """
+    locales = template_locales(template_header(filename, sheet_name))
+    translation_dicts = {locale: {} for locale in locales}
+    if locales:
+        for english, *translations in iter_template_rows(filename, sheet_name, locales):
+            for locale, translation in zip(locales, translations):
+                translation_dicts[locale][english] = translation
+    return translation_dicts
+
+
+def column_width(max_length):
+    """
+    :param max_length: Number of characters of the longest cell in the column
+    :return: Column width which fits the content
+    """
+    return (max_length + 2) * 1.2  # Add some buffer space
+
+
+def sheet_title(name, used_titles):
+    """
+    :param name: Name of the template
+    :param used_titles: Sheet titles already in the workbook (lowercase), the new title is added
+    :return: Valid and unique Excel sheet title
+    """
+    title = INVALID_SHEET_CHARACTERS.sub("_", name)[:MAXIMUM_SHEET_NAME_LENGTH] or "Sheet"
+    unique_title = title
+    number = 1
+    while unique_title.lower() in used_titles:
+        suffix = f"_{number}"
+        unique_title = title[:MAXIMUM_SHEET_NAME_LENGTH - len(suffix)] + suffix
+        number += 1
+    used_titles.add(unique_title.lower())
+    return unique_title
+
+
+def write_template_sheet(workbook, title, rows, progress=None, header=None):
+    """
+    Adds a Translation template sheet to a write-only workbook.
+    The column widths are computed from the strings before they are written, so the cells are never read back.
+    :param workbook: openpyxl Workbook(write_only=True)
+    :param title: Sheet title
+    :param rows: List of (English, Translation), with one value per column of the header
+    :param progress: Optional function(rows written, total rows), e.g. Worker.report_progress
+    :param header: Column names, e.g. English and the locales of a multi-locale template. None = English, Translation
+    """
+    from openpyxl.utils import get_column_letter
+    worksheet = workbook.create_sheet(title)
+    header = header or (TEMPLATE_ENGLISH_COLUMN, TEMPLATE_TRANSLATION_COLUMN)
+    max_lengths = [len(column) for column in header]
+    for row in rows:
+        for column, value in enumerate(row):
+            max_lengths[column] = max(max_lengths[column], len(value))
+    # Write-only sheets need their column widths before the first row is appended
+    for column, max_length in enumerate(max_lengths, start=1):
+        worksheet.column_dimensions[get_column_letter(column)].width = column_width(max_length)
+
+    worksheet.append(header)
+    for number, row in enumerate(rows, start=1):
+        worksheet.append(row)
+        if progress is not None and number % 500 == 0:
+            progress(number, len(rows))
+    if progress is not None:
+        progress(len(rows), len(rows))
+
+
+def write_translation_templates(filename, templates, progress=None):
+    """
+    Writes one or more Translation templates into one workbook (write-only, saved once)
+    :param filename: Excel workbook (.xlsx)
+    :param templates: Iterable of (name, rows), with rows a list of (English, Translation). One sheet per template.
+    :param progress: Optional function(rows written, total rows) per sheet.
+                     When it raises an exception (e.g. cancelled), the workbook is not saved.
+    """
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    for name, rows in templates:
+        write_template_sheet(workbook, sheet_title(name, used_titles), list(rows), progress)
+    workbook.save(filename)
+    profiler.count("template bytes written", os.path.getsize(filename))
+
+
+def write_translation_template(filename, translation_dict, sheet_name="Sheet1", progress=None):
+    """
+    :param filename: Excel workbook (.xlsx)
+    :param translation_dict: Dictionary { English : Translation }
+    :param sheet_name: Sheet title
+    :param progress: Optional function(rows written, total rows)
+    """
+    write_translation_templates(filename, [(sheet_name, translation_dict.items())], progress)
+
+
+def write_locale_template(filename, translation_dicts, sheet_name="Sheet1", progress=None):
+    """
+    Writes a multi-locale template: English and one column per locale, see template_locales
+    :param filename: Excel workbook (.xlsx)
+    :param translation_dicts: Dictionary { Locale : { English : Translation } }
+    :param sheet_name: Sheet title
+    :param progress: Optional function(rows written, total rows)
+    """
+    from openpyxl import Workbook
+    locales = list(translation_dicts)
+    english_lines = dict.fromkeys(english for translation_dict in translation_dicts.values()
+                                  for english in translation_dict)
+    rows = [(english, *(translation_dicts[locale].get(english, "") for locale in locales))
+            for english in english_lines]
+    workbook = Workbook(write_only=True)
+    write_template_sheet(workbook, sheet_title(sheet_name, set()), rows, progress,
+                         header=(TEMPLATE_ENGLISH_COLUMN, *locales))
+    workbook.save(filename)
+    profiler.count("template bytes written", os.path.getsize(filename))
+
+
+def template_filename(folder, name):
+    """
+    :param folder: Output folder
+    :param name: Name of the template, e.g. the Notification Template name
+    :return: <folder>/<name>.xlsx, with the path separators and reserved characters of the name replaced by _
+    """
+    stem = INVALID_FILENAME_CHARACTERS.sub("_", name).strip(" .") or "Notification"  # Also ".."
+    if stem.split(".")[0].upper() in RESERVED_FILENAMES:
+        stem = f"_{stem}"
+    filename = os.path.join(folder, f"{stem}.xlsx")
+    if os.path.dirname(os.path.abspath(filename)) != os.path.abspath(folder):
+        raise ValueError(f"Invalid template name {name!r}")
+    return filename
+
+
+def write_translation_template_files(folder, templates):
+    """
+    Writes every Translation template to its own workbook
+    :param folder: Output folder, created when it does not exist
+    :param templates: Iterable of (name, rows), with rows a list of (English, Translation)
+    :return: List of the written filenames, <folder>/<name>.xlsx (see template_filename)
+    """
+    os.makedirs(folder, exist_ok=True)
+    filenames = []
+    for name, rows in templates:
+        filename = template_filename(folder, name)
+        write_translation_templates(filename, [("Sheet1", rows)])
+        filenames.append(filename)
+    return filenames
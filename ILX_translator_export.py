@@ -0,0 +1,171 @@
+"""
+Index of an Intelex Application Translation export.
+
+The export has one row per RecordID, Locale and field: the notification body (html) and the subject title
+share the same RecordID. The index groups the rows by RecordID once, so the English html and the existing
+translations of a notification template are looked up without scanning the export again.
+"""
+from ILX_translator_excel import cell_text
+from ILX_translator_profiling import profiler
+import os
+
+# Column names of the Intelex Application Translation export
+RECORD_ID_COLUMN = "RecordID"
+LOCALE_COLUMN = "Locale"
+ENGLISH_COLUMN = "English Value"
+TRANSLATED_COLUMN = "Translated Value"
+
+BODY_FIELD = "body"
+SUBJECT_FIELD = "subject"
+
+
+def is_html(value):
+    """
+    The notification body and subject title share the same RecordID, only the body is html
+    :param value: Cell value of the English column
+    :return: True when the value contains html
+    """
+    return isinstance(value, str) and "<" in value and ">" in value
+
+
+class ExportRecord:
+    """
+    Rows of one RecordID
+    """
+    __slots__ = ("record_id", "english", "translations", "search_text")
+
+    def __init__(self, record_id):
+        self.record_id = record_id
+        self.english = {}  # Field : English Value
+        self.translations = {}  # Field : { Locale : Translated Value }
+        self.search_text = ""  # Casefolded RecordID and subject title, see ExportIndex.search
+
+    @property
+    def english_html(self):
+        return self.english.get(BODY_FIELD, "")
+
+    @property
+    def subject(self):
+        return self.english.get(SUBJECT_FIELD, "")
+
+    def translated_htmls(self):
+        """
+        :return: Dictionary { Locale : Translated html } of the locales with a translated body
+        """
+        return {locale: html for locale, html in self.translations.get(BODY_FIELD, {}).items() if html}
+
+    def locales(self):
+        return sorted({locale for translations in self.translations.values()
+                       for locale, value in translations.items() if value})
+
+
+class ExportIndex:
+    """
+    Notification templates of an Application Translation export, by RecordID
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.records = {}  # RecordID : ExportRecord, in export order
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def __contains__(self, record_id):
+        return record_id in self.records
+
+    def __getitem__(self, record_id):
+        return self.records[record_id]
+
+    def add_row(self, record_id, locale, english, translated):
+        """
+        :param record_id: RecordID (GUID) of the notification template
+        :param locale: Locale of the Translated Value
+        :param english: English Value, html for the body, text for the subject title
+        :param translated: Translated Value
+        """
+        if not record_id:
+            return
+        record = self.records.get(record_id)
+        if record is None:
+            record = self.records[record_id] = ExportRecord(record_id)
+        field = BODY_FIELD if is_html(english) else SUBJECT_FIELD
+        record.english.setdefault(field, english)
+        if locale:
+            record.translations.setdefault(field, {})[locale] = translated
+
+    def finish(self):
+        """
+        :return: Prepares the search text, called when all rows are added
+        """
+        for record in self.records.values():
+            record.search_text = f"{record.record_id}\n{record.subject}".casefold()
+
+    def search(self, text):
+        """
+        A linear scan over the search text of every record, fast enough on every keystroke for the size of
+        an export (thousands of records). The template contents are searched with ILX_translator_fulltext.
+        :param text: Part of the RecordID or subject title, case-insensitive. Empty returns every record.
+        :return: List of ExportRecord, in export order
+        """
+        text = text.strip().casefold()
+        return [record for record in self.records.values() if text in record.search_text]
+
+
+def iter_export_rows(filename):
+    """
+    Streams the rows of the export (openpyxl read-only mode), the workbook is closed when all rows are read
+    :param filename: Intelex Application Translation export (Excel)
+    :return: Generator of (RecordID, Locale, English Value, Translated Value)
+    """
+    profiler.count("export bytes read", os.path.getsize(filename))
+    if os.path.splitext(filename)[1].lower() == ".xls":  # Not supported by openpyxl
+        import pandas as pd
+        df = pd.read_excel(filename, dtype=str, keep_default_na=False)
+        yield from select_export_columns(filename, [df.columns.tolist(), *df.itertuples(index=False, name=None)])
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(filename, read_only=True)
+    try:
+        yield from select_export_columns(filename, workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def select_export_columns(filename, rows):
+    """
+    :param filename: Export, for the error message
+    :param rows: Iterable of rows, the first row is the header
+    :return: Generator of (RecordID, Locale, English Value, Translated Value)
+    """
+    rows = iter(rows)
+    header = [cell_text(value) for value in next(rows, ())]
+    columns = (RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, TRANSLATED_COLUMN)
+    missing_columns = [column for column in columns if column not in header]
+    if missing_columns:
+        raise ValueError(f"{filename} is not an Application Translation export, "
+                         f"missing column(s): {', '.join(missing_columns)}")
+    indices = [header.index(column) for column in columns]
+    for row in rows:
+        yield tuple(cell_text(row[index]) if index < len(row) else "" for index in indices)
+
+
+def read_export_index(filename, progress=None):
+    """
+    :param filename: Intelex Application Translation export (Excel)
+    :param progress: Optional function called as progress(rows read), e.g. Worker.report_progress
+    :return: ExportIndex
+    """
+    index = ExportIndex(filename)
+    with profiler.stage("index export"):
+        for row_number, row in enumerate(iter_export_rows(filename), 1):
+            index.add_row(*row)
+            if progress is not None and row_number % 100 == 0:
+                progress(row_number)
+        index.finish()
+    profiler.count("export records indexed", len(index))
+    return index
@@ -0,0 +1,263 @@
+from collections import namedtuple
+from html import unescape
+from html.parser import HTMLParser
+import re
+
+# Intelex field names, e.g. {#Name}. These are never translated.
+FIELD_PATTERN = re.compile(r'\{#.*?\}')
+
+# Raw source span (html[start:end]) of one text node, or part of it, which belongs to a line.
+# Leading and trailing whitespace of the text node are not part of the span.
+Segment = namedtuple("Segment", ["start", "end"])
+# Translatable line, as shown in the Translation tab, and the text nodes it consists of
+Line = namedtuple("Line", ["text", "segments"])
+
+# Elements which start a new block (line) in the rich text, like QTextDocument
+BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd", "blockquote",
+              "pre", "table", "tr", "td", "th", "thead", "tbody", "tfoot", "caption", "hr", "center", "br"}
+# QTextDocument does not start a new block after these end tags: "<div>a</div>b" is one line "ab".
+# A div with child elements does end its block: "<div><b>a</b></div>b" is two lines, see LineParser.div_children
+INLINE_END_TAGS = {"div", "br"}
+# Elements of which the content is not shown in the rich text
+SKIP_TAGS = {"head", "title", "style", "script"}
+# Shown in the rich text as object replacement character (QTextDocument.toPlainText)
+OBJECT_TAGS = {"img"}
+OBJECT_REPLACEMENT_CHARACTER = "\ufffc"
+
+# QTextDocument collapses the line separator (U+2028) like a space, the paragraph separator (U+2029) is a new line
+COLLAPSIBLE_WHITESPACE = re.compile('[ \t\n\r\f\u2028]+')
+PARAGRAPH_SEPARATOR = '\u2029'
+# Within <pre> both separators are a new line
+SOURCE_LINE_BREAKS = re.compile('\r\n|[\r\n\u2028\u2029]')
+# Written by QTextEdit.toHtml, see saved_html_source
+QT_RICH_TEXT_MARKER = '<meta name="qrichtext" content="1" />'
+WHITESPACE = re.compile(r'\s+')
+
+
+class LineParser(HTMLParser):
+    """
+    Converts html into translatable lines in one pass, without a QTextDocument (no Qt required),
+    producing the same lines as QTextDocument.setHtml(html).toPlainText() split on line breaks.
+    Every line records the source spans of its text nodes, see Segment.
+    """
+
+    def __init__(self, html):
+        super().__init__(convert_charrefs=True)
+        self.html = html
+        self.line_starts = [0] + [match.end() for match in re.finditer('\n', html)]
+        self.lines = []  # Completed lines, taken by iter_lines
+        self.text_parts = []  # Rich text of the current line
+        self.segments = []  # Segments of the current line
+        self.space_before = True  # Collapses whitespace across text nodes, and at the start of a line
+        self.skip_depth = 0
+        self.pre_depth = 0
+        self.div_children = []  # Per open div: True when it has a child element, it then ends its block
+        self.pending_data = None  # (start, text) of the last text node, its end is the start of the next event
+
+    def source_position(self):
+        line_number, column = self.getpos()
+        return self.line_starts[line_number - 1] + column
+
+    # ---------------------- Lines ----------------------
+    def end_line(self):
+        text = "".join(self.text_parts).replace("\xa0", " ").strip()  # No-break spaces are plain text spaces
+        if text:
+            self.lines.append(Line(text, self.segments))
+        self.text_parts = []
+        self.segments = []
+        self.space_before = True
+
+    def add_text(self, text, start, end):
+        """
+        :param text: Rich text of (a part of) a text node, whitespace already collapsed
+        :param start: Start of the text node part in the html
+        :param end: End of the text node part in the html
+        """
+        if self.space_before and text.startswith(" "):
+            text = text[1:]
+        if not text:
+            return
+        self.text_parts.append(text)
+        self.space_before = text.endswith(" ")
+
+        raw = self.html[start:end]
+        stripped = raw.strip()
+        if stripped:
+            start += len(raw) - len(raw.lstrip())
+            self.segments.append(Segment(start, start + len(stripped)))
+
+    def flush_data(self):
+        """
+        Called before every event: the pending text node ends where the next tag (or the html) starts
+        """
+        if self.pending_data is None:
+            return
+        start, data = self.pending_data
+        self.pending_data = None
+        end = self.source_position()
+        if self.skip_depth:
+            return
+
+        if self.pre_depth:
+            # Whitespace is preserved, every source line break is a new line
+            position = start
+            for match in SOURCE_LINE_BREAKS.finditer(self.html, start, end):
+                self.add_pre_text(position, match.start())
+                self.end_line()
+                position = match.end()
+            self.add_pre_text(position, end)
+            return
+
+        parts = data.split(PARAGRAPH_SEPARATOR)
+        for number, part in enumerate(parts):
+            if number:
+                self.end_line()
+            # Source spans are only known for the whole text node, a paragraph separator entity is very rare
+            self.add_text(COLLAPSIBLE_WHITESPACE.sub(" ", part), start, end)
+
+    def add_pre_text(self, start, end):
+        text = unescape(self.html[start:end])
+        self.text_parts.append(text)
+        raw = self.html[start:end]
+        if raw.strip():
+            leading = len(raw) - len(raw.lstrip())
+            self.segments.append(Segment(start + leading, start + leading + len(raw.strip())))
+
+    # ---------------------- HTMLParser ----------------------
+    def handle_data(self, data):
+        self.flush_data()
+        self.pending_data = (self.source_position(), data)
+
+    def handle_starttag(self, tag, attrs):
+        self.flush_data()
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if self.skip_depth:
+            return
+        if self.div_children:
+            self.div_children[-1] = True
+        if tag == "div":
+            self.div_children.append(False)
+        if tag in BLOCK_TAGS:
+            self.end_line()
+            if tag == "pre":
+                self.pre_depth += 1
+        elif tag in OBJECT_TAGS:
+            self.text_parts.append(OBJECT_REPLACEMENT_CHARACTER)
+            self.space_before = False
+
+    def handle_endtag(self, tag):
+        self.flush_data()
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif self.skip_depth:
+            return
+        elif tag == "div":
+            if self.div_children and self.div_children.pop():
+                self.end_line()
+        elif tag in BLOCK_TAGS and tag not in INLINE_END_TAGS:
+            self.end_line()
+            if tag == "pre":
+                self.pre_depth = max(0, self.pre_depth - 1)
+
+    def handle_comment(self, data):
+        self.flush_data()
+
+    def handle_decl(self, decl):
+        self.flush_data()
+
+    def handle_pi(self, data):
+        self.flush_data()
+
+    def unknown_decl(self, data):
+        self.flush_data()
+
+    def close(self):
+        super().close()
+        self.flush_data()
+        self.end_line()
+
+
+class RichTextSourceParser(HTMLParser):
+    """
+    Collects the text of the paragraphs of a Qt rich text document, see saved_html_source
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self.text_parts = None  # Text of the current paragraph, None outside a paragraph
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "p":
+            self.text_parts = []
+
+    def handle_endtag(self, tag):
+        if tag == "p" and self.text_parts is not None:
+            self.paragraphs.append("".join(self.text_parts))
+            self.text_parts = None
+
+    def handle_data(self, data):
+        if self.text_parts is not None:
+            self.text_parts.append(data)
+
+
+def saved_html_source(document):
+    """
+    "Save English html" writes the html editor as a Qt rich text document (QTextEdit.toHtml),
+    in which every line of the html source is a paragraph of (escaped) text.
+    :param document: Content of a saved html file
+    :return: The html source as typed in the html editor, other html is returned unchanged
+    """
+    if QT_RICH_TEXT_MARKER not in document:
+        return document
+    parser = RichTextSourceParser()
+    parser.feed(document)
+    parser.close()
+    return "\n".join(parser.paragraphs)
+
+
+def iter_lines(html, chunk_size=65536):
+    """
+    Streams the translatable lines of html, lines are yielded as soon as they are complete
+    :param html: Original (english) html
+    :param chunk_size: Number of characters parsed at once
+    :return: Generator of Line (text and source segments)
+    """
+    parser = LineParser(html)
+    for position in range(0, len(html), chunk_size):
+        parser.feed(html[position:position + chunk_size])
+        # The last line may still continue in the next chunk
+        completed, parser.lines = parser.lines, []
+        yield from completed
+    parser.close()
+    yield from parser.lines
+
+
+def extract_lines(html):
+    """
+    Extracts the translatable lines from html, the same way as the Translation tab
+    1): Convert the HTML into rich text
+    2): Recognize Line Breaks to create multiple lines
+    3): Remove leading and trailing spaces and skip empty lines
+    :param html: Original (english) html
+    :return: List of English lines
+    """
+    return [line.text for line in iter_lines(html)]
+
+
+def normalize(text):
+    """
+    :param text: English line
+    :return: Key of the line (phrase table, translation memory): lowercase, single spaces, no leading/trailing spaces
+    """
+    return WHITESPACE.sub(' ', text).strip().casefold()
+
+
+def field_names(line):
+    """
+    :param line: English line
+    :return: ILX fields ({#[text]}) within the line, separated by a space. Default value of a Translation.
+    """
+    return ' '.join(FIELD_PATTERN.findall(line))
@@ -0,0 +1,273 @@
+"""
+Full-text search over all notification templates (SQLite FTS5).
+
+Application Translation exports and saved html files are indexed with their rich text lines (the html tags are
+not indexed) and ILX field names. Every indexed file is stored with its size and modification time, updating the
+index only reads the files which changed; folders are scanned for new files.
+
+Query syntax:
+    disclaimer notice       lines containing both words (the last word may be incomplete)
+    "privacy disclaimer"    the exact phrase
+    {#Incident Number}      templates using the ILX field
+"""
+from collections import namedtuple
+from ILX_translator_extract import extract_lines, saved_html_source, FIELD_PATTERN
+from ILX_translator_export import iter_export_rows, is_html, BODY_FIELD, SUBJECT_FIELD
+from ILX_translator_profiling import profiler
+import logging
+import os
+import re
+import sqlite3
+import zipfile
+
+logger = logging.getLogger("ILX_translator_fulltext")
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".ilx_translator", "search_index.sqlite")
+HTML_EXTENSIONS = (".htm", ".html")
+EXPORT_EXTENSIONS = (".xlsx", ".xls")
+LOCALE_PATTERN = re.compile(r'^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})*$')
+FIELD_TOKEN_SEPARATORS = re.compile(r'\W+')
+QUERY_PHRASE = re.compile(r'"([^"]*)"')
+QUERY_WORD = re.compile(r'\w+')
+# Files which can not be read as an export or html: not an export (ValueError, e.g. a Translation template),
+# a damaged workbook (BadZipFile, KeyError), or xlrd not installed (.xls)
+READ_ERRORS = (OSError, UnicodeDecodeError, zipfile.BadZipFile, KeyError, ValueError, ImportError)
+
+# One search result:
+# - document_id: rowid of the document, see SearchIndex.document_html
+# - source: indexed file
+# - record_id: RecordID, or the Notification Template name of a saved html file
+# - locale: locale of the translated html, empty for English
+# - field: "body" (html) or "subject" (subject title)
+# - snippet: matching text, the matches between [ and ]
+SearchHit = namedtuple("SearchHit", ["document_id", "source", "record_id", "locale", "field", "snippet"])
+
+
+def field_tokens(text):
+    """
+    :param text: Line or html
+    :return: One token per ILX field ({#Incident Number} > incident_number), separated by spaces
+    """
+    return " ".join(field_token(field) for field in FIELD_PATTERN.findall(text))
+
+
+def field_token(field):
+    return FIELD_TOKEN_SEPARATORS.sub("_", field[2:-1].strip().casefold()).strip("_")
+
+
+def fts_query(query):
+    """
+    :param query: Search text, see the module docstring
+    :return: FTS5 MATCH expression, None when the query has no words
+    """
+    terms = [f'fields : "{field_token(field)}"' for field in FIELD_PATTERN.findall(query) if field_token(field)]
+    query = FIELD_PATTERN.sub(" ", query)
+    for phrase in QUERY_PHRASE.findall(query):
+        words = QUERY_WORD.findall(phrase)
+        if words:
+            terms.append(f'text : "{" ".join(words)}"')
+    words = QUERY_WORD.findall(QUERY_PHRASE.sub(" ", query))
+    terms.extend(f'text : "{word}"' for word in words[:-1])
+    if words:
+        terms.append(f'text : "{words[-1]}"*')  # Prefix, the user may still be typing
+    return " AND ".join(terms) or None
+
+
+def html_filename_parts(filename):
+    """
+    :param filename: Saved html file, <Notification Template>.html or <Notification Template>_<Locale>.html
+    :return: (Notification Template name, Locale), the locale is empty for English
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    name, _, locale = stem.rpartition("_")
+    if name and LOCALE_PATTERN.match(locale):
+        return name, locale
+    return stem, ""
+
+
+def export_documents(filename):
+    """
+    :param filename: Application Translation export
+    :return: Generator of (RecordID, Locale, field, value), the English values once per RecordID and field
+    """
+    english_seen = set()
+    for record_id, locale, english, translated in iter_export_rows(filename):
+        if not record_id:
+            continue
+        field = BODY_FIELD if is_html(english) else SUBJECT_FIELD
+        if english and (record_id, field) not in english_seen:
+            english_seen.add((record_id, field))
+            yield record_id, "", field, english
+        if translated and locale:
+            yield record_id, locale, field, translated
+
+
+class SearchIndex:
+    """
+    On-disk full-text index (SQLite FTS5) of the notification templates in exports and html files.
+    Like the translation memory, a connection is used by one thread: background tasks open their own SearchIndex.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        """
+        :param path: SQLite database file, created when it does not exist. ":memory:" for a temporary index.
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                documents INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS folders (
+                path TEXT PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                locale TEXT NOT NULL,
+                field TEXT NOT NULL,
+                html TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS documents_source ON documents (source);
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5 (
+                text, fields, tokenize = "unicode61 tokenchars '_'"
+            );
+        """)
+
+    def close(self):
+        self.connection.close()
+
+    # ---------------------- Indexing ----------------------
+    def add_folder(self, folder):
+        """
+        :param folder: Folder with exports and html files, scanned again by every update
+        """
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO folders VALUES (?)", (os.path.abspath(folder),))
+
+    def folders(self):
+        return [row[0] for row in self.connection.execute("SELECT path FROM folders ORDER BY path")]
+
+    def sources(self):
+        return [row[0] for row in self.connection.execute("SELECT path FROM sources ORDER BY path")]
+
+    def document_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def update(self, paths=(), progress=None):
+        """
+        Indexes new and changed files, and removes deleted files from the index
+        :param paths: Files and folders to add to the index
+        :param progress: Optional function called as progress(done, total), e.g. Worker.report_progress
+        :return: (number of indexed files, number of removed files)
+        """
+        candidates = set(self.sources())
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                self.add_folder(path)
+            else:
+                candidates.add(path)
+        for folder in self.folders():
+            if os.path.isdir(folder):
+                candidates.update(os.path.join(folder, entry.name) for entry in os.scandir(folder)
+                                  if entry.is_file() and not entry.name.startswith(("~$", "."))
+                                  and entry.name.lower().endswith(HTML_EXTENSIONS + EXPORT_EXTENSIONS))
+
+        indexed = removed = 0
+        with profiler.stage("update search index"):
+            for done, path in enumerate(sorted(candidates), 1):
+                if not os.path.isfile(path):
+                    self.remove_source(path)
+                    removed += 1
+                elif self.update_file(path):
+                    indexed += 1
+                if progress is not None:
+                    progress(done, len(candidates))
+        return indexed, removed
+
+    def update_file(self, path):
+        """
+        :param path: Export or html file
+        :return: True when the file was (re)indexed, False when it did not change since the last update.
+                 A file which cannot be read as an export or html (e.g. a Translation template or a damaged
+                 workbook) is remembered without documents, and indexed again when it changes.
+        """
+        stat = os.stat(path)
+        row = self.connection.execute("SELECT size, mtime FROM sources WHERE path = ?", (path,)).fetchone()
+        if row is not None and tuple(row) == (stat.st_size, stat.st_mtime):
+            return False
+
+        try:
+            if path.lower().endswith(HTML_EXTENSIONS):
+                name, locale = html_filename_parts(path)
+                with open(path, encoding="utf-8-sig", errors="replace") as f:
+                    documents = [(name, locale, BODY_FIELD, saved_html_source(f.read()))]
+            else:
+                documents = list(export_documents(path))
+        except READ_ERRORS as error:
+            logger.info("%s is indexed without documents: %s: %s", path, type(error).__name__, error)
+            documents = []
+
+        with self.connection:
+            self.delete_documents(path)
+            for record_id, locale, field, value in documents:
+                text = "\n".join(extract_lines(value)) if field == BODY_FIELD else value
+                cursor = self.connection.execute("INSERT INTO documents (source, record_id, locale, field, html) "
+                                                 "VALUES (?, ?, ?, ?, ?)", (path, record_id, locale, field, value))
+                self.connection.execute("INSERT INTO documents_fts (rowid, text, fields) VALUES (?, ?, ?)",
+                                        (cursor.lastrowid, text, field_tokens(value)))
+            self.connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                                    (path, stat.st_size, stat.st_mtime, len(documents)))
+        profiler.count("search documents indexed", len(documents))
+        return True
+
+    def delete_documents(self, path):
+        self.connection.execute("DELETE FROM documents_fts WHERE rowid IN "
+                                "(SELECT id FROM documents WHERE source = ?)", (path,))
+        self.connection.execute("DELETE FROM documents WHERE source = ?", (path,))
+
+    def remove_source(self, path):
+        with self.connection:
+            self.delete_documents(path)
+            self.connection.execute("DELETE FROM sources WHERE path = ?", (path,))
+
+    # ---------------------- Searching ----------------------
+    def search(self, query, limit=200):
+        """
+        :param query: Search text, see the module docstring
+        :param limit: Maximum number of hits
+        :return: List of SearchHit, best match first
+        """
+        expression = fts_query(query)
+        if expression is None:
+            return []
+        with profiler.stage("full-text search"):
+            rows = self.connection.execute(
+                "SELECT d.id, d.source, d.record_id, d.locale, d.field, "
+                "       snippet(documents_fts, 0, '[', ']', '...', 16) "
+                "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+                "WHERE documents_fts MATCH ? ORDER BY bm25(documents_fts) LIMIT ?", (expression, limit)).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def document_html(self, document_id):
+        """
+        :return: Indexed html (or subject title) of the document
+        """
+        return self.connection.execute("SELECT html FROM documents WHERE id = ?", (document_id,)).fetchone()[0]
+
+    def record_htmls(self, source, record_id):
+        """
+        :param source: Indexed file
+        :param record_id: RecordID (or Notification Template name) of the file
+        :return: Dictionary { Locale : html } of the body, the English html has an empty locale
+        """
+        return dict(self.connection.execute(
+            "SELECT locale, html FROM documents WHERE source = ? AND record_id = ? AND field = ? ORDER BY id",
+            (source, record_id, BODY_FIELD)))
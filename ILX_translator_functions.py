@@ -1,10 +1,29 @@
-from PyQt5.QtWidgets import QMainWindow, QVBoxLayout, QFileDialog, QLineEdit, QMessageBox, QApplication
-from PyQt5.QtGui import QTextDocument, QTextCursor, QColor, QTextCharFormat
-from PyQt5.QtCore import QSize, QTimer, QFileInfo
+from PyQt5.QtWidgets import QMainWindow, QFileDialog, QMessageBox, QApplication, QTableView, QHeaderView, QLineEdit, \
+    QInputDialog, QLabel, QToolButton, QProgressBar, QComboBox, QAction, QMenu
+from PyQt5.QtCore import Qt, QTimer, QFileInfo, QThreadPool
 from ILX_translator_QT import Ui_ILX_translator_window
-import pandas as pd
+from ILX_translator_engine import generate_html, get_structure, cache_structure
+from ILX_translator_extract import field_names, FIELD_PATTERN
+from ILX_translator_model import TranslationTableModel, TranslationDelegate
+from ILX_translator_memory import TranslationMemory
+from ILX_translator_search import SearchHighlighter
+from ILX_translator_preview import RichTextPreview
+from ILX_translator_excel import sheet_names, iter_template_rows, write_translation_template, \
+    parse_template_filename, template_header, template_locales, write_locale_template, TEMPLATE_TRANSLATION_COLUMN
+from ILX_translator_workers import Worker
+from ILX_translator_profiling import profiler, stats_text
+from ILX_translator_diagnostics import DiagnosticsDialog
+from ILX_translator_cache import structure_cache, generation_cache
+from ILX_translator_export import read_export_index
+from ILX_translator_browser import TemplateBrowserDialog, FullTextSearchDialog
+from ILX_translator_fulltext import SearchIndex
+from ILX_translator_mt import machine_translate, create_provider, load_settings, save_settings, \
+    MachineTranslationCache
+from ILX_translator_project import TemplateSession, PROJECT_EXTENSION, project_template_names, load_template, \
+    save_template
 import re
-import math
+import os
+import difflib
 
 
 def messagebox(errortype, text, info):
@@ -17,6 +36,96 @@ def messagebox(errortype, text, info):
     return None
 
 
+# ---------------------- Background tasks (see MyMainWindow.start_worker) ----------------------
+# Run on a QThreadPool thread: no widgets are used, the results are applied on the GUI thread
+
+def read_template_rows(worker, filename, sheet_name, columns, chunk_size=500):
+    """
+    :return: Hands the rows of the Translation template to the GUI thread in chunks of (English, *columns)
+    """
+    with profiler.stage("import template"):
+        chunk = []
+        for number, row in enumerate(iter_template_rows(filename, sheet_name, columns), start=1):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                worker.report_partial(chunk)
+                worker.report_progress(number)
+                chunk = []
+        worker.report_partial(chunk)
+
+
+def export_translation_template(worker, filename, translation_dicts):
+    # Cancelling stops writing the rows, the workbook is then not saved
+    with profiler.stage("export template"):
+        if len(translation_dicts) > 1:  # English and one column per locale
+            write_locale_template(filename, translation_dicts, progress=worker.report_progress)
+        else:
+            translation_dict, = translation_dicts.values()
+            write_translation_template(filename, translation_dict, progress=worker.report_progress)
+
+
+def generate_translations(worker, html, translation_dicts):
+    """
+    :return: Dictionary { Locale : Translated html }.
+             The html is extracted once, its TemplateStructure is shared by every locale (see get_structure)
+    """
+    translated_htmls = {}
+    for number, (locale, translation_dict) in enumerate(translation_dicts.items()):
+        worker.report_progress(number, len(translation_dicts))
+        translated_htmls[locale] = generate_html(html, translation_dict)
+    return translated_htmls
+
+
+def index_export(worker, filename):
+    """
+    :return: ExportIndex of the Application Translation export, see ILX_translator_export
+    """
+    return read_export_index(filename, progress=worker.report_progress)
+
+
+def update_search_index(worker, path, paths):
+    """
+    :return: (number of indexed files, number of removed files), see ILX_translator_fulltext.SearchIndex.update
+    """
+    search_index = SearchIndex(path)  # The connection of the GUI thread can not be used on this thread
+    try:
+        return search_index.update(paths, progress=worker.report_progress)
+    finally:
+        search_index.close()
+
+
+def machine_translate_columns(worker, settings, requests):
+    """
+    :param settings: Machine translation settings, see ILX_translator_mt.load_settings
+    :param requests: Dictionary { Translation column : (Locale, English lines) }
+    :return: Dictionary { Translation column : MachineTranslationResult }
+    """
+    provider = create_provider(settings)
+    cache = MachineTranslationCache()  # The cache is opened on this thread
+    try:
+        total = sum(len(lines) for locale, lines in requests.values())
+        results = {}
+        offset = 0
+        for column, (locale, lines) in requests.items():
+            results[column] = machine_translate(
+                lines, locale, provider, cache,
+                progress=lambda done, count: worker.report_progress(offset + done * len(lines) // count, total))
+            offset += len(lines)
+        return results
+    finally:
+        cache.close()
+
+
+def save_project_template(worker, filename, session):
+    with profiler.stage("save project"):
+        save_template(filename, session)
+
+
+def load_project_template(worker, filename, name):
+    with profiler.stage("open project"):
+        return load_template(filename, name)
+
+
 class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
     # Define the shared maximum_lineEdit_width as a class-level variable
     maximum_lineEdit_width = 500
@@ -25,10 +134,44 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
         super().__init__(parent)
         self.setupUi(self)
 
-        # self.label_text_over_500px.hide()
-        # Creating callable layouts to add and delete lineEdits in
-        self.layout_eng = QVBoxLayout(self.groupBox_eng_values)
-        self.layout_trans = QVBoxLayout(self.groupBox_trans_values)
+        # Translation tab: English/Translation grid, replaces the scroll area with a LineEdit per line.
+        # The table view only paints the visible rows, so large templates stay responsive.
+        self.translation_model = TranslationTableModel(self)
+        self.tableView_translations = QTableView(self.tab_translations)
+        self.tableView_translations.setModel(self.translation_model)
+        self.tableView_translations.setItemDelegate(TranslationDelegate(self.maximum_lineEdit_width, self))
+        self.tableView_translations.setWordWrap(False)
+        self.tableView_translations.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tableView_translations.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # Uniform row heights
+        self.tableView_translations.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 8)
+        self.gridLayout.replaceWidget(self.scrollArea_translation_lineEdits, self.tableView_translations)
+        self.scrollArea_translation_lineEdits.hide()
+
+        # Locale of the translation, used by the translation memory.
+        # Set automatically when a template named <RecordID>_<Locale>.xlsx is imported.
+        # Multiple locales separated by commas (e.g. "fr-FR, de-DE") give one Translation column per locale
+        self.lineEdit_locale = QLineEdit(self.groupBox_notification_template)
+        self.lineEdit_locale.setPlaceholderText("Locale(s), e.g. fr-FR or fr-FR, de-DE")
+        self.lineEdit_locale.setMaximumWidth(250)
+        self.gridLayout_2.addWidget(self.lineEdit_locale, 0, 1, 1, 1)
+        self.lineEdit_locale.editingFinished.connect(self.lineEdit_locale_changed)
+
+        # Translation memory: pre-fills known translations, and suggests similar ones in the tooltip
+        self._translation_memory = None  # Opened on first use, see translation_memory
+        self.translation_model.default_translation = self.default_translation
+        self.translation_model.suggestions = self.translation_suggestions
+        # Imported templates are streamed into the model, the read rows are added to the translation memory
+        self.translation_model.rows_fetched.connect(self.translation_rows_fetched)
+
+        # Extracting is triggered when the user has stopped typing in the English html, not on every keystroke
+        self.extract_timer_eng = QTimer(self, interval=300, singleShot=True)
+        self.extract_timer_eng.timeout.connect(self.extract_translation_lines)
+
+        # Rich text previews are rendered on the thread pool when the user has stopped typing in the html
+        self.preview_eng = RichTextPreview(self.textEdit_eng, self.textEdit_eng_rich_text,
+                                           "rich text preview (English)", parent=self)
+        self.preview_trans = RichTextPreview(self.textEdit_trans, self.textEdit_trans_rich_text,
+                                             "rich text preview (Translated)", parent=self)
 
         # ---------------------------------------------------------------
         # ---------------------- SEARCHBAR METHODS ----------------------
@@ -41,6 +184,121 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
         self.search_timer_trans = QTimer(self, interval=1000)
         self.search_timer_trans.timeout.connect(self.search_and_highlight_trans)
 
+        # Highlighting through extra selections, with match count and previous/next buttons next to the Search Bar
+        self.search_highlighter_eng = self.add_search_navigation(self.gridLayout_6, self.lineEdit_search_eng,
+                                                                 self.textEdit_eng)
+        self.search_highlighter_trans = self.add_search_navigation(self.gridLayout_7, self.lineEdit_search_trans,
+                                                                   self.textEdit_trans)
+
+        # Generated html of every locale, the locale box next to the Search Bar selects the shown html
+        self.translated_htmls = {}  # Locale : Translated html
+        self.comboBox_translated_locale = QComboBox(self.page_trans_html, toolTip="Locale of the translated html")
+        self.comboBox_translated_locale.hide()
+        self.comboBox_translated_locale.currentTextChanged.connect(self.comboBox_translated_locale_changed)
+        self.gridLayout_7.addWidget(self.comboBox_translated_locale, 0, 4, 1, 1)
+        self.gridLayout_7.removeWidget(self.textEdit_trans)
+        self.gridLayout_7.addWidget(self.textEdit_trans, 1, 0, 1, 5)
+        self.actionSave_translated_html = QAction("Save translated html (all locales)", self)
+        self.actionSave_translated_html.triggered.connect(self.Save_translated_html_triggered)
+        self.menuFile.addAction(self.actionSave_translated_html)
+
+        # Project files: the English html, Translation tab and generated html of one or more templates
+        self.project_filename = None
+        self.actionOpen_project = QAction("Open project...", self)
+        self.actionOpen_project.triggered.connect(self.Open_project_triggered)
+        self.actionSave_project = QAction("Save project...", self)
+        self.actionSave_project.triggered.connect(self.Save_project_triggered)
+        self.menuFile.addSeparator()
+        self.menuFile.addAction(self.actionOpen_project)
+        self.menuFile.addAction(self.actionSave_project)
+
+        # Application Translation export: indexed by RecordID once, templates are picked from the index
+        self.export_index = None  # ExportIndex of the opened export
+        self.actionOpen_export = QAction("Open Application Translation export...", self)
+        self.actionOpen_export.triggered.connect(self.Open_export_triggered)
+        self.actionBrowse_export = QAction("Browse export templates...", self, enabled=False)
+        self.actionBrowse_export.triggered.connect(self.Browse_export_triggered)
+        self.menuFile.addSeparator()
+        self.menuFile.addAction(self.actionOpen_export)
+        self.menuFile.addAction(self.actionBrowse_export)
+
+        # Full-text search over all indexed exports and html files, in every locale
+        self._search_index = None  # Opened on first use, see search_index
+        self.search_dialog = None  # Created on first use
+        self.actionSearch_templates = QAction("Search all templates...", self, shortcut="Ctrl+Shift+F")
+        self.actionSearch_templates.triggered.connect(self.Search_templates_triggered)
+        self.menuFile.addAction(self.actionSearch_templates)
+
+        # Machine translation drafts of the rows which are not translated yet, see ILX_translator_mt
+        self.menuMachine_translation = QMenu("Machine translation", self.menubar)
+        self.actionMachine_translate = self.menuMachine_translation.addAction("Draft untranslated rows")
+        self.actionMachine_translate.setShortcut("Ctrl+M")
+        self.actionMachine_translate.triggered.connect(self.Machine_translate_triggered)
+        self.actionMachine_translation_service = self.menuMachine_translation.addAction("Service...")
+        self.actionMachine_translation_service.triggered.connect(self.Machine_translation_service_triggered)
+
+        # Diagnostics: stage timings and counters (see ILX_translator_profiling), and an optional cProfile capture.
+        # The last finished stage is shown in the status bar
+        self.diagnostics_dialog = None  # Created on first use
+        self.menuDiagnostics = QMenu("Diagnostics", self.menubar)
+        self.menubar.insertMenu(self.menuAbout.menuAction(), self.menuMachine_translation)
+        self.menubar.insertMenu(self.menuAbout.menuAction(), self.menuDiagnostics)
+        self.actionDiagnostics = self.menuDiagnostics.addAction("Show timings and counters...")
+        self.actionDiagnostics.triggered.connect(self.Diagnostics_triggered)
+        self.actionProfile = self.menuDiagnostics.addAction("Profile with cProfile")
+        self.actionProfile.setCheckable(True)
+        self.actionProfile.toggled.connect(self.Profile_toggled)
+        self.label_last_stage = QLabel(self.statusbar)
+        self.statusbar.addPermanentWidget(self.label_last_stage)
+        self.last_stage_timer = QTimer(self, interval=500)
+        self.last_stage_timer.timeout.connect(self.show_last_stage)
+        self.last_stage_timer.start()
+
+        # ---------------------------------------------------------------
+        # ---------------------- BACKGROUND TASKS -----------------------
+        # ---------------------------------------------------------------
+
+        # Import, export and generate run on the thread pool, the window keeps painting and responding.
+        # The progress and a Cancel button are shown in the status bar while a task is running
+        self.thread_pool = QThreadPool.globalInstance()
+        self.workers = {}  # Running Worker by task name
+        self.import_backup = None  # Locale box, locales and rows of the Translation tab before the running import
+        self.progressBar_worker = QProgressBar(self.statusbar)
+        self.progressBar_worker.setMaximumWidth(200)
+        self.button_cancel_worker = QToolButton(self.statusbar, text="Cancel", toolTip="Cancel the running task")
+        self.button_cancel_worker.clicked.connect(self.cancel_workers)
+        self.statusbar.addPermanentWidget(self.progressBar_worker)
+        self.statusbar.addPermanentWidget(self.button_cancel_worker)
+        self.progressBar_worker.hide()
+        self.button_cancel_worker.hide()
+
+    def add_search_navigation(self, gridLayout, lineEdit, textEdit):
+        """
+        :param gridLayout: Layout of the toolBox page with the Search Bar (row 0) and html textEdit (row 1)
+        :param lineEdit: Searchbar for English and Translation
+        :param textEdit: HTML textEdit for English and Translation
+        :return: SearchHighlighter of the textEdit
+        """
+        highlighter = SearchHighlighter(textEdit, self)
+        label_matches = QLabel(self)
+        label_matches.setMinimumWidth(label_matches.fontMetrics().horizontalAdvance("0000/0000"))
+        button_previous = QToolButton(self, text="\u25b2", toolTip="Previous match (Shift+Enter)")
+        button_next = QToolButton(self, text="\u25bc", toolTip="Next match (Enter)")
+        gridLayout.addWidget(label_matches, 0, 1, 1, 1)
+        gridLayout.addWidget(button_previous, 0, 2, 1, 1)
+        gridLayout.addWidget(button_next, 0, 3, 1, 1)
+        gridLayout.removeWidget(textEdit)
+        gridLayout.addWidget(textEdit, 1, 0, 1, 4)  # Span the textEdit below the search controls
+
+        button_previous.clicked.connect(highlighter.previous_match)
+        button_next.clicked.connect(highlighter.next_match)
+        lineEdit.returnPressed.connect(
+            lambda: highlighter.previous_match() if QApplication.keyboardModifiers() & Qt.ShiftModifier
+            else highlighter.next_match())
+        highlighter.matches_changed.connect(
+            lambda current, count: label_matches.setText(f"{current}/{count}" if lineEdit.text() else ""))
+        return highlighter
+
     def lineEdit_search_eng_changed(self):
         # Triggered when search bar above english html is changed.
         # Starts the respective timer.
@@ -59,34 +317,100 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
     def search_and_highlight_eng(self):
         # On timer.timeout (interval set in __init__)
         # triggers the search_and_highlight method with the respective input (lineEdit) and output (textEdit)
-        self.search_and_highlight(self.lineEdit_search_eng, self.textEdit_eng, self.search_timer_eng)
+        self.search_and_highlight(self.lineEdit_search_eng, self.search_highlighter_eng, self.search_timer_eng)
 
     def search_and_highlight_trans(self):
         # On timer.timeout (interval set in __init__)
         # triggers the search_and_highlight method with the respective input (lineEdit) and output (textEdit)
-        self.search_and_highlight(self.lineEdit_search_trans, self.textEdit_trans, self.search_timer_trans)
+        self.search_and_highlight(self.lineEdit_search_trans, self.search_highlighter_trans, self.search_timer_trans)
 
-    def search_and_highlight(self, lineEdit, textEdit, timer):
+    def search_and_highlight(self, lineEdit, highlighter, timer):
         """
         :param lineEdit: Searchbar for English and Translation
-        :param textEdit: HTML textEdit for English and Translation
+        :param highlighter: SearchHighlighter of the HTML textEdit for English and Translation
         :param timer:  Timeout timer for English and Translation searchbar
         :return: text within lineEdit (searchbar) is highlighted yellow in textEdit (html text)
         """
         timer.stop()
-        words = lineEdit.text()  # Search bar text
-        format = QTextCharFormat()
-        format.setBackground(QColor("white"))
-        cursor = textEdit.textCursor()
-        cursor.select(QTextCursor.Document)
-        cursor.mergeCharFormat(format)
-
-        if words:
-            cursor = textEdit.document().find(words)
-            format.setBackground(QColor("yellow"))
-            while not cursor.isNull():
-                cursor.mergeCharFormat(format)
-                cursor = textEdit.document().find(words, cursor)
+        highlighter.set_term(lineEdit.text())  # Search bar text
+
+    # --------------------------------------------------------------
+    # ---------------------- BACKGROUND TASKS ----------------------
+    # --------------------------------------------------------------
+    def start_worker(self, name, label, function, *args, finished=None, partial=None, aborted=None):
+        """
+        :param name: Task name, a running task with the same name is cancelled (e.g. importing another template)
+        :param label: Description of the task in the status bar and error message
+        :param function: Called on a thread pool thread as function(worker, *args), see ILX_translator_workers.Worker
+        :param finished: Called on the GUI thread with the result of the function
+        :param partial: Called on the GUI thread with every Worker.report_partial value
+        :param aborted: Called on the GUI thread when the task is cancelled or failed,
+                        unless it was replaced by a newer task or detached (see detach_worker)
+        :return: Worker
+        """
+        if name in self.workers:
+            self.workers[name].cancel()
+        worker = Worker(function, *args)
+        self.workers[name] = worker
+
+        def current():
+            # Signals of a cancelled or replaced task may still be queued, they are ignored
+            return self.workers.get(name) is worker and not worker.is_cancelled()
+
+        if partial is not None:
+            worker.signals.partial.connect(lambda value: current() and partial(value))
+        # The done message first, so the finished method can show a more specific message
+        worker.signals.finished.connect(lambda result: current() and self.statusbar.showMessage(f"{label}: done", 3000))
+        if finished is not None:
+            worker.signals.finished.connect(lambda result: current() and finished(result))
+        if aborted is not None:
+            worker.signals.failed.connect(lambda message: self.workers.get(name) is worker and aborted())
+            worker.signals.cancelled.connect(lambda: self.workers.get(name) is worker and aborted())
+        worker.signals.failed.connect(lambda message: messagebox("Error", f"{label} failed", message))
+        worker.signals.cancelled.connect(lambda: self.statusbar.showMessage(f"{label}: cancelled", 3000))
+        worker.signals.progress.connect(lambda done, total: current() and self.worker_progress(done, total))
+        worker.signals.done.connect(lambda: self.worker_done(name, worker))
+
+        self.statusbar.showMessage(f"{label}...")
+        self.progressBar_worker.setRange(0, 0)  # Busy indicator until the first progress
+        self.progressBar_worker.show()
+        self.button_cancel_worker.show()
+        self.thread_pool.start(worker)
+        return worker
+
+    def worker_progress(self, done, total):
+        """
+        :param done: Number of processed items
+        :param total: Total number of items, 0 = unknown (busy indicator)
+        """
+        self.progressBar_worker.setRange(0, total)
+        self.progressBar_worker.setValue(done)
+
+    def worker_done(self, name, worker):
+        if self.workers.get(name) is worker:
+            del self.workers[name]
+        # The template is complete when the import is done, before that there is nothing to export or generate
+        importing = "import" in self.workers
+        self.pushButton_export.setEnabled(not importing)
+        self.pushButton_generate.setEnabled(not importing)
+        self.actionSave_project.setEnabled(not importing)
+        if not self.workers:
+            self.progressBar_worker.hide()
+            self.button_cancel_worker.hide()
+
+    def cancel_workers(self):
+        for worker in self.workers.values():
+            worker.cancel()
+
+    def detach_worker(self, name):
+        """
+        :param name: Task name
+        :return: Cancels the running task, without calling its aborted method (e.g. its rows are replaced anyway)
+        """
+        worker = self.workers.pop(name, None)
+        if worker is not None:
+            worker.cancel()
+            self.worker_done(name, worker)
 
     # --------------------------------------------------------------
     # ---------------------- MENU BAR METHODS ----------------------
@@ -97,16 +421,276 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
                                                   "Hypertext Markup Language (*.htm *html);;"
                                                   "All files (*.*)")
         if filename:
-            html = self.textEdit_eng.toHtml()
-            with open(filename, 'w') as f:
+            html = self.textEdit_eng.toHtml()  # Qt rich text, declared as UTF-8
+            with open(filename, 'w', encoding='utf-8') as f:
                 f.write(html)
 
+    def Save_translated_html_triggered(self):
+        # Saves the generated html of every locale as <Notification Template>_<Locale>.html
+        if not self.translated_htmls:
+            messagebox("No translated html", "Warning: No translated html",
+                       "Press \"Generate HTML\" first, the generated html of every locale is saved.")
+            return
+        folder = QFileDialog.getExistingDirectory(self, "Save translated html in folder")
+        if folder:
+            name = self.lineEdit_notification_template.text() or "Notification"
+            for locale, html in self.translated_htmls.items():
+                filename = os.path.join(folder, f"{name}_{locale}.html" if locale else f"{name}.html")
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(html)
+
+    def Save_project_triggered(self):
+        """
+        Saves the current template (English html, extracted lines, Translation tab and generated html) into a project.
+        A template with the same Notification Template name is replaced, other templates in the project are kept.
+        """
+        filename, _ = QFileDialog.getSaveFileName(self, "Save project",
+                                                  self.project_filename or self.lineEdit_notification_template.text(),
+                                                  f"ILX translator project (*{PROJECT_EXTENSION})")
+        if filename:
+            if not filename.lower().endswith(PROJECT_EXTENSION):
+                filename += PROJECT_EXTENSION
+            self.start_worker("save project", "Saving project", save_project_template, filename,
+                              self.template_session(),
+                              finished=lambda result: setattr(self, "project_filename", filename))
+
+    def Open_project_triggered(self):
+        """
+        Opens a template of a project, the user selects the template when the project has multiple templates.
+        The extracted lines are restored from the project, the English html is not extracted again.
+        """
+        filename, _ = QFileDialog.getOpenFileName(self, "Open project", "",
+                                                  f"ILX translator project (*{PROJECT_EXTENSION});;All files (*.*)")
+        if not filename:
+            return
+        try:
+            names = project_template_names(filename)
+        except (OSError, ValueError, KeyError) as error:
+            messagebox("Error", "Opening project failed", str(error))
+            return
+        if not names:
+            return
+        name = names[0]
+        if len(names) > 1:
+            name, ok = QInputDialog.getItem(self, "Select Template", "Notification template:", names, 0, False)
+            if not ok:
+                return
+        self.start_worker("open project", "Opening project", load_project_template, filename, name,
+                          finished=lambda session: self.open_template_session(filename, session))
+
+    def Open_export_triggered(self):
+        # Indexes the export on the thread pool, the template picker is shown when it is indexed
+        filename, _ = QFileDialog.getOpenFileName(self, "Open Application Translation export", "",
+                                                  "Excel (*.xlsx *.xls);;All files (*.*)")
+        if filename:
+            self.start_worker("export index", "Indexing Application Translation export", index_export, filename,
+                              finished=self.export_indexed)
+
+    def export_indexed(self, export_index):
+        self.export_index = export_index
+        self.actionBrowse_export.setEnabled(True)
+        self.Browse_export_triggered()
+
+    def Browse_export_triggered(self):
+        if self.export_index is None:
+            return
+        dialog = TemplateBrowserDialog(self.export_index, self)
+        if dialog.exec() == TemplateBrowserDialog.Accepted:
+            self.open_export_record(dialog.selected_record())
+
+    def open_export_record(self, record):
+        """
+        Step 1 and 3 of the instructions, without copying the html by hand
+        :param record: ExportRecord (see ILX_translator_export) of the picked notification template
+        """
+        self.open_template(record.record_id, record.english_html, record.translated_htmls())
+
+    def open_template(self, name, english_html, translated_htmls):
+        """
+        :param name: Notification Template name (RecordID)
+        :param english_html: English html
+        :param translated_htmls: Dictionary { Locale : Translated html } of the existing translations
+        :return: Sets the English html, and shows the translated html of every locale.
+                 The translated locales get a Translation column, pre-filled by the translation memory.
+        """
+        self.detach_worker("import")  # The imported rows would be mixed with the rows of the template
+        self.lineEdit_notification_template.setText(name)
+        self.lineEdit_locale.setText(", ".join(translated_htmls))
+        self.translation_model.clear()
+        self.translation_model.set_locales(list(translated_htmls) if len(translated_htmls) > 1 else [])
+        self.textEdit_eng.setPlainText(english_html)
+        self.show_translated_htmls(translated_htmls)
+
+    def Machine_translation_service_triggered(self):
+        """
+        :return: True when the URL of the machine translation service is set (HttpJsonProvider)
+        """
+        settings = load_settings()
+        url, ok = QInputDialog.getText(self, "Machine translation service",
+                                       "URL of the translation service (JSON, see ILX_translator_mt):",
+                                       text=settings.get("url", ""))
+        if not ok or not url.strip():
+            return False
+        settings.update(provider=settings.get("provider", "http"), url=url.strip())
+        save_settings(settings)
+        return True
+
+    def Machine_translate_triggered(self):
+        # Sends the untranslated lines of every Translation column to the machine translation service
+        settings = load_settings()
+        if not settings and not self.Machine_translation_service_triggered():
+            return
+        requests = {}
+        for column in self.translation_model.translation_columns():
+            locale = self.translation_model.column_locale(column) or self.locale()
+            if not locale:
+                messagebox("No locale", "Warning: No locale",
+                           "Set the locale of the translation, e.g. fr-FR, before machine translating.")
+                return
+            lines = self.translation_model.untranslated_lines(column)
+            if lines:
+                requests[column] = (locale, lines)
+        if not requests:
+            self.statusbar.showMessage("Machine translation: every row is translated", 3000)
+            return
+        self.start_worker("machine translation", "Machine translating", machine_translate_columns,
+                          load_settings(), requests, finished=self.machine_translations_fetched)
+
+    def machine_translations_fetched(self, results):
+        """
+        :param results: Dictionary { Translation column : MachineTranslationResult }
+        :return: Fills the rows which are still not translated, the drafts should be reviewed before generating
+        """
+        filled = sum(self.translation_model.fill_translations(column, result.translations)
+                     for column, result in results.items())
+        cached = sum(result.cached for result in results.values())
+        self.statusbar.showMessage(f"Machine translation: {filled} rows drafted ({cached} from cache)", 5000)
+        errors = [error for result in results.values() for error in result.errors]
+        if errors:
+            messagebox("Machine translation", f"{len(errors)} machine translation error(s)",
+                       "\n".join(errors[:20]))
+
+    @property
+    def search_index(self):
+        # The index is opened on first use, not at start-up
+        if self._search_index is None:
+            self._search_index = SearchIndex()
+        return self._search_index
+
+    def Search_templates_triggered(self):
+        if self.search_dialog is None:
+            self.search_dialog = FullTextSearchDialog(self.search_index, self)
+            self.search_dialog.update_requested.connect(self.update_search_index)
+            self.search_dialog.hit_opened.connect(self.open_search_hit)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+
+    def update_search_index(self, paths):
+        """
+        :param paths: Files and folders to add, the indexed files are updated as well
+        """
+        self.start_worker("search index", "Updating search index", update_search_index, self.search_index.path,
+                          paths, finished=self.search_dialog.indexed)
+
+    def open_search_hit(self, hit):
+        """
+        :param hit: SearchHit of the full-text search (see ILX_translator_fulltext)
+        :return: Opens the template of the hit, and highlights the match with the Search Bars
+        """
+        translated_htmls = self.search_index.record_htmls(hit.source, hit.record_id)
+        english_html = translated_htmls.pop("", None)
+        if english_html is not None:
+            self.open_template(hit.record_id, english_html, translated_htmls)
+        else:  # A saved translated html file, without English html
+            self.show_translated_htmls(translated_htmls)
+        if hit.locale in translated_htmls:
+            self.comboBox_translated_locale.setCurrentText(hit.locale)
+
+        fields = FIELD_PATTERN.findall(self.search_dialog.lineEdit_search.text())
+        match = re.search(r'\[(.+?)\]', hit.snippet)
+        term = fields[0] if fields else match.group(1) if match else ""
+        self.lineEdit_search_eng.setText(term)
+        self.lineEdit_search_trans.setText(term)
+        self.search_and_highlight_eng()
+        self.search_and_highlight_trans()
+        self.tabWidget.setCurrentWidget(self.tab_html)
+
+    def template_session(self):
+        """
+        :return: TemplateSession of the current template, see ILX_translator_project
+        """
+        if self.extract_timer_eng.isActive():  # English html changed, but the rows are not updated yet
+            self.extract_translation_lines()
+        return TemplateSession(self.lineEdit_notification_template.text(), self.lineEdit_locale.text(),
+                               list(self.translation_model.locales),
+                               [list(row) for row in self.translation_model.rows], dict(self.translated_htmls),
+                               get_structure(self.textEdit_eng.toPlainText()))
+
+    def open_template_session(self, filename, session):
+        """
+        :param filename: Project file
+        :param session: TemplateSession, loaded from the project
+        :return: Restores the English html, Translation tab and generated html
+        """
+        self.detach_worker("import")  # The imported rows would be mixed with the rows of the project
+        self.project_filename = filename
+        cache_structure(session.structure)  # Lines are restored, extract_translation_lines does not parse the html
+        self.lineEdit_notification_template.setText(session.name)
+        self.lineEdit_locale.setText(session.locale)
+        self.textEdit_eng.setPlainText(session.structure.html)
+        self.extract_timer_eng.stop()
+        self.translation_model.clear()
+        self.translation_model.set_locales(session.locales)
+        self.translation_model.set_rows(session.rows)
+        self.show_translated_htmls(session.translated_htmls)
+
+    def cache_statistics(self):
+        """
+        :return: Hits, misses and items of the caches, added to the diagnostics report
+        """
+        return {"caches": {cache.name: {"hits": cache.hits, "misses": cache.misses, "items": len(cache.items)}
+                           for cache in (structure_cache, generation_cache)}}
+
+    def Diagnostics_triggered(self):
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self.cache_statistics, self)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+
+    def Profile_toggled(self, checked):
+        """
+        :param checked: Starts the cProfile capture, or stops it and saves the profile (.prof, e.g. for snakeviz)
+        """
+        if checked:
+            if not profiler.start_capture():
+                self.statusbar.showMessage("Another profiler is already active", 5000)
+                self.actionProfile.setChecked(False)
+                return
+            self.statusbar.showMessage("Profiling... uncheck Diagnostics > Profile with cProfile to stop", 5000)
+            return
+        stats = profiler.stop_capture()
+        if stats is None:
+            return
+        filename, _ = QFileDialog.getSaveFileName(self, "Save profile", "ilx_translator.prof", "Profile (*.prof)")
+        if filename:
+            stats.dump_stats(filename)
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Profile")
+        msg.setText("Functions with the highest cumulative time, see the details")
+        msg.setDetailedText(stats_text(stats))
+        msg.exec()
+
+    def show_last_stage(self):
+        if profiler.last_stage is not None:
+            name, seconds = profiler.last_stage
+            self.label_last_stage.setText(f"{name}: {seconds * 1000:.1f} ms")
+
     def Import_html_triggered(self):
         filename, _ = QFileDialog.getOpenFileName(self, "Open file", "",
                                                   "Hypertext Markup Language (*.htm *.html);;"
                                                   "All files (*.*)")
         if filename:
-            with open(filename, 'r') as f:
+            with open(filename, 'r', encoding='utf-8-sig', errors='replace') as f:
                 html = f.read()
             self.textEdit_eng.setText(html)
             basename = QFileInfo(filename).baseName()
@@ -116,18 +700,67 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
     # ----------------------TRANSLATION TAB METHODS ----------------------
     # --------------------------------------------------------------------
 
-    def delete_textEdits(self):
+    @property
+    def translation_memory(self):
+        # The database is opened on first use (locale set), not at start-up
+        if self._translation_memory is None:
+            self._translation_memory = TranslationMemory()
+        return self._translation_memory
+
+    def locales(self):
+        return [locale.strip() for locale in self.lineEdit_locale.text().split(",") if locale.strip()]
+
+    def locale(self):
+        """
+        :return: Locale of the (single) Translation column, empty when no or multiple locales are given
+        """
+        locales = self.locales()
+        return locales[0] if len(locales) == 1 else ""
+
+    def default_translation(self, line, locale=None):
+        """
+        :param line: English line
+        :param locale: Locale of the Translation column, None = the current locale
+        :return: Translation memory hit for the locale, otherwise the ILX fields ({#[text]}) of the line
+        """
+        locale = locale or self.locale()
+        if locale:
+            translation = self.translation_memory.lookup(locale, line)
+            if translation is not None:
+                return translation
+        return field_names(line)
+
+    def translation_suggestions(self, line, locale=None):
+        """
+        :param line: English line
+        :param locale: Locale of the Translation column, None = the current locale
+        :return: Translations of similar English lines in the translation memory, for the locale
+        """
+        locale = locale or self.locale()
+        if not locale:
+            return []
+        return self.translation_memory.suggest(locale, line)
+
+    def lineEdit_locale_changed(self):
+        # One Translation column per locale when multiple locales are given.
+        # Pre-fill the rows which are not translated yet with the translation memory of the new locale(s)
+        locales = self.locales()
+        self.translation_model.set_locales(locales if len(locales) > 1 else [])
+        self.translation_model.prefill()
+
+    def translation_rows_fetched(self, rows):
+        for column in self.translation_model.translation_columns():
+            locale = self.translation_model.column_locale(column) or self.locale()
+            if locale:
+                self.translation_memory.add(locale, {row[0]: row[column] for row in rows})
+
+    def clear_translation_rows(self):
         """
         Called from:
-        1) : textEdit_eng_changed > English HTML text is changed
-        2) : button_clicked_import > Translation template file is imported
-        :return: Clear previous LineEdits in both groupBox
+        1) : button_clicked_import > Translation template file is imported
+        :return: Clear previous rows in the Translation tab
         """
-        for groupBox_layout in [self.layout_eng, self.layout_trans]:
-            for i in reversed(range(groupBox_layout.count())):
-                widget = groupBox_layout.itemAt(i).widget()
-                if widget is not None:
-                    widget.deleteLater()
+        self.translation_model.clear()
 
     def button_clicked_export(self):
         # TODO: error message when empty
@@ -136,73 +769,80 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
         This template is meant to be distributed to be translated
         Engine = openpyxl
         Therefore it:
-        1): Creates Dictionary (english:translation) through self.create_dictionary() method
+        1): Creates Dictionary (english:translation) per locale through self.create_dictionaries() method
         2): Sets Default export name equal to the LineEdit above the tab widget
         3): Alters column width so the content fits in the cells
+        4): Writes the workbook on a background thread, with one Translation column per locale
         :return:
         """
-        translation_dict = self.create_dictionary(error=False)
-        df = pd.DataFrame(data=translation_dict.items(), columns=["English", "Translation"])
+        translation_dicts = self.create_dictionaries(error=False)
         export_title = self.lineEdit_notification_template.text()
 
         filename = QFileDialog.getSaveFileName(self, 'Select File', export_title, filter='*.xlsx')
         if filename[0] == '':
             pass
         else:
-            # Create an Excel writer and set the engine to 'openpyxl'
-            excel_writer = pd.ExcelWriter(filename[0], engine='openpyxl')
-
-            # Convert the DataFrame to an Excel sheet
-            df.to_excel(excel_writer, sheet_name='Sheet1', index=False)
-
-            # Access the openpyxl workbook and worksheet objects
-            workbook = excel_writer.book
-            worksheet = excel_writer.sheets['Sheet1']
-
-            # Autofit columns
-            for column in worksheet.columns:
-                max_length = max(len(str(cell.value)) for cell in column)
-                adjusted_width = (max_length + 2) * 1.2  # Add some buffer space
-                worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-
-            workbook.save(filename[0])
-
-            # Close the Excel writer
-            excel_writer.close()
+            # Write-only workbook, column widths are computed from the texts, saved once
+            self.start_worker("export", "Exporting translation template", export_translation_template,
+                              filename[0], translation_dicts)
 
     def button_clicked_import(self):
         """
         Opens Explorer with an Excel Filter
         - This functions imports the Translations from the "button_clicked_export" created template
-        - uses pandas to convert Excel into DataFrame
+        - When the workbook has multiple sheets (e.g. one per template), the user selects the sheet
+        - A multi-locale template (English and one column per locale) fills one Translation column per locale
+        - The rows are streamed (openpyxl read-only) on a background thread, and added to the Translation tab in chunks
 
-        :return: Populates LineEdits in Translation tab
+        :return: Populates rows in Translation tab
         """
         filename = QFileDialog.getOpenFileName(self, 'Open File', "", "Excel (*.xls *.xlsx)")
         if filename[0] == '':  # Does nothing when no file is passed
             pass
         else:
-            df = pd.read_excel(filename[0])
-            self.delete_textEdits()
-            line_num = 1  # Unused counter, to check number of LineEdits created
-
-            # self.label_text_over_500px.hide()
-            for index, row in df.iterrows():
-                eng_text = str(row["English"])
-                trans_text = str(row["Translation"])
-
-                text_edit_eng = AutoResizingLineEdit()  # Resizes LineEdits to contents
-                text_edit_trans = AutoResizingLineEdit()
-
-                text_edit_eng.setText(eng_text)  # Sets text of LineEdit to Excel content Column "English"
-                text_edit_trans.setText(trans_text)
-
-                # if text_edit_eng.width() > self.maximum_lineEdit_width:
-                #     self.label_text_over_500px.show()
-
-                self.layout_eng.addWidget(text_edit_eng)  # Adds LineEdit to QVBoxLayout (groupBox_eng_values)
-                self.layout_trans.addWidget(text_edit_trans)
-                line_num += 1
+            sheet_name = None
+            if not filename[0].lower().endswith(".xls"):
+                names = sheet_names(filename[0])
+                if len(names) > 1:
+                    sheet_name, ok = QInputDialog.getItem(self, "Select Sheet", "Translation template:",
+                                                          names, 0, False)
+                    if not ok:
+                        return
+
+            if self.extract_timer_eng.isActive():  # Pending English html changes are extracted before importing
+                self.extract_translation_lines()
+            if "import" not in self.workers:  # Otherwise the rows before the running import are restored
+                self.import_backup = (self.lineEdit_locale.text(), list(self.translation_model.locales),
+                                      [list(row) for row in self.translation_model.rows])
+            self.clear_translation_rows()
+
+            locales = template_locales(template_header(filename[0], sheet_name))
+            parsed = parse_template_filename(filename[0])  # <RecordID>_<Locale>.xlsx
+            if locales:
+                self.lineEdit_locale.setText(", ".join(locales))
+            elif parsed is not None:
+                self.lineEdit_locale.setText(parsed[1])
+            elif len(self.locales()) > 1:
+                self.lineEdit_locale.clear()
+            self.translation_model.set_locales(locales)
+
+            # Excel content Column "English" and "Translation", or "English" and a column per locale
+            self.pushButton_export.setEnabled(False)
+            self.pushButton_generate.setEnabled(False)
+            self.actionSave_project.setEnabled(False)
+            self.start_worker("import", "Importing translation template", read_template_rows, filename[0], sheet_name,
+                              locales or (TEMPLATE_TRANSLATION_COLUMN,), partial=self.translation_model.append_rows,
+                              aborted=self.restore_import_backup)
+
+    def restore_import_backup(self):
+        """
+        :return: Restores the Translation tab of before a cancelled or failed import,
+                 instead of showing part of the template as if it were the whole template
+        """
+        locale_text, locales, rows = self.import_backup
+        self.lineEdit_locale.setText(locale_text)
+        self.translation_model.set_locales(locales)
+        self.translation_model.set_rows(rows)
 
     # --------------------------------------------------------------
     # ---------------------- HTML TAB METHODS ----------------------
@@ -212,115 +852,133 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
         Method is triggered everytime the text within Self.textEdit_eng is changed.
         This textEdit is meant to give the Original (english) html
         Then it will:
-        1): Convert the HTML into rich text
-        2): Sets rich text in textEdit_eng_rich_text
-        3): Recognize Line Breaks to create multiple LineEdits
-        4): Remove spaces, and recognize text within {# and } (ILX field names)
-        
-        :return: 
-        -Adds Rich text to English LineEdits
-        -Adds ILX field text ({#[text]} to Translation LineEdits
-        """""
-        html = self.textEdit_eng.toPlainText()  # Convert HTML into Rich text
-        self.textEdit_eng_rich_text.setHtml(html)  # Sets rich text in TextEdit
-        document = QTextDocument()
-        document.setHtml(html)
-        rich_text_text = document.toPlainText()  # Get the rich_text HTML text without HTML tags
-
-        # Split lines using re.split() with a pattern that matches different types of line breaks
-        lines = re.split(r'[\r\n]', rich_text_text)
-        self.delete_textEdits()
-
-        line_num = 1
-        # Add new LineEdit widgets to both groupBox and set text
-        # self.label_text_over_500px.hide()
-        for line in lines:
-            line = line.strip()  # Remove leading and trailing spaces
-            if line:
-                # Regular expression pattern to match text within curly braces
-                pattern = r'\{#.*?\}'
-
-                # Find all matches within the line
-                matches = re.findall(pattern, line)
-                concatenated_values = ' '.join(matches)
-
-                text_edit_eng = AutoResizingLineEdit()  # Create AutoResizingLineEdit instance
-                text_edit_trans = AutoResizingLineEdit()  # Create AutoResizingLineEdit instance
-
-                text_edit_eng.setText(line)  # Set text in AutoResizingLineEdit
-                text_edit_trans.setText(concatenated_values)  # Set text in AutoResizingLineEdit
-
-                # if text_edit_eng.width() > 499:
-                #     self.label_text_over_500px.show()
-
-                self.layout_eng.addWidget(text_edit_eng)  # Add AutoResizingLineEdit to layout
-                self.layout_trans.addWidget(text_edit_trans)  # Add AutoResizingLineEdit to layout
-                line_num += 1
+        1): Schedules the rich text preview in textEdit_eng_rich_text (rendered off the GUI thread)
+        2): Starts the extract timer, the Translation tab is updated when the user has stopped typing
+        """
+        self.preview_eng.schedule()
+        self.extract_timer_eng.start()
+
+    def extract_translation_lines(self):
+        """
+        On extract_timer_eng.timeout (interval set in __init__)
+        1): Recognize Line Breaks to create multiple lines
+        2): Remove spaces, and recognize text within {# and } (ILX field names)
+        3): Keeps one row per unique line (phrase), see ILX_translator_engine.PhraseTable
+        4): Compares the lines with the previously extracted lines,
+            only the changed lines are inserted/removed/updated, other rows (and their translation) are kept
+
+        :return:
+        -Adds Rich text to English column
+        -Adds ILX field text ({#[text]} to Translation column
+        """
+        self.extract_timer_eng.stop()
+        html = self.textEdit_eng.toPlainText()
+        # Rich text lines, without HTML tags and empty lines. Cached, so reopening or undo does not extract again.
+        # Repeated lines are shown (and exported) once, their translation is used for every occurrence
+        lines = get_structure(html).unique_lines()
+        with profiler.stage("update Translation tab"):
+            previous_lines = self.translation_model.english_lines()
+
+            matcher = difflib.SequenceMatcher(None, previous_lines, lines, autojunk=False)
+            # Reversed, so the indices of the earlier opcodes remain valid while inserting/removing rows
+            for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+                if tag == 'equal':
+                    continue
+                if tag == 'replace':
+                    # Changed lines: update the existing rows, insert or remove the remainder
+                    updated = min(i2 - i1, j2 - j1)
+                    self.translation_model.update_lines(i1, previous_lines[i1:i1 + updated], lines[j1:j1 + updated])
+                    i1 += updated
+                    j1 += updated
+                if i2 > i1:
+                    self.translation_model.remove_lines(i1, i2)
+                if j2 > j1:
+                    self.translation_model.insert_lines(i1, lines[j1:j2])
 
     def textEdit_html_trans_changed(self):
         """
         Converts translated html into Rich text
         This textEdit allows easy comparison with original,
         and quickly validates if the translation went well
-        :return:  Translated Rich text in textEdit_trans_rich_text
+        :return:  Schedules the translated Rich text in textEdit_trans_rich_text (rendered off the GUI thread)
         """
-        html = self.textEdit_trans.toPlainText()
-        self.textEdit_trans_rich_text.setHtml(html)
+        self.preview_trans.schedule()
 
     # -----------------------------------------------------------------------------
     # ---------------------- REPLACEMENT/TRANSLATION METHODS ----------------------
     # -----------------------------------------------------------------------------
-    def create_dictionary(self, error):
+    def create_dictionaries(self, error):
         """
-        Creates a python Dictionary based from LineEdits in Translation tab.
+        Creates a python Dictionary per Translation column, based from rows in Translation tab.
         Key = English
         [Value] = Translated
-        :return: Dictionary { English : Translation }
+        :return: Dictionary { Locale : { English : Translation } }, one locale per Translation column
         """
-        translation_dict = {}
-        for i in range(self.layout_eng.count()):
-            text_edit_eng = self.layout_eng.itemAt(i).widget()
-            text_edit_trans = self.layout_trans.itemAt(i).widget()
+        if self.extract_timer_eng.isActive():  # English html changed, but the rows are not updated yet
+            self.extract_translation_lines()
+
+        translation_dicts = {}
+        for column in self.translation_model.translation_columns():
+            translation_dict = self.translation_model.translation_dict(column)
+            if error and "" in translation_dict.values():
+                errortype = "Missing Translation"
+                text = "Warning: Missing Translation"
+                info = "In the Translation tab an English value has not been translated.\n" \
+                       "However, you can still proceed, the value will be replaced by a blank."
+                messagebox(errortype, text, info)
+                error = False
+            translation_dicts[self.translation_model.column_locale(column) or self.locale()] = translation_dict
+
+        return translation_dicts
 
-            if text_edit_eng and text_edit_trans:  # Additional check, to see if both items/objects exist
-                eng_text = text_edit_eng.text()
-                trans_text = text_edit_trans.text()
-                if trans_text == "" and error:
-                    errortype = "Missing Translation"
-                    text = "Warning: Missing Translation"
-                    info = "In the Translation tab an English value has not been translated.\n" \
-                           "However, you can still proceed, the value will be replaced by a blank."
-                    messagebox(errortype, text, info)
-                    error = False
-
-                translation_dict[eng_text] = trans_text
-
-        return translation_dict
+    def create_dictionary(self, error):
+        """
+        :return: Dictionary { English : Translation } of the (first) Translation column
+        """
+        return next(iter(self.create_dictionaries(error).values()))
 
     def button_clicked_generate(self):
         # TODO: error message when html eng is empty
         """
-        Method which replaces the english text with the translation text
+        Method which replaces the english text with the translation text, on a background thread
+        Every locale (Translation column) is generated at once
         :return: Creates the translated html and populates in self.textEdit_trans
         """
         html = self.textEdit_eng.toPlainText()
-        cleaned_html = re.sub(' +', ' ', html)  # Removes duplicate/multiple spaces from original html
-        translation_dict = self.create_dictionary(error=True)
-
-        for old_text, new_text in translation_dict.items():
-            # Remove extra whitespace and handle case insensitivity
-            clean_old_text = old_text.strip()
-            pattern = re.compile(re.escape(clean_old_text), re.IGNORECASE | re.DOTALL)
+        translation_dicts = self.create_dictionaries(error=True)
 
-            # Find and skip content between {# and }
-            def replace(match):
-                if match.group(0).startswith("{#") and match.group(0).endswith("}"):
-                    return match.group(0)  # Skip the matched content
-                return new_text
+        # Single splice pass over the text nodes of the html, see ILX_translator_engine.TemplateStructure
+        self.start_worker("generate", "Generating translated html", generate_translations, html, translation_dicts,
+                          finished=lambda translated_htmls: self.translation_generated(translated_htmls,
+                                                                                       translation_dicts))
 
-            cleaned_html = re.sub(pattern, replace, cleaned_html, count=1)
+    def translation_generated(self, translated_htmls, translation_dicts):
+        """
+        :param translated_htmls: Dictionary { Locale : Translated html }, generated by button_clicked_generate
+        :param translation_dicts: Dictionary { Locale : { English : Translation } } of the translated html
+        """
+        # The translation memory (SQLite) is only used on the GUI thread
+        for locale, translation_dict in translation_dicts.items():
+            if locale:
+                self.translation_memory.add(locale, translation_dict)
+        self.show_translated_htmls(translated_htmls)
 
-        self.textEdit_trans.setPlainText(cleaned_html)
+    def show_translated_htmls(self, translated_htmls):
+        """
+        :param translated_htmls: Dictionary { Locale : Translated html }
+        :return: Shows the html of the first locale, the locale box selects the other locales
+        """
+        self.translated_htmls = translated_htmls
+        self.comboBox_translated_locale.blockSignals(True)
+        self.comboBox_translated_locale.clear()
+        self.comboBox_translated_locale.addItems(list(translated_htmls))
+        self.comboBox_translated_locale.blockSignals(False)
+        self.comboBox_translated_locale.setVisible(len(translated_htmls) > 1)
+        self.comboBox_translated_locale_changed(self.comboBox_translated_locale.currentText())
+
+    def comboBox_translated_locale_changed(self, locale):
+        if locale in self.translated_htmls:
+            self.textEdit_trans.setPlainText(self.translated_htmls[locale])
 
     def aboutQT(self):
         msg = QApplication.aboutQt()
@@ -353,7 +1011,9 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
                     <b>1: Find the desired e-mail template in the respective Application Translation Excel export </b><br>
                     In the Application Translate export you can find email template through the RecordID (GUID)
                     You can find this ID either through Inspect, or by creating a Report in Intelex.
-                    Note: it doesnt matter which language you export. <br>
+                    Note: it doesnt matter which language you export.
+                    Or open the export with "File > Open Application Translation export" and search the templates
+                    by RecordID or subject title, the English html is loaded directly (step 3). <br>
                     <b>2: Check the English html and rich text formatting. </b><br>
                     We want to achieve uniform formatting throughout all cultures. 
                     Therefore, you should first double check if the English html has the desired rich text output. 
@@ -401,47 +1061,3 @@ class MyMainWindow(QMainWindow, Ui_ILX_translator_window):
 
         msg.exec()
 
-
-class AutoResizingLineEdit(QLineEdit):
-    """
-    This class Autoresizes the LineEdits in the Translations tab.
-    It uses FontMetrics and SizeHint to calculate the Width and Height of each LineEdit, respectively.
-    """
-    # Use the shared maximum_lineEdit_width from MyMainWindow
-    maximum_lineEdit_width = MyMainWindow.maximum_lineEdit_width
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        self.setMinimumHeight(20)  # Set a minimum height
-        self.setMaximumWidth(self.maximum_lineEdit_width - 2)
-        # Set maximum size 2 below maximum size LineEdit,
-        # keeps sizing sortoff equal while allowing error label to popup
-        self.textChanged.connect(self.updateSize)
-
-    def sizeHint(self):
-        """
-        Calculates the height of the LineEdit based on the Font characteristics
-        :return: In px, the minimal width and height to fit its content.
-        """
-        size_hint = super().sizeHint()
-        content_height = self.fontMetrics().height() + 6  # Add some padding
-        max_size = QSize(self.maximumWidth(), content_height)
-        return size_hint.expandedTo(self.minimumSizeHint()).boundedTo(max_size)
-
-    def updateSize(self):
-        """
-        called from the __init__
-        just uses fontMetrics to calculate the minimum width and height of each LineEdit to fit its contents.
-        :return:
-        """
-        content_width = self.fontMetrics().width(self.text()) + 12  # Add some padding
-
-        if content_width > self.maximum_lineEdit_width:
-            content_width = self.maximum_lineEdit_width
-            self.setStyleSheet("background-color: lightyellow;")
-        else:
-            self.setStyleSheet("")
-        content_height = self.fontMetrics().height() + 6  # Add some padding
-        self.setMinimumWidth(content_width)
-        self.setMinimumHeight(content_height)
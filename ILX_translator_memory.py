@@ -0,0 +1,123 @@
+from ILX_translator_extract import field_names, normalize
+import difflib
+import os
+import sqlite3
+import time
+
+DEFAULT_MEMORY_PATH = os.path.join(os.path.expanduser("~"), ".ilx_translator", "translation_memory.sqlite")
+
+
+def trigrams(key):
+    """
+    :param key: Normalized English line
+    :return: Set of 3-character substrings, used as index for fuzzy lookup
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_translated(english, translation):
+    """
+    A Translation which is empty or still the default value (only the ILX fields) is not stored
+    :return: True when the translation is worth remembering
+    """
+    translation = translation.strip()
+    if not translation:
+        return False
+    return translation != field_names(english) or translation == english.strip()
+
+
+class TranslationMemory:
+    """
+    On-disk translation memory (SQLite), filled with every imported template and generated html.
+    - Exact lookup on the normalized English line and locale
+    - Fuzzy suggestions through a trigram index, ranked with difflib
+    """
+
+    def __init__(self, path=DEFAULT_MEMORY_PATH):
+        """
+        :param path: SQLite database file, created when it does not exist. ":memory:" for a temporary memory.
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS translations (
+                locale TEXT NOT NULL,
+                english_key TEXT NOT NULL,
+                english TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (locale, english_key)
+            );
+            CREATE TABLE IF NOT EXISTS trigrams (
+                locale TEXT NOT NULL,
+                trigram TEXT NOT NULL,
+                english_key TEXT NOT NULL,
+                PRIMARY KEY (locale, trigram, english_key)
+            ) WITHOUT ROWID;
+        """)
+
+    def close(self):
+        self.connection.close()
+
+    def add(self, locale, translation_dict):
+        """
+        :param locale: Locale of the translations, e.g. fr-FR
+        :param translation_dict: Dictionary { English : Translation }
+        :return: Number of stored translations
+        """
+        now = time.time()
+        stored = 0
+        with self.connection:
+            for english, translation in translation_dict.items():
+                if not is_translated(english, translation):
+                    continue
+                key = normalize(english)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                    (locale, key, english.strip(), translation, now))
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO trigrams VALUES (?, ?, ?)",
+                    [(locale, trigram, key) for trigram in trigrams(key)])
+                stored += 1
+        return stored
+
+    def lookup(self, locale, english):
+        """
+        :return: Translation of exactly this English line (ignoring case and spaces), None when unknown
+        """
+        row = self.connection.execute(
+            "SELECT translation FROM translations WHERE locale = ? AND english_key = ?",
+            (locale, normalize(english))).fetchone()
+        return row[0] if row else None
+
+    def suggest(self, locale, english, limit=3, threshold=0.75, candidates=25):
+        """
+        :param locale: Locale of the translations
+        :param english: English line
+        :param limit: Maximum number of suggestions
+        :param threshold: Minimum similarity (0-1) of the English lines
+        :param candidates: Number of lines with the most shared trigrams that are compared with difflib
+        :return: List of (similarity, English, Translation), most similar first
+        """
+        key = normalize(english)
+        query_trigrams = list(trigrams(key))
+        if not query_trigrams:
+            return []
+        placeholders = ",".join("?" * len(query_trigrams))
+        rows = self.connection.execute(
+            f"SELECT t.english_key, t.english, t.translation FROM translations t JOIN ("
+            f"  SELECT english_key, COUNT(*) AS shared FROM trigrams"
+            f"  WHERE locale = ? AND trigram IN ({placeholders})"
+            f"  GROUP BY english_key ORDER BY shared DESC LIMIT ?"
+            f") c ON t.english_key = c.english_key WHERE t.locale = ?",
+            [locale, *query_trigrams, candidates, locale]).fetchall()
+
+        suggestions = []
+        for candidate_key, candidate_english, translation in rows:
+            similarity = difflib.SequenceMatcher(None, key, candidate_key).ratio()
+            if similarity >= threshold:
+                suggestions.append((similarity, candidate_english, translation))
+        suggestions.sort(key=lambda suggestion: suggestion[0], reverse=True)
+        return suggestions[:limit]
@@ -0,0 +1,264 @@
+from PyQt5.QtWidgets import QStyledItemDelegate, QLineEdit
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from ILX_translator_extract import field_names
+
+ENGLISH_COLUMN = 0
+TRANSLATION_COLUMN = 1  # First Translation column, followed by one column per locale in a multi-locale template
+
+
+def default_field_names(line, locale=None):
+    """
+    :return: ILX fields ({#[text]}) of the line, the default Translation of every locale
+    """
+    return field_names(line)
+
+
+class TranslationTableModel(QAbstractTableModel):
+    """
+    English/Translation grid of the Translation tab.
+    Each row is one extracted line: [English, Translation], or [English, Translation locale 1, locale 2, ...]
+    when multiple locales are translated at once (see set_locales).
+    The QTableView only asks for the visible rows, so large templates do not create any widgets.
+    """
+    # Emitted with the list of [English, Translation] rows which have been appended, see append_rows
+    rows_fetched = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        # Locales of the Translation columns, empty = one Translation column (locale of the locale box)
+        self.locales = []
+        # Default Translation of a new line, e.g. a translation memory hit. English line, locale > Translation
+        self.default_translation = default_field_names
+        # Optional fuzzy suggestions shown in the tooltip.
+        # English line, locale > List of (similarity, English, Translation)
+        self.suggestions = None
+
+    @property
+    def headers(self):
+        return ["English"] + (self.locales or ["Translation"])
+
+    def translation_columns(self):
+        return range(TRANSLATION_COLUMN, len(self.headers))
+
+    def column_locale(self, column):
+        """
+        :return: Locale of a Translation column, None when there is a single Translation column
+        """
+        return self.locales[column - TRANSLATION_COLUMN] if self.locales else None
+
+    def default_row(self, line):
+        return [line] + [self.default_translation(line, self.column_locale(column))
+                         for column in self.translation_columns()]
+
+    # ---------------------- QAbstractTableModel ----------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.rows[index.row()][index.column()]
+        if role == Qt.ToolTipRole:
+            return self.tooltip(index)
+        return None
+
+    def tooltip(self, index):
+        """
+        Only computed when the user hovers a cell, so fuzzy suggestions cost nothing for the other rows
+        :return: Cell text, and for the Translation column the suggestions of similar English lines
+        """
+        english = self.rows[index.row()][ENGLISH_COLUMN]
+        text = self.rows[index.row()][index.column()]
+        if index.column() == ENGLISH_COLUMN or self.suggestions is None:
+            return text
+        lines = [text] if text else []
+        for similarity, suggestion_english, suggestion_translation in self.suggestions(
+                english, self.column_locale(index.column())):
+            lines.append(f"{similarity:.0%} - {suggestion_english} > {suggestion_translation}")
+        return "\n".join(lines)
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        self.rows[index.row()][index.column()] = value
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return section + 1  # Line number
+
+    # ---------------------- Translation tab ----------------------
+    def set_rows(self, rows):
+        """
+        :param rows: Iterable of (English, Translation), one Translation per column
+        :return: Replaces all rows, e.g. when a Translation template is imported
+        """
+        self.beginResetModel()
+        self.rows = [list(row) for row in rows]
+        self.endResetModel()
+
+    def set_locales(self, locales):
+        """
+        :param locales: Locales of the Translation columns, empty list = one Translation column
+        :return: Changes the Translation columns. The translations of a locale which remains are kept,
+                 the first column is kept when switching between one and multiple columns.
+                 New columns get the default_translation.
+        """
+        locales = list(locales)
+        if locales == self.locales:
+            return
+        sources = []  # Previous column of every new Translation column, None = new column
+        for number, locale in enumerate(locales or [None]):
+            if locale is not None and locale in self.locales:
+                sources.append(TRANSLATION_COLUMN + self.locales.index(locale))
+            elif number == 0 and not (locales and self.locales):
+                sources.append(TRANSLATION_COLUMN)
+            else:
+                sources.append(None)
+
+        self.beginResetModel()
+        self.locales = locales
+        self.rows = [[row[ENGLISH_COLUMN]] + [row[source] if source is not None
+                                              else self.default_translation(row[ENGLISH_COLUMN], locale)
+                                              for source, locale in zip(sources, locales or [None])]
+                     for row in self.rows]
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """
+        :param rows: List of (English, Translation), e.g. a chunk read by a background worker
+        :return: Adds the rows at the end
+        """
+        rows = [list(row) for row in rows]
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+            self.rows_fetched.emit(rows)
+
+    def clear(self):
+        self.set_rows([])
+
+    def insert_lines(self, index, lines):
+        """
+        :param index: Row at which the lines are inserted
+        :param lines: English lines, the Translation gets the default_translation
+        """
+        if not lines:
+            return
+        self.beginInsertRows(QModelIndex(), index, index + len(lines) - 1)
+        self.rows[index:index] = [self.default_row(line) for line in lines]
+        self.endInsertRows()
+
+    def remove_lines(self, start, end):
+        """
+        :param start: First row to remove
+        :param end: Row after the last row to remove
+        """
+        if end <= start:
+            return
+        self.beginRemoveRows(QModelIndex(), start, end - 1)
+        del self.rows[start:end]
+        self.endRemoveRows()
+
+    def update_lines(self, index, old_lines, new_lines):
+        """
+        :param index: First row to update
+        :param old_lines: Previously extracted English lines
+        :param new_lines: Newly extracted English lines
+        :return: Sets the new English text, the translation is only replaced when it is still the default value
+        """
+        for offset, (old_line, new_line) in enumerate(zip(old_lines, new_lines)):
+            row = self.rows[index + offset]
+            row[ENGLISH_COLUMN] = new_line
+            for column in self.translation_columns():
+                locale = self.column_locale(column)
+                if row[column] == self.default_translation(old_line, locale):  # Not translated yet
+                    row[column] = self.default_translation(new_line, locale)
+        if new_lines:
+            self.dataChanged.emit(self.index(index, ENGLISH_COLUMN),
+                                  self.index(index + len(new_lines) - 1, len(self.headers) - 1))
+
+    def prefill(self):
+        """
+        :return: Sets the default_translation for every row which is not translated yet, e.g. after the locale changed
+        """
+        for column in self.translation_columns():
+            locale = self.column_locale(column)
+            for row in self.rows:
+                if row[column] == field_names(row[ENGLISH_COLUMN]):
+                    row[column] = self.default_translation(row[ENGLISH_COLUMN], locale)
+        if self.rows:
+            self.dataChanged.emit(self.index(0, TRANSLATION_COLUMN),
+                                  self.index(len(self.rows) - 1, len(self.headers) - 1))
+
+    def untranslated_lines(self, column):
+        """
+        :param column: Translation column
+        :return: English lines of the rows which are not translated yet (Translation is only the ILX fields)
+        """
+        return [row[ENGLISH_COLUMN] for row in self.rows if row[column] == field_names(row[ENGLISH_COLUMN])]
+
+    def fill_translations(self, column, translations):
+        """
+        Sets the translations of the rows which are still not translated, e.g. machine translation drafts
+        :param column: Translation column
+        :param translations: Dictionary { English : Translation }
+        :return: Number of filled rows
+        """
+        filled = 0
+        for row in self.rows:
+            english = row[ENGLISH_COLUMN]
+            if english in translations and row[column] == field_names(english):
+                row[column] = translations[english]
+                filled += 1
+        if filled:
+            self.dataChanged.emit(self.index(0, column), self.index(len(self.rows) - 1, column))
+        return filled
+
+    def english_lines(self):
+        return [row[ENGLISH_COLUMN] for row in self.rows]
+
+    def translation_dict(self, column=TRANSLATION_COLUMN):
+        """
+        :param column: Translation column
+        :return: Dictionary { English : Translation } of the column
+        """
+        return {row[ENGLISH_COLUMN]: row[column] for row in self.rows}
+
+
+class TranslationDelegate(QStyledItemDelegate):
+    """
+    Paints and edits the cells of the TranslationTableModel.
+    Text wider than maximum_width is highlighted lightyellow, like the previous AutoResizingLineEdit.
+    Only called for the visible cells.
+    """
+    def __init__(self, maximum_width, parent=None):
+        super().__init__(parent)
+        self.maximum_width = maximum_width
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        content_width = option.fontMetrics.horizontalAdvance(option.text) + 12  # Add some padding
+        if content_width > self.maximum_width:
+            option.backgroundBrush = QColor("lightyellow")
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.setFrame(False)
+        return editor
@@ -0,0 +1,438 @@
+"""
+Machine translation drafts of the Translation tab.
+
+The unique lines of a template are sent to a machine translation provider in batches, several batches at a time
+(asyncio, limited by a semaphore). Failed requests are retried with exponential backoff, and every response is
+stored in a persistent cache, so a line is only requested once per provider and locale.
+
+ILX fields ({#Incident Number}) are masked as <x id="0"/> placeholders before sending, and put back afterwards.
+Lines which only differ in their fields share one request. A translation which lost a placeholder is rejected.
+
+Providers implement MachineTranslationProvider.translate, see HttpJsonProvider and PROVIDERS.
+A stub provider for testing without network:
+    python ILX_translator_mt.py stub [--port 8765] [--fail-rate 0.2] [--delay 0.1]
+and set the service URL to http://127.0.0.1:8765/translate
+"""
+from collections import namedtuple
+from ILX_translator_extract import FIELD_PATTERN
+from ILX_translator_profiling import profiler
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+
+DEFAULT_SETTINGS_PATH = os.path.join(os.path.expanduser("~"), ".ilx_translator", "machine_translation.json")
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".ilx_translator", "machine_translation_cache.sqlite")
+SOURCE_LOCALE = "en"
+PLACEHOLDER = '<x id="{}"/>'
+PLACEHOLDER_PATTERN = re.compile(r'<x\s+id\s*=\s*"(\d+)"\s*/>')
+WORD_PATTERN = re.compile(r'[^\W\d_]')
+
+# Result of machine_translate:
+# - translations: Dictionary { English line : Translation }, without the lines which failed
+# - cached: number of unique texts answered by the cache
+# - requested: number of unique texts sent to the provider
+# - errors: list of error messages of the failed batches and rejected translations
+MachineTranslationResult = namedtuple("MachineTranslationResult", ["translations", "cached", "requested", "errors"])
+
+
+class MachineTranslationError(Exception):
+    """
+    Request rejected by the provider, not retried (e.g. invalid API key)
+    """
+
+
+class TransientError(MachineTranslationError):
+    """
+    Request which may succeed when retried (e.g. timeout, HTTP 429 or 5xx)
+    """
+
+    def __init__(self, message, retry_after=None):
+        """
+        :param retry_after: Seconds to wait before retrying as requested by the provider, None = backoff
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ---------------------- Field masking ----------------------
+
+def mask_fields(line):
+    """
+    :param line: English line
+    :return: (Line with the ILX fields replaced by numbered placeholders, list of the fields)
+    """
+    fields = []
+
+    def placeholder(match):
+        fields.append(match.group())
+        return PLACEHOLDER.format(len(fields) - 1)
+
+    return FIELD_PATTERN.sub(placeholder, line), fields
+
+
+def unmask_fields(text, fields):
+    """
+    :param text: Translation with placeholders
+    :param fields: Fields of the English line, see mask_fields
+    :return: Translation with the ILX fields, None when a placeholder is missing, unknown or repeated
+    """
+    numbers = sorted(int(number) for number in PLACEHOLDER_PATTERN.findall(text))
+    if numbers != list(range(len(fields))):
+        return None
+    return PLACEHOLDER_PATTERN.sub(lambda match: fields[int(match.group(1))], text)
+
+
+def needs_translation(line):
+    """
+    :return: False for a line without words besides its ILX fields (e.g. only a field or a number)
+    """
+    return bool(WORD_PATTERN.search(FIELD_PATTERN.sub("", line)))
+
+
+def make_batches(texts, max_lines, max_characters):
+    """
+    :param texts: Texts to translate
+    :param max_lines: Maximum number of texts per request
+    :param max_characters: Maximum number of characters per request, a longer text gets its own request
+    :return: List of lists of texts
+    """
+    batches = []
+    batch = []
+    characters = 0
+    for text in texts:
+        if batch and (len(batch) >= max_lines or characters + len(text) > max_characters):
+            batches.append(batch)
+            batch = []
+            characters = 0
+        batch.append(text)
+        characters += len(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# ---------------------- Providers ----------------------
+
+class MachineTranslationProvider:
+    """
+    Translates batches of texts. Subclasses implement translate, and are registered in PROVIDERS.
+    """
+    name = "provider"
+    max_batch_lines = 50
+    max_batch_characters = 5000
+
+    def cache_key(self):
+        """
+        :return: Identifies the responses of this provider in the cache, e.g. name and URL
+        """
+        return self.name
+
+    async def translate(self, texts, source_locale, target_locale):
+        """
+        :param texts: Texts with placeholders (see mask_fields)
+        :param source_locale: Locale of the texts
+        :param target_locale: Locale of the translations, e.g. fr-FR
+        :return: List of translations, in the order of the texts.
+                 Raises TransientError for a request which can be retried, MachineTranslationError otherwise.
+        """
+        raise NotImplementedError
+
+
+class HttpJsonProvider(MachineTranslationProvider):
+    """
+    Generic JSON service:
+        POST {"source": "en", "target": "fr-FR", "texts": [...]}
+        200  {"translations": [...]}
+    The requests are sent on threads (urllib), so several batches are in flight at once.
+    """
+    name = "http"
+
+    def __init__(self, url, api_key=None, timeout=30):
+        """
+        :param url: Endpoint of the service
+        :param api_key: Sent as "Authorization: Bearer <api_key>" when given
+        :param timeout: Seconds per request
+        """
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def cache_key(self):
+        return f"{self.name} {self.url}"
+
+    async def translate(self, texts, source_locale, target_locale):
+        return await asyncio.to_thread(self.post, {"source": source_locale, "target": target_locale, "texts": texts})
+
+    def post(self, document):
+        from urllib.request import Request, urlopen
+        from urllib.error import HTTPError, URLError
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = Request(self.url, json.dumps(document).encode("utf-8"), headers, method="POST")
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                translations = json.loads(response.read())["translations"]
+        except HTTPError as error:
+            if error.code == 429 or error.code >= 500:
+                retry_after = error.headers.get("Retry-After")
+                raise TransientError(f"HTTP {error.code} {error.reason}",
+                                     float(retry_after) if retry_after and retry_after.isdigit() else None)
+            raise MachineTranslationError(f"HTTP {error.code} {error.reason}")
+        except (URLError, TimeoutError, ConnectionError) as error:
+            raise TransientError(str(getattr(error, "reason", error)))
+        except (ValueError, KeyError, TypeError) as error:
+            raise MachineTranslationError(f"Invalid response: {error}")
+        if not isinstance(translations, list) or len(translations) != len(document["texts"]):
+            raise MachineTranslationError("Invalid response: expected one translation per text")
+        return [str(translation) for translation in translations]
+
+
+# Provider name : class, created with the settings (see create_provider)
+PROVIDERS = {HttpJsonProvider.name: HttpJsonProvider}
+
+
+def load_settings(path=DEFAULT_SETTINGS_PATH):
+    """
+    :return: Dictionary {"provider": name, **arguments of the provider}, empty when not configured
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_settings(settings, path=DEFAULT_SETTINGS_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+
+
+def create_provider(settings):
+    """
+    :param settings: Dictionary {"provider": name, **arguments of the provider}, see load_settings
+    :return: MachineTranslationProvider
+    """
+    settings = dict(settings)
+    name = settings.pop("provider", HttpJsonProvider.name)
+    if name not in PROVIDERS:
+        raise MachineTranslationError(f"Unknown machine translation provider: {name}")
+    return PROVIDERS[name](**settings)
+
+
+# ---------------------- Cache ----------------------
+
+class MachineTranslationCache:
+    """
+    On-disk cache (SQLite) of the provider responses, by provider, locales and masked text.
+    Like the translation memory, a connection is used by one thread.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        """
+        :param path: SQLite database file, created when it does not exist. ":memory:" for a temporary cache.
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                provider TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (provider, source, target, text)
+            );
+        """)
+
+    def close(self):
+        self.connection.close()
+
+    def get_many(self, provider, source, target, texts):
+        """
+        :return: Dictionary { text : translation } of the cached texts
+        """
+        cached = {}
+        for text in texts:
+            row = self.connection.execute(
+                "SELECT translation FROM responses WHERE provider = ? AND source = ? AND target = ? AND text = ?",
+                (provider, source, target, text)).fetchone()
+            if row:
+                cached[text] = row[0]
+        return cached
+
+    def put_many(self, provider, source, target, translations):
+        """
+        :param translations: Dictionary { text : translation }
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                [(provider, source, target, text, translation, now) for text, translation in translations.items()])
+
+
+# ---------------------- Translation ----------------------
+
+async def translate_with_retry(provider, batch, source_locale, target_locale, semaphore, retries, backoff):
+    """
+    :return: List of translations of the batch. Raises the last error when all attempts failed.
+    """
+    for attempt in range(retries + 1):
+        async with semaphore:
+            try:
+                with profiler.stage("machine translation request"):
+                    return await provider.translate(batch, source_locale, target_locale)
+            except TransientError as error:
+                if attempt == retries:
+                    raise
+                # Exponential backoff with jitter, so retried batches do not hit the provider at the same time
+                delay = error.retry_after if error.retry_after is not None else backoff * 2 ** attempt
+                delay *= 1 + random.random() / 2
+        profiler.count("machine translation retries")
+        await asyncio.sleep(delay)  # Outside the semaphore, other batches are sent meanwhile
+
+
+async def translate_batches(provider, batches, source_locale, target_locale, concurrency, retries, backoff,
+                            on_batch):
+    """
+    Translates the batches concurrently, on_batch(batch, translations or exception) is called as they finish
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(batch):
+        try:
+            return batch, await translate_with_retry(provider, batch, source_locale, target_locale, semaphore,
+                                                     retries, backoff)
+        except MachineTranslationError as error:
+            return batch, error
+
+    for finished in asyncio.as_completed([run(batch) for batch in batches]):
+        on_batch(*await finished)  # May raise (e.g. cancelled), the remaining requests are cancelled
+
+
+def machine_translate(lines, target_locale, provider, cache=None, source_locale=SOURCE_LOCALE, concurrency=4,
+                      retries=3, backoff=0.5, progress=None):
+    """
+    :param lines: English lines, e.g. the untranslated rows of the Translation tab
+    :param target_locale: Locale of the translations, e.g. fr-FR
+    :param provider: MachineTranslationProvider
+    :param cache: Optional MachineTranslationCache, responses are stored as soon as a batch is finished
+    :param source_locale: Locale of the English lines
+    :param concurrency: Maximum number of requests in flight
+    :param retries: Attempts after the first one, for TransientError
+    :param backoff: Seconds before the first retry, doubled for every next retry
+    :param progress: Optional function called as progress(done, total) with the number of texts
+    :return: MachineTranslationResult
+    """
+    masked_lines = {}  # Masked text : [(English line, fields)], lines which only differ in their fields share a text
+    for line in dict.fromkeys(lines):
+        if needs_translation(line):
+            text, fields = mask_fields(line)
+            masked_lines.setdefault(text, []).append((line, fields))
+
+    provider_key = provider.cache_key()
+    responses = cache.get_many(provider_key, source_locale, target_locale, masked_lines) if cache else {}
+    cached = len(responses)
+    missing = [text for text in masked_lines if text not in responses]
+    profiler.count("machine translation cache hits", cached)
+    profiler.count("machine translation texts requested", len(missing))
+    errors = []
+    done = cached
+
+    def on_batch(batch, translations):
+        nonlocal done
+        if isinstance(translations, Exception):
+            errors.append(f"{len(batch)} line(s) failed: {translations}")
+        else:
+            batch_responses = dict(zip(batch, translations))
+            responses.update(batch_responses)
+            if cache:
+                cache.put_many(provider_key, source_locale, target_locale, batch_responses)
+        done += len(batch)
+        if progress is not None:
+            progress(done, len(masked_lines))
+
+    if missing:
+        batches = make_batches(missing, provider.max_batch_lines, provider.max_batch_characters)
+        with profiler.stage("machine translation"):
+            asyncio.run(translate_batches(provider, batches, source_locale, target_locale, concurrency, retries,
+                                          backoff, on_batch))
+
+    translations = {}
+    for text, response in responses.items():
+        for line, fields in masked_lines[text]:
+            translation = unmask_fields(response, fields)
+            if translation is None:
+                errors.append(f"Rejected, ILX fields changed: {line}")
+            else:
+                translations[line] = translation
+    return MachineTranslationResult(translations, cached, len(missing), errors)
+
+
+# ---------------------- Stub provider ----------------------
+
+def stub_server(port=8765, fail_rate=0.0, delay=0.0):
+    """
+    Local HttpJsonProvider service for testing without network: "translates" a text as [<target>] <text>,
+    keeping the placeholders. A fraction of the requests fails with HTTP 503 to exercise the retries.
+    :param port: Port of the service, 0 = any free port (server.server_port)
+    :return: ThreadingHTTPServer, not serving yet (serve_forever)
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            document = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(delay)
+            if random.random() < fail_rate:
+                self.send_error(503, "Stub failure")
+                return
+            body = json.dumps({"translations": [f"[{document['target']}] {text}"
+                                                for text in document["texts"]]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+
+
+def serve_stub(port=8765, fail_rate=0.0, delay=0.0):
+    """
+    Runs the stub service (see stub_server) until Ctrl+C
+    """
+    server = stub_server(port, fail_rate, delay)
+    print(f"Stub translation service on http://127.0.0.1:{server.server_port}/translate (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Machine translation tools of the ILX html Replacer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stub = commands.add_parser("stub", help="Run a local stub translation service")
+    stub.add_argument("--port", type=int, default=8765)
+    stub.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of the requests failing with HTTP 503")
+    stub.add_argument("--delay", type=float, default=0.0, help="Seconds per request")
+    args = parser.parse_args(argv)
+    if args.command == "stub":
+        serve_stub(args.port, args.fail_rate, args.delay)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtCore import QObject, QTimer, QThreadPool
+from ILX_translator_workers import Worker
+from ILX_translator_profiling import profiler
+
+
+def build_preview_document(worker, html, font, stage):
+    """
+    Background task (see ILX_translator_workers.Worker): parses the html into a QTextDocument.
+    The document is created without parent and moved to the GUI thread, so it can be set in the preview.
+    :param html: Html of the preview
+    :param font: Default font of the preview textEdit
+    :param stage: Profiler stage name
+    :return: QTextDocument
+    """
+    with profiler.stage(stage):
+        document = QTextDocument()
+        document.setDefaultFont(font)
+        document.setHtml(html)
+    document.moveToThread(QApplication.instance().thread())
+    return document
+
+
+class RichTextPreview(QObject):
+    """
+    Rich text preview of an html textEdit.
+    - Edits are coalesced: the preview is rendered when the user has stopped typing
+    - The html is parsed into a new QTextDocument on the thread pool, the GUI thread only swaps the document in
+    - At most one document is built at a time, edits made meanwhile are rendered once it is finished
+    - The scroll position of the preview is kept
+    """
+
+    def __init__(self, htmlEdit, previewEdit, stage, interval=250, parent=None):
+        """
+        :param htmlEdit: textEdit with the html code
+        :param previewEdit: read-only textEdit showing the rich text
+        :param stage: Profiler stage name of building the document, e.g. "rich text preview (English)"
+        :param interval: Milliseconds without edits before the preview is rendered
+        """
+        super().__init__(parent)
+        self.htmlEdit = htmlEdit
+        self.previewEdit = previewEdit
+        self.stage = stage
+        self.thread_pool = QThreadPool.globalInstance()
+        self.worker = None  # Worker building the document, None when idle
+        self.rendered_html = None  # Html of the document shown in the preview
+        self.requested_html = None  # Html of the last started build
+        self.render_timer = QTimer(self, interval=interval, singleShot=True)
+        self.render_timer.timeout.connect(self.render)
+
+    def schedule(self):
+        """
+        Renders the preview after the interval, restarted on every call (connect to textChanged)
+        """
+        self.render_timer.start()
+
+    def render(self):
+        """
+        Starts building the document of the current html, unless it is shown already or a build is running
+        """
+        self.render_timer.stop()
+        if self.worker is not None:
+            return  # Rendered again when the running build is finished
+        html = self.htmlEdit.toPlainText()
+        if html == self.rendered_html:
+            return
+        self.requested_html = html
+        worker = Worker(build_preview_document, html, self.previewEdit.font(), self.stage)
+        worker.signals.finished.connect(lambda document: self.show_document(html, document))
+        worker.signals.done.connect(self.worker_done)
+        self.worker = worker
+        self.thread_pool.start(worker)
+
+    def worker_done(self):
+        self.worker = None
+        if self.htmlEdit.toPlainText() != self.requested_html and not self.render_timer.isActive():
+            self.render()  # Edited while the document was being built
+
+    def show_document(self, html, document):
+        """
+        Swaps the new document into the preview, keeping the scroll position
+        :param html: Html of the document
+        :param document: QTextDocument built by build_preview_document
+        """
+        with profiler.stage("swap rich text preview"):
+            vertical = self.previewEdit.verticalScrollBar().value()
+            horizontal = self.previewEdit.horizontalScrollBar().value()
+            previous = self.previewEdit.document()
+            # The initial document is deleted by setDocument, a previously swapped in document is not
+            previous = previous if previous.parent() is self.previewEdit else None
+            document.setParent(self.previewEdit)  # Deleted along with the preview
+            self.previewEdit.setDocument(document)
+            if previous is not None:
+                previous.deleteLater()
+            document.documentLayout().documentSize()  # Lays out the document, so the scroll range is known
+            self.previewEdit.verticalScrollBar().setValue(vertical)
+            self.previewEdit.horizontalScrollBar().setValue(horizontal)
+        self.rendered_html = html
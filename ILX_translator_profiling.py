@@ -0,0 +1,172 @@
+"""
+Timing instrumentation of the ILX html Replacer.
+
+The pipeline reports its stages (e.g. "extract html", "generate html") and counters (e.g. lines extracted,
+bytes read) to the shared profiler. The GUI shows them in the status bar and the Diagnostics dialog,
+and they can be saved as JSON. An optional cProfile capture covers the GUI thread and the background workers.
+"""
+from collections import Counter
+from contextlib import contextmanager
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+
+
+class StageStatistics:
+    """
+    Timings of one stage, in seconds
+    """
+    __slots__ = ("count", "total", "maximum", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        self.last = seconds
+
+    def as_dict(self):
+        return {"count": self.count, "total_ms": self.total * 1000, "mean_ms": self.total * 1000 / self.count,
+                "max_ms": self.maximum * 1000, "last_ms": self.last * 1000}
+
+
+class Profiler:
+    """
+    Collects stage timings and counters, from any thread
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}  # Stage name : StageStatistics
+        self.counters = Counter()  # Counter name : amount
+        self.last_stage = None  # (Stage name, seconds) of the last finished stage
+        self.capture = None  # cProfile.Profile of the GUI thread, while capturing
+        self.thread_profiles = []  # cProfile.Profile of the background tasks which ran while capturing
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the code within the with-block
+        :param name: Stage name, e.g. "generate html"
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.stages.setdefault(name, StageStatistics()).add(seconds)
+            self.last_stage = (name, seconds)
+
+    def count(self, name, amount=1):
+        """
+        :param name: Counter name, e.g. "lines extracted"
+        :param amount: Added to the counter
+        """
+        with self.lock:
+            self.counters[name] += amount
+
+    def reset(self):
+        with self.lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.last_stage = None
+
+    def snapshot(self):
+        """
+        :return: JSON serializable dictionary of the stages (milliseconds) and counters
+        """
+        with self.lock:
+            return {"stages": {name: statistics.as_dict() for name, statistics in self.stages.items()},
+                    "counters": dict(self.counters)}
+
+    def dump_json(self, filename, **extra):
+        """
+        :param filename: JSON file
+        :param extra: Additional sections of the JSON document, e.g. cache statistics
+        """
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump({**self.snapshot(), **extra}, f, indent=2)
+
+    # ---------------------- cProfile ----------------------
+    def is_capturing(self):
+        return self.capture is not None
+
+    def start_capture(self):
+        """
+        Starts profiling the calling (GUI) thread, background tasks are profiled through profile_call
+        :return: False when another profiler is already active (Python 3.12+), True when capturing
+        """
+        if self.capture is None:
+            capture = cProfile.Profile()
+            try:
+                capture.enable()
+            except ValueError:
+                return False
+            self.thread_profiles = []
+            self.capture = capture
+        return True
+
+    def stop_capture(self):
+        """
+        :return: pstats.Stats of the GUI thread and the background tasks, None when not capturing
+        """
+        if self.capture is None:
+            return None
+        self.capture.disable()
+        stats = pstats.Stats()
+        with self.lock:
+            for profile in [self.capture, *self.thread_profiles]:
+                profile.create_stats()
+                if profile.stats:  # pstats cannot add a profile without calls
+                    stats.add(profile)
+            self.thread_profiles = []
+        self.capture = None
+        return stats
+
+    def profile_call(self, function, *args, **kwargs):
+        """
+        Calls the function, profiled when a capture is running (cProfile only profiles the thread it is enabled in).
+        From Python 3.12 only one profiler can be active in the process: the capture of the GUI thread then already
+        covers the background tasks, and the function runs without its own profiler.
+        :return: Result of the function
+        """
+        if self.capture is None:
+            return function(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiler is active (Python 3.12+)
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self.lock:
+                self.thread_profiles.append(profile)
+
+
+def stats_text(stats, limit=30):
+    """
+    :param stats: pstats.Stats
+    :param limit: Number of functions
+    :return: Functions with the highest cumulative time, as text
+    """
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+# Shared by the whole program
+profiler = Profiler()
@@ -0,0 +1,144 @@
+"""
+Project files (.ilxproj) of the ILX html Replacer.
+
+A project is a zip archive with one JSON document per notification template, plus an index:
+    project.json            {"format": ..., "version": ..., "templates": [name, ...]}
+    templates/<number>.json one TemplateSession
+Every template stores the English html, its extracted lines with their source offsets, the Translation tab
+(one Translation column per locale) and the generated html. Opening a template restores the extracted lines
+without parsing the html again, and only the opened template is read from the archive.
+"""
+from collections import namedtuple
+from ILX_translator_engine import TemplateStructure
+from ILX_translator_extract import Line, Segment
+import json
+import os
+import tempfile
+import zipfile
+
+PROJECT_EXTENSION = ".ilxproj"
+PROJECT_FORMAT = "ILX translator project"
+PROJECT_VERSION = 1
+INDEX_ENTRY = "project.json"
+
+# One notification template of a project:
+# - name: Notification Template name
+# - locale: text of the locale box (one locale, or multiple separated by commas)
+# - locales: locales of the Translation columns, empty list = one Translation column
+# - rows: rows of the Translation tab, [English, Translation, ...]
+# - translated_htmls: Dictionary { Locale : Translated html }
+# - structure: TemplateStructure of the English html
+TemplateSession = namedtuple("TemplateSession", ["name", "locale", "locales", "rows", "translated_htmls",
+                                                 "structure"])
+
+
+def template_entry(number):
+    return f"templates/{number}.json"
+
+
+def session_to_json(session):
+    """
+    :param session: TemplateSession
+    :return: JSON serializable dictionary, the segments of a line are stored as a flat list of offsets
+    """
+    return {
+        "name": session.name,
+        "locale": session.locale,
+        "locales": session.locales,
+        "rows": session.rows,
+        "translated_htmls": session.translated_htmls,
+        "html": session.structure.html,
+        "lines": [[line.text, [offset for segment in line.segments for offset in segment]]
+                  for line in session.structure.lines],
+    }
+
+
+def session_from_json(data):
+    """
+    :param data: Dictionary created by session_to_json
+    :return: TemplateSession, the TemplateStructure is restored from the stored lines (the html is not parsed)
+    """
+    lines = [Line(text, [Segment(*offsets[index:index + 2]) for index in range(0, len(offsets), 2)])
+             for text, offsets in data["lines"]]
+    return TemplateSession(data["name"], data["locale"], data["locales"], data["rows"], data["translated_htmls"],
+                           TemplateStructure(data["html"], lines))
+
+
+def open_archive(filename):
+    """
+    :param filename: Project file
+    :return: ZipFile, ValueError when the file is not a zip archive (OSError when it can not be opened)
+    """
+    try:
+        return zipfile.ZipFile(filename)
+    except zipfile.BadZipFile:
+        raise ValueError(f"{filename} is not an ILX translator project (not a zip archive)")
+
+
+def read_index(archive, filename):
+    try:
+        index = json.loads(archive.read(INDEX_ENTRY))
+    except KeyError:
+        raise ValueError(f"{filename} is not an ILX translator project ({INDEX_ENTRY} is missing)")
+    if index.get("format") != PROJECT_FORMAT:
+        raise ValueError(f"{filename} is not an ILX translator project")
+    if index.get("version", 0) > PROJECT_VERSION:
+        raise ValueError(f"{filename} was saved by a newer version of the program (project version {index['version']})")
+    return index
+
+
+def project_template_names(filename):
+    """
+    :param filename: Project file
+    :return: Names of the templates in the project, without reading the templates
+    """
+    with open_archive(filename) as archive:
+        return read_index(archive, filename)["templates"]
+
+
+def load_template(filename, name=None):
+    """
+    :param filename: Project file
+    :param name: Name of the template, None = first template
+    :return: TemplateSession
+    """
+    with open_archive(filename) as archive:
+        names = read_index(archive, filename)["templates"]
+        number = names.index(name) if name is not None else 0
+        return session_from_json(json.loads(archive.read(template_entry(number))))
+
+
+def save_template(filename, session):
+    """
+    Saves the template into the project, replacing the template with the same name.
+    The other templates are copied without being parsed.
+    The project is written to a temporary file first, the previous project remains when saving fails.
+    :param filename: Project file, created when it does not exist
+    :param session: TemplateSession
+    """
+    names = []
+    entries = []  # JSON documents (bytes) of the templates, in project order
+    if os.path.exists(filename):
+        with open_archive(filename) as archive:
+            names = read_index(archive, filename)["templates"]
+            entries = [archive.read(template_entry(number)) for number in range(len(names))]
+
+    document = json.dumps(session_to_json(session), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if session.name in names:
+        entries[names.index(session.name)] = document
+    else:
+        names.append(session.name)
+        entries.append(document)
+
+    folder = os.path.dirname(os.path.abspath(filename))
+    handle, temporary_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as archive:
+            index = {"format": PROJECT_FORMAT, "version": PROJECT_VERSION, "templates": names}
+            archive.writestr(INDEX_ENTRY, json.dumps(index, ensure_ascii=False))
+            for number, entry in enumerate(entries):
+                archive.writestr(template_entry(number), entry)
+        os.replace(temporary_path, filename)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
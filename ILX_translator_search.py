@@ -0,0 +1,124 @@
+from PyQt5.QtWidgets import QTextEdit
+from PyQt5.QtGui import QTextBlockUserData, QTextCursor, QColor, QTextCharFormat
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+import re
+
+
+class BlockMatches(QTextBlockUserData):
+    """
+    Matches of the search term within one block (line) of the document.
+    Stored on the block itself, so it moves along when lines are inserted or removed above it.
+    """
+    def __init__(self, term, revision, matches):
+        super().__init__()
+        self.term = term
+        self.revision = revision  # QTextBlock.revision() at the time the matches were computed
+        self.matches = matches  # List of (start within block, length)
+
+
+class SearchHighlighter(QObject):
+    """
+    Highlights all matches of a search term in a QTextEdit through extra selections,
+    the char formats of the document are never changed (so textChanged is not triggered).
+    - The matches are indexed per block, only blocks which changed since the last search are searched again
+    - Supports match count and next/previous navigation
+    """
+    # Emitted after every refresh and navigation: current match (1-based, 0 = none), number of matches
+    matches_changed = pyqtSignal(int, int)
+
+    match_color = QColor("yellow")
+    current_match_color = QColor("orange")
+
+    def __init__(self, textEdit, parent=None):
+        super().__init__(parent)
+        self.textEdit = textEdit
+        self.term = ""
+        self.pattern = None
+        self.positions = []  # List of (position in document, length)
+        self.current = -1
+
+        # Edits in the document are highlighted again when the user has stopped typing
+        self.refresh_timer = QTimer(self, interval=300, singleShot=True)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.textEdit.textChanged.connect(self.document_changed)
+
+    def document_changed(self):
+        if self.term:
+            self.refresh_timer.start()
+
+    def set_term(self, term):
+        """
+        :param term: Search bar text, case-insensitive. Empty removes the highlighting.
+        """
+        if term != self.term:
+            self.term = term
+            self.pattern = re.compile(re.escape(term), re.IGNORECASE) if term else None
+            self.current = -1
+        self.refresh()
+
+    def block_matches(self, block):
+        """
+        :param block: QTextBlock
+        :return: List of (start within block, length), from the index when the block did not change
+        """
+        data = block.userData()
+        if isinstance(data, BlockMatches) and data.term == self.term and data.revision == block.revision():
+            return data.matches
+        matches = [(match.start(), match.end() - match.start()) for match in self.pattern.finditer(block.text())]
+        block.setUserData(BlockMatches(self.term, block.revision(), matches))
+        return matches
+
+    def refresh(self):
+        """
+        :return: Updates the match positions and the extra selections of the textEdit
+        """
+        self.refresh_timer.stop()
+        self.positions = []
+        if self.pattern is not None:
+            block = self.textEdit.document().begin()
+            while block.isValid():
+                block_position = block.position()
+                for start, length in self.block_matches(block):
+                    self.positions.append((block_position + start, length))
+                block = block.next()
+        if self.current >= len(self.positions):
+            self.current = len(self.positions) - 1
+        self.update_selections()
+
+    def update_selections(self):
+        selections = []
+        for number, (position, length) in enumerate(self.positions):
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = self.cursor(position, length)
+            selection.format = QTextCharFormat()
+            selection.format.setBackground(self.current_match_color if number == self.current else self.match_color)
+            selections.append(selection)
+        self.textEdit.setExtraSelections(selections)
+        self.matches_changed.emit(self.current + 1, len(self.positions))
+
+    def cursor(self, position, length):
+        cursor = QTextCursor(self.textEdit.document())
+        cursor.setPosition(position)
+        cursor.setPosition(position + length, QTextCursor.KeepAnchor)
+        return cursor
+
+    def next_match(self):
+        self.go_to_match(self.current + 1)
+
+    def previous_match(self):
+        self.go_to_match(self.current - 1)
+
+    def go_to_match(self, number):
+        """
+        :param number: Index of the match, wraps around at the first and last match
+        :return: Selects the match in the textEdit and scrolls to it
+        """
+        if self.refresh_timer.isActive():  # Document changed, positions are outdated
+            self.refresh()
+        if not self.positions:
+            return
+        self.current = number % len(self.positions)
+        position, length = self.positions[self.current]
+        self.textEdit.setTextCursor(self.cursor(position, length))
+        self.textEdit.ensureCursorVisible()
+        self.update_selections()
@@ -0,0 +1,525 @@
+"""
+Local HTTP/JSON service of the ILX html Replacer.
+
+Exposes the extraction and replacement logic of the Translation and HTML replacer tab to other tools
+(e.g. migration scripts), without the GUI:
+
+    POST /extract            {"html": ...}                      > {"lines": [...]}
+                             {"documents": [{"id": ..., "html": ...}, ...]}
+                                                                > NDJSON stream, {"id": ..., "lines": [...]} per document
+    POST /export-template    {"html": ..., "locales": [...], "translations": {Locale: {English: Translation}}}
+                                                                > Translation template (.xlsx)
+    POST /import-template    Translation template (.xlsx) as body, ?locale=fr-FR for a single locale template
+                                                                > {"translations": {Locale: {English: Translation}}}
+    POST /generate           {"html": ..., "locale": ..., "translations": {English: Translation}}
+                                                                > {"html": ..., "missing_lines": [...]}
+                             {"jobs": [{"record_id": ..., "locale": ..., "html": ..., "translations": {...}}, ...]}
+                                                                > NDJSON stream, one result per job, in job order
+    GET  /health, GET /stats (stage timings and counters of the service process)
+
+Extraction and generation run on a process pool. Requests arriving at the same time are batched into pool tasks,
+and lists of documents/jobs are streamed back (chunked NDJSON) while the remaining ones are processed.
+See benchmarks/service_load_test.py for a load test.
+
+Usage:
+    python ILX_translator_service.py [--host 127.0.0.1] [--port 8766] [--workers N] [--cache-dir [FOLDER]]
+                                     [--max-batch N]
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs, quote
+from ILX_translator_batch import TranslationJob, run_job
+from ILX_translator_engine import get_structure
+from ILX_translator_cache import configure_disk_cache, DEFAULT_CACHE_FOLDER
+from ILX_translator_excel import read_translation_template, read_locale_template, write_translation_template, \
+    write_locale_template
+from ILX_translator_extract import field_names
+from ILX_translator_profiling import profiler
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import tempfile
+
+logger = logging.getLogger("ILX_translator_service")
+
+MAX_BODY_BYTES = 256 * 1024 * 1024
+MAX_HEADER_LINES = 100
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Removed from the file name of the Content-Disposition header: control characters, quotes and path separators
+UNSAFE_FILENAME_CHARACTERS = re.compile(r'[\x00-\x1f\x7f-\x9f"\\/]')
+# Errors of a pool task caused by the request (e.g. invalid html), answered with 400 instead of 500
+INPUT_ERRORS = (ValueError, TypeError, KeyError)
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+Request = namedtuple("Request", ["method", "path", "query", "headers", "body"])
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------------------- Pool tasks ----------------------
+# Run in the worker processes: module level functions, so they can be pickled
+
+def extract_unique_lines(html):
+    """
+    :return: Lines of the Translation tab: unique rich text lines of the html
+    """
+    return get_structure(html).unique_lines()
+
+
+def run_batch(function, items):
+    """
+    :param function: Pool task, e.g. run_job
+    :param items: Arguments of the function, one call per item
+    :return: List of (200, result) or (HTTP status, error message), in the order of the items.
+             An invalid item (ValueError, TypeError, KeyError) is 400, any other error 500.
+    """
+    results = []
+    for item in items:
+        try:
+            results.append((200, function(item)))
+        except INPUT_ERRORS as error:  # One invalid html does not fail the other requests of the batch
+            results.append((400, f"{type(error).__name__}: {error}"))
+        except Exception as error:
+            results.append((500, f"{type(error).__name__}: {error}"))
+    return results
+
+
+class Batcher:
+    """
+    Collects the items submitted within max_delay (or up to max_batch items) and runs them as pool tasks,
+    so many small requests do not pay the inter-process overhead one by one.
+    The collected items are spread over the workers, a batch does not wait for a single busy worker.
+    """
+
+    def __init__(self, executor, function, workers, max_batch=32, max_delay=0.002):
+        """
+        :param executor: ProcessPoolExecutor
+        :param function: Pool task called per item
+        :param workers: Number of worker processes of the executor
+        :param max_batch: Maximum number of items per flush
+        :param max_delay: Seconds the first item waits for others
+        """
+        self.executor = executor
+        self.workers = workers
+        self.function = function
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = []  # List of (item, asyncio.Future)
+        self.flush_handle = None
+
+    def submit(self, item):
+        """
+        :return: asyncio.Future of the result of function(item)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        size = max(1, math.ceil(len(batch) / self.workers))
+        for start in range(0, len(batch), size):
+            profiler.count(f"service batches ({self.function.__name__})")
+            asyncio.ensure_future(self.run(batch[start:start + size]))
+
+    async def run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, run_batch, self.function,
+                                                 [item for item, future in batch])
+        except Exception as error:  # E.g. a worker process died (BrokenProcessPool), not an error of the request
+            logger.exception("%s pool task failed", self.function.__name__)
+            results = [(500, f"{type(error).__name__}: {error}")] * len(batch)
+        for (item, future), (status, value) in zip(batch, results):
+            if future.done():
+                continue
+            if status == 200:
+                future.set_result(value)
+            else:
+                future.set_exception(HTTPError(status, value))
+
+
+# ---------------------- HTTP ----------------------
+
+async def read_line(reader):
+    """
+    :return: Next line of the request head, HTTPError when it is longer than the limit of the stream
+    """
+    try:
+        return await reader.readline()
+    except ValueError:  # asyncio.LimitOverrunError, the rest of the line is not read
+        raise HTTPError(400, "Request line or header too long")
+
+
+async def read_request(reader):
+    """
+    :return: Request, None when the client closed the connection
+    """
+    request_line = await read_line(reader)
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Invalid request line")
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = (await read_line(reader)).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HTTPError(400, "Too many headers")
+
+    body = b""
+    if method == "POST":
+        if "content-length" not in headers:
+            raise HTTPError(411, "Content-Length is required")
+        if not headers["content-length"].isdigit():
+            raise HTTPError(400, "Invalid Content-Length")
+        length = int(headers["content-length"])
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body larger than {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length)
+    url = urlsplit(target)
+    return Request(method, url.path, {key: values[0] for key, values in parse_qs(url.query).items()}, headers, body)
+
+
+def response_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"] + [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send_bytes(writer, status, content_type, body, keep_alive=True, headers=None):
+    head = {"Content-Type": content_type, "Content-Length": len(body),
+            "Connection": "keep-alive" if keep_alive else "close", **(headers or {})}
+    writer.write(response_head(status, head) + body)
+    await writer.drain()
+
+
+def content_disposition(filename):
+    """
+    :param filename: File name requested by the client, e.g. the Notification Template name
+    :return: Content-Disposition header of an attachment: an ASCII file name, and the UTF-8 name (RFC 5987)
+    """
+    filename = UNSAFE_FILENAME_CHARACTERS.sub("", filename).strip() or "Notification.xlsx"
+    ascii_filename = filename.encode("ascii", "replace").decode("ascii")
+    return f"attachment; filename=\"{ascii_filename}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+async def send_json(writer, status, document, keep_alive=True):
+    body = json.dumps(document, ensure_ascii=False).encode("utf-8")
+    await send_bytes(writer, status, "application/json; charset=utf-8", body, keep_alive)
+
+
+async def send_ndjson_stream(writer, documents, keep_alive=True):
+    """
+    Streams the documents as chunked NDJSON (one JSON document per line), written as soon as each is available
+    :param documents: Async iterable of JSON serializable documents
+    """
+    head = {"Content-Type": "application/x-ndjson; charset=utf-8", "Transfer-Encoding": "chunked",
+            "Connection": "keep-alive" if keep_alive else "close"}
+    writer.write(response_head(200, head))
+    async for document in documents:
+        line = json.dumps(document, ensure_ascii=False).encode("utf-8") + b"\n"
+        writer.write(f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n")
+        await writer.drain()  # Back pressure: a slow client does not buffer the whole export in memory
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def json_body(request):
+    try:
+        document = json.loads(request.body)
+    except ValueError as error:
+        raise HTTPError(400, f"Invalid JSON: {error}")
+    if not isinstance(document, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    return document
+
+
+def required(document, key, kind=str):
+    value = document.get(key)
+    if not isinstance(value, kind):
+        raise HTTPError(400, f"Missing or invalid \"{key}\"")
+    return value
+
+
+def text_dict(value, key):
+    """
+    :param value: Value of the key in the request, None = empty
+    :return: The value, when it is a dictionary { text : text }, e.g. { English : Translation }
+    """
+    value = value or {}
+    if not isinstance(value, dict) or not all(isinstance(text, str) for item in value.items() for text in item):
+        raise HTTPError(400, f"Invalid \"{key}\", expected an object of strings")
+    return value
+
+
+# ---------------------- Service ----------------------
+
+class TranslationService:
+    """
+    asyncio HTTP server, the extraction and generation run on a process pool (see the module docstring)
+    """
+
+    def __init__(self, workers=None, cache_folder=None, max_batch=32, max_delay=0.002):
+        """
+        :param workers: Number of worker processes, None = number of CPUs
+        :param cache_folder: Folder of the on-disk cache shared by the workers, None = memory only
+        :param max_batch: Maximum number of requests collected before they are sent to the pool
+        :param max_delay: Seconds a request waits for others to be batched with
+        """
+        workers = workers or os.cpu_count() or 1
+        # Workers are started on demand. Forked workers would inherit the open client connections (and keep them
+        # open after the service closed them), spawned workers start without them.
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=configure_disk_cache, initargs=(cache_folder,))
+        self.extract_batcher = Batcher(self.executor, extract_unique_lines, workers, max_batch, max_delay)
+        self.generate_batcher = Batcher(self.executor, run_job, workers, max_batch, max_delay)
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+            ("POST", "/extract"): self.extract,
+            ("POST", "/export-template"): self.export_template,
+            ("POST", "/import-template"): self.import_template,
+            ("POST", "/generate"): self.generate,
+        }
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def serve(self, host="127.0.0.1", port=8766, ready=None):
+        """
+        Serves until cancelled
+        :param ready: Optional function called with the listening port (e.g. port 0 = any free port)
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=1024 * 1024)
+        port = server.sockets[0].getsockname()[1]
+        logger.info("Serving on http://%s:%s", host, port)
+        if ready is not None:
+            ready(port)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_until_stopped(self, host="127.0.0.1", port=8766, ready=None):
+        """
+        Serves until SIGINT (Ctrl+C) or SIGTERM, then stops the server and shuts down the worker processes
+        :param ready: Optional function called with the listening port
+        """
+        loop = asyncio.get_running_loop()
+        serving = asyncio.ensure_future(self.serve(host, port, ready))
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signal_number, serving.cancel)
+            except NotImplementedError:  # Windows
+                signal.signal(signal_number, lambda *_: loop.call_soon_threadsafe(serving.cancel))
+        try:
+            await serving
+        except asyncio.CancelledError:
+            logger.info("Stopping")
+        finally:
+            self.close()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as error:
+                    await send_json(writer, error.status, {"error": str(error)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                await self.dispatch(request, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client went away
+        finally:
+            writer.close()
+
+    async def dispatch(self, request, writer, keep_alive):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            status = 405 if any(path == request.path for method, path in self.routes) else 404
+            await send_json(writer, status, {"error": f"{request.method} {request.path} not supported"}, keep_alive)
+            return
+        profiler.count("service requests")
+        try:
+            with profiler.stage(f"service {request.path}"):
+                await handler(request, writer, keep_alive)
+        except HTTPError as error:
+            await send_json(writer, error.status, {"error": str(error)}, keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as error:
+            logger.exception("%s %s failed", request.method, request.path)
+            await send_json(writer, 500, {"error": f"{type(error).__name__}: {error}"}, keep_alive)
+
+    # ---------------------- Endpoints ----------------------
+    async def health(self, request, writer, keep_alive):
+        await send_json(writer, 200, {"status": "ok"}, keep_alive)
+
+    async def stats(self, request, writer, keep_alive):
+        await send_json(writer, 200, profiler.snapshot(), keep_alive)
+
+    async def extract(self, request, writer, keep_alive):
+        document = json_body(request)
+        if "documents" not in document:
+            lines = await self.extract_batcher.submit(required(document, "html"))
+            await send_json(writer, 200, {"lines": lines}, keep_alive)
+            return
+
+        documents = required(document, "documents", list)
+        for item in documents:
+            if not isinstance(item, dict) or not isinstance(item.get("html"), str):
+                raise HTTPError(400, "Every document needs an \"html\"")
+        futures = [self.extract_batcher.submit(item["html"]) for item in documents]
+
+        async def results():
+            for item, future in zip(documents, futures):
+                try:
+                    yield {"id": item.get("id"), "lines": await future}
+                except HTTPError as error:
+                    yield {"id": item.get("id"), "error": str(error)}
+
+        await send_ndjson_stream(writer, results(), keep_alive)
+
+    async def export_template(self, request, writer, keep_alive):
+        document = json_body(request)
+        lines = await self.extract_batcher.submit(required(document, "html"))
+        locales = document.get("locales") or [""]
+        if not isinstance(locales, list) or not all(isinstance(locale, str) for locale in locales):
+            raise HTTPError(400, "Invalid \"locales\", expected a list of strings")
+        translations = document.get("translations") or {}
+        if not isinstance(translations, dict):
+            raise HTTPError(400, "Invalid \"translations\"")
+        translations = {locale: text_dict(translations.get(locale), f"translations.{locale}") for locale in locales}
+        sheet_name = document.get("sheet_name") or "Sheet1"
+        if not isinstance(sheet_name, str):
+            raise HTTPError(400, "Invalid \"sheet_name\"")
+        # Same as the Translation tab: the Translation defaults to the ILX fields of the line
+        translation_dicts = {locale: {line: translations[locale].get(line, field_names(line))
+                                      for line in lines} for locale in locales}
+        body = await asyncio.to_thread(write_template_bytes, translation_dicts, sheet_name)
+        name = document.get("name")
+        filename = f"{name if isinstance(name, str) and name else 'Notification'}.xlsx"
+        await send_bytes(writer, 200, XLSX_CONTENT_TYPE, body, keep_alive,
+                         {"Content-Disposition": content_disposition(filename)})
+
+    async def import_template(self, request, writer, keep_alive):
+        if not request.body:
+            raise HTTPError(400, "Expected a Translation template (.xlsx) as request body")
+        translation_dicts = await asyncio.to_thread(read_template_bytes, request.body,
+                                                    request.query.get("locale", ""))
+        await send_json(writer, 200, {"translations": translation_dicts}, keep_alive)
+
+    async def generate(self, request, writer, keep_alive):
+        document = json_body(request)
+        if "jobs" not in document:
+            result = await self.generate_batcher.submit(translation_job(document))
+            await send_json(writer, 200, {"html": result.translated_html, "missing_lines": result.missing_lines},
+                            keep_alive)
+            return
+
+        jobs = [translation_job(item) for item in required(document, "jobs", list)]
+        futures = [self.generate_batcher.submit(job) for job in jobs]
+
+        async def results():
+            for job, future in zip(jobs, futures):
+                try:
+                    result = await future
+                    yield {"record_id": job.record_id, "locale": job.locale, "html": result.translated_html,
+                           "missing_lines": result.missing_lines}
+                except HTTPError as error:
+                    yield {"record_id": job.record_id, "locale": job.locale, "error": str(error)}
+
+        await send_ndjson_stream(writer, results(), keep_alive)
+
+
+def translation_job(document):
+    """
+    :param document: {"html": ..., "translations": {English: Translation}, "record_id": ..., "locale": ...}
+    :return: TranslationJob
+    """
+    if not isinstance(document, dict):
+        raise HTTPError(400, "Expected a JSON object per job")
+    return TranslationJob(document.get("record_id"), document.get("locale"), required(document, "html"),
+                          text_dict(document.get("translations"), "translations"))
+
+
+def write_template_bytes(translation_dicts, sheet_name):
+    """
+    :param translation_dicts: Dictionary { Locale : { English : Translation } }, the locale "" = Translation column
+    :return: Translation template (.xlsx) as bytes, multi-locale when there are multiple locales
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "template.xlsx")
+        if list(translation_dicts) == [""]:
+            write_translation_template(filename, translation_dicts[""], sheet_name)
+        else:
+            write_locale_template(filename, translation_dicts, sheet_name)
+        with open(filename, "rb") as f:
+            return f.read()
+
+
+def read_template_bytes(body, locale=""):
+    """
+    :param body: Translation template (.xlsx) as bytes
+    :param locale: Locale of a single locale template
+    :return: Dictionary { Locale : { English : Translation } }
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "template.xlsx")
+        with open(filename, "wb") as f:
+            f.write(body)
+        try:
+            return read_locale_template(filename) or {locale: read_translation_template(filename)}
+        except (ValueError, KeyError, OSError) as error:
+            raise HTTPError(400, f"Invalid Translation template: {error}")
+        except Exception as error:  # openpyxl raises various errors for a file which is not a workbook
+            raise HTTPError(400, f"Invalid Translation template: {type(error).__name__}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service of the ILX html Replacer")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: only this computer)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPUs)")
+    parser.add_argument("--cache-dir", nargs="?", const=DEFAULT_CACHE_FOLDER, default=None,
+                        help=f"Keep the extracted and generated html on disk (default folder: {DEFAULT_CACHE_FOLDER})")
+    parser.add_argument("--max-batch", type=int, default=32,
+                        help="Maximum number of requests collected before they are sent to the pool")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    service = TranslationService(args.workers, args.cache_dir, args.max_batch)
+    asyncio.run(service.serve_until_stopped(args.host, args.port))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Headless watch-folder translator.
+
+Monitors a folder and translates notification templates as soon as their files arrive, without the GUI:
+- English html, saved with "Save English html" (or copied from Intelex), named <RecordID>.htm or <RecordID>.html.
+  The English html of a RecordID can also be read from an Application Translation export (--export).
+- Translated templates (created through "Export Translation Template"), named <RecordID>_<Locale>.xlsx,
+  or multi-locale templates named <RecordID>.xlsx
+
+A file is processed once it did not change for --settle seconds (e.g. still being copied).
+Only the templates affected by a new or changed file are generated again, over a process pool.
+The translated html is written to <output>/<RecordID>_<Locale>.html, and <output>/import.xlsx is updated
+with every translation so far (Application Translation import format).
+
+Usage:
+    python ILX_translator_watch.py <watch_folder> <output_folder> [--export EXPORT.xlsx]
+                                   [--interval SECONDS] [--settle SECONDS] [--workers N] [--cache-dir [FOLDER]]
+                                   [--once]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from ILX_translator_batch import TranslationJob, run_job, english_html_by_record_id, build_import_workbook, \
+    read_application_translation_export, default_chunksize, RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, \
+    TRANSLATED_COLUMN
+from ILX_translator_cache import configure_disk_cache, DEFAULT_CACHE_FOLDER
+from ILX_translator_excel import read_translation_template, read_locale_template, parse_template_filename
+from ILX_translator_extract import saved_html_source
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+HTML_EXTENSIONS = (".htm", ".html")
+TEMPLATE_EXTENSIONS = (".xlsx", ".xls")
+IMPORT_WORKBOOK = "import.xlsx"
+
+# A file which can not be read: missing or locked file, a workbook which is still being saved (not a zip file yet),
+# a workbook without the template columns (ValueError) or with missing parts (KeyError), xlrd not installed (.xls)
+READ_ERRORS = (OSError, UnicodeDecodeError, zipfile.BadZipFile, KeyError, ValueError, ImportError)
+
+logger = logging.getLogger("ILX_translator_watch")
+
+
+def file_signature(entry):
+    """
+    :param entry: os.DirEntry
+    :return: (modification time, size), changes whenever the file is written
+    """
+    stat = entry.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_text_file(filename, text):
+    """
+    Written to a temporary file first, readers of the shared output folder never see a partially written file
+    """
+    handle, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+    with os.fdopen(handle, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temporary_path, filename)
+
+
+class FolderWatcher:
+    """
+    Keeps the state of the watch folder between polls: the processed version of every file,
+    the English html and templates per RecordID, and the generated translations.
+    """
+
+    def __init__(self, folder, output_folder, export_filename=None, settle=2.0, workers=None, cache_folder=None):
+        """
+        :param folder: Watch folder with English html and translated templates
+        :param output_folder: Folder of the translated html and import workbook
+        :param export_filename: Optional Application Translation export with the English html of every RecordID
+        :param settle: Seconds a file must be unchanged before it is processed
+        :param workers: Number of worker processes, None = number of CPUs, 1 = no pool (in this process)
+        :param cache_folder: Folder of the on-disk cache shared by the workers, None = memory only
+        """
+        watch_path, output_path = os.path.realpath(folder), os.path.realpath(output_folder)
+        if output_path == watch_path or output_path.startswith(os.path.join(watch_path, "")):
+            raise ValueError(f"The output folder {output_folder} can not be the watch folder or inside it, "
+                             f"the translated html would be read as English html")
+        self.folder = folder
+        self.output_folder = output_folder
+        self.export_filename = export_filename
+        self.settle = settle
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_folder = cache_folder
+        self.executor = None  # ProcessPoolExecutor, started on the first generation
+
+        self.signatures = {}  # Filename : signature of the processed version
+        self.pending = {}  # Filename : (signature, time first seen), changed files which are not settled yet
+        self.failed = {}  # Filename : signature which could not be read, tried again when the file changes
+        self.export_df = None
+        self.export_html = {}  # RecordID : English html from the export
+        self.html_files = {}  # RecordID : English html from the watch folder (wins over the export)
+        self.templates = {}  # Filename : (RecordID, { Locale : { English : Translation } })
+        self.results = {}  # (RecordID, Locale) : TranslationResult
+
+        os.makedirs(output_folder, exist_ok=True)
+        configure_disk_cache(cache_folder)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    # ---------------------- Scanning ----------------------
+    def watched_files(self):
+        """
+        :return: Dictionary { Filename : signature } of the html and template files in the watch folder
+        """
+        files = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                extension = os.path.splitext(entry.name)[1].lower()
+                if entry.name.startswith(("~$", ".")) or not entry.is_file():  # Excel lock files, hidden files
+                    continue
+                if extension in HTML_EXTENSIONS or extension in TEMPLATE_EXTENSIONS:
+                    try:
+                        files[entry.name] = file_signature(entry)
+                    except OSError:  # Removed while scanning
+                        continue
+        return files
+
+    def settled_changes(self):
+        """
+        :return: Filenames which are new or changed, and did not change during the settle time.
+                 Removed files are returned with signature None.
+        """
+        now = time.monotonic()
+        files = self.watched_files()
+        changes = {}
+        for filename, signature in files.items():
+            if self.signatures.get(filename) == signature or self.failed.get(filename) == signature:
+                self.pending.pop(filename, None)
+                continue
+            pending = self.pending.get(filename)
+            if pending is None or pending[0] != signature:
+                self.pending[filename] = (signature, now)  # (Still) being written, wait for the settle time
+            elif now - pending[1] >= self.settle:
+                changes[filename] = signature
+        for filename in list(self.signatures):
+            if filename not in files:
+                changes[filename] = None
+        for filename in list(self.failed):
+            if filename not in files:
+                del self.failed[filename]
+        return changes
+
+    def english_html(self, record_id):
+        return self.html_files.get(record_id, self.export_html.get(record_id))
+
+    # ---------------------- Processing ----------------------
+    def load_export(self):
+        if self.export_filename and self.export_df is None:
+            self.export_df = read_application_translation_export(self.export_filename)
+            self.export_html = english_html_by_record_id(self.export_df)
+            logger.info("Read %d English html from %s", len(self.export_html), self.export_filename)
+
+    def record_templates(self, record_id):
+        return {filename for filename, (template_record_id, _) in self.templates.items()
+                if template_record_id == record_id}
+
+    def read_file(self, filename):
+        """
+        :param filename: New or changed file in the watch folder
+        :return: Template files which must be generated again: the template itself,
+                 or every template of the RecordID of an English html.
+                 Raises one of READ_ERRORS when the file can not be read (yet).
+        """
+        path = os.path.join(self.folder, filename)
+        stem, extension = os.path.splitext(filename)
+        if extension.lower() in HTML_EXTENSIONS:
+            # Written as UTF-8 by "Save English html", other encodings (e.g. copied from Intelex) do not fail the file
+            with open(path, encoding="utf-8-sig", errors="replace") as f:
+                self.html_files[stem] = saved_html_source(f.read())
+            return self.record_templates(stem)
+
+        parsed = parse_template_filename(filename)
+        if parsed is not None:
+            record_id, locale = parsed
+            translation_dicts = {locale: read_translation_template(path)}
+        else:
+            record_id = stem
+            translation_dicts = read_locale_template(path)  # Empty for a template without locale columns
+        if not translation_dicts:
+            logger.warning("Skipped %s: not a <RecordID>_<Locale>.xlsx or multi-locale template", filename)
+        self.remove_file(filename)  # Translations of locales which are no longer in the template
+        self.templates[filename] = (record_id, translation_dicts)
+        return {filename}
+
+    def remove_file(self, filename):
+        """
+        :return: Template files which must be generated again (the English html of their RecordID changed)
+        """
+        stem, extension = os.path.splitext(filename)
+        if extension.lower() in HTML_EXTENSIONS:
+            self.html_files.pop(stem, None)  # The English html of the export is used again, when there is one
+            return self.record_templates(stem)
+        record_id, translation_dicts = self.templates.pop(filename, (None, {}))
+        for locale in translation_dicts:
+            self.results.pop((record_id, locale), None)
+        return set()
+
+    def jobs(self, template_filenames):
+        """
+        :param template_filenames: New or changed templates, or templates of which the English html changed
+        :return: List of TranslationJob of these templates, when their English html is known
+        """
+        jobs = []
+        for filename in sorted(template_filenames):
+            record_id, translation_dicts = self.templates[filename]
+            english_html = self.english_html(record_id)
+            if english_html is None:
+                logger.info("Waiting for the English html of %s (%s)", record_id, filename)
+                continue
+            for locale, translation_dict in translation_dicts.items():
+                jobs.append(TranslationJob(record_id, locale, english_html, translation_dict))
+        return jobs
+
+    def generate(self, jobs):
+        """
+        :param jobs: List of TranslationJob
+        :return: List of TranslationResult, generated over the process pool
+        """
+        workers = min(self.workers, len(jobs))
+        if workers <= 1:
+            return [run_job(job) for job in jobs]
+        if self.executor is None:  # Kept running between polls, the workers keep their caches
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=configure_disk_cache,
+                                                initargs=(self.cache_folder,))
+        return list(self.executor.map(run_job, jobs, chunksize=default_chunksize(len(jobs), workers)))
+
+    def write_results(self, results):
+        for result in results:
+            self.results[(result.record_id, result.locale)] = result
+            write_text_file(os.path.join(self.output_folder, f"{result.record_id}_{result.locale}.html"),
+                            result.translated_html)
+            for line in result.missing_lines:
+                logger.warning("Missing translation %s %s: %s", result.record_id, result.locale, line)
+
+    def write_import_workbook(self):
+        """
+        :return: Writes every translation so far into the import workbook
+        """
+        import pandas as pd
+        results = [self.results[key] for key in sorted(self.results)]
+        known_record_ids = english_html_by_record_id(self.export_df) if self.export_df is not None else {}
+        if self.export_df is not None and all(result.record_id in known_record_ids for result in results):
+            workbook = build_import_workbook(self.export_df, results)
+        else:  # No export (or html files of other RecordIDs): the columns of the import format only
+            workbook = pd.DataFrame([(result.record_id, result.locale, self.english_html(result.record_id),
+                                      result.translated_html) for result in results],
+                                    columns=[RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, TRANSLATED_COLUMN])
+        filename = os.path.join(self.output_folder, IMPORT_WORKBOOK)
+        temporary_filename = os.path.join(self.output_folder, f".{IMPORT_WORKBOOK}.tmp.xlsx")
+        workbook.to_excel(temporary_filename, index=False)
+        os.replace(temporary_filename, filename)
+
+    def poll(self):
+        """
+        Processes the settled changes in the watch folder
+        :return: Number of generated translations
+        """
+        self.load_export()
+        changes = self.settled_changes()
+        template_filenames = set()
+        for filename, signature in sorted(changes.items()):
+            if signature is None:
+                logger.info("Removed %s", filename)
+                template_filenames |= self.remove_file(filename)
+                self.signatures.pop(filename, None)
+                continue
+            try:
+                template_filenames |= self.read_file(filename)
+            except READ_ERRORS as error:  # E.g. a workbook which is still being saved, tried again when it changes
+                logger.warning("Could not read %s: %s", filename, error)
+                self.failed[filename] = signature
+                continue
+            logger.info("Read %s", filename)
+            self.failed.pop(filename, None)
+            self.signatures[filename] = signature
+
+        if not changes:
+            return 0
+        jobs = self.jobs(template_filenames & set(self.templates))
+        results = self.generate(jobs) if jobs else []
+        self.write_results(results)
+        self.write_import_workbook()
+        if results:
+            logger.info("Translated %d template(s) > %s", len(results), self.output_folder)
+        return len(results)
+
+    def run(self, interval=2.0, once=False):
+        """
+        :param interval: Seconds between two scans of the watch folder
+        :param once: Processes the files which are in the folder, and returns
+        """
+        if once:
+            self.settle = 0
+            self.settled_changes()  # First scan marks the files as pending, the next scan processes them
+            self.poll()
+            return
+        logger.info("Watching %s (Ctrl+C to stop)", self.folder)
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate Intelex notification templates as they arrive in a folder")
+    parser.add_argument("folder", help="Watch folder with <RecordID>.htm English html and <RecordID>_<Locale>.xlsx "
+                                       "translated templates")
+    parser.add_argument("output", help="Folder of the translated html and the import workbook")
+    parser.add_argument("--export", default=None,
+                        help="Intelex Application Translation export (.xlsx) with the English html of the RecordIDs, "
+                             "read at start-up")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between two scans (default: 2)")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="Seconds a file must be unchanged before it is processed (default: 2)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs, 1 = no process pool)")
+    parser.add_argument("--cache-dir", nargs="?", const=DEFAULT_CACHE_FOLDER, default=None,
+                        help=f"Cache extraction and generation results on disk, a restarted watcher does not "
+                             f"generate unchanged templates again (default folder: {DEFAULT_CACHE_FOLDER})")
+    parser.add_argument("--once", action="store_true", help="Process the files in the folder once, and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        watcher = FolderWatcher(args.folder, args.output, export_filename=args.export, settle=args.settle,
+                                workers=args.workers, cache_folder=args.cache_dir)
+    except ValueError as error:
+        parser.error(str(error))
+    try:
+        watcher.run(interval=args.interval, once=args.once)
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from ILX_translator_profiling import profiler
+import threading
+import time
+import traceback
+
+
+class Cancelled(Exception):
+    """
+    Raised within a worker function (by Worker.report_progress/report_partial) when the user cancelled the task
+    """
+
+
+class WorkerSignals(QObject):
+    """
+    Signals of a Worker. Emitted from the worker thread, delivered (queued) on the GUI thread,
+    so the connected methods may update the widgets.
+    """
+    progress = pyqtSignal(int, int)  # Done, total (0 = unknown)
+    partial = pyqtSignal(object)  # Intermediate result, e.g. a chunk of rows
+    finished = pyqtSignal(object)  # Result of the worker function
+    failed = pyqtSignal(str)  # Error message
+    cancelled = pyqtSignal()
+    done = pyqtSignal()  # Always emitted last: after finished, failed or cancelled
+
+
+class Worker(QRunnable):
+    """
+    Runs a function on a QThreadPool thread, keeping the GUI thread free to paint.
+    The function is called as function(worker, *args, **kwargs) and can use the worker to:
+    - report_progress(done, total): updates the progress bar, and stops the function when cancelled
+    - report_partial(value): hands intermediate results to the GUI thread
+    Qt objects (widgets, models) and the translation memory must not be used within the function,
+    the results are applied on the GUI thread through the signals.
+    """
+    progress_interval = 1 / 60  # Seconds between progress signals, the GUI is not flooded with events
+
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self.cancel_event = threading.Event()
+        self.last_progress = 0.0
+
+    def cancel(self):
+        """
+        :return: Requests the function to stop, at its next report_progress/report_partial. The result is discarded.
+        """
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise Cancelled()
+
+    def report_progress(self, done, total=0):
+        """
+        :param done: Number of processed items
+        :param total: Total number of items, 0 = unknown
+        """
+        self.check_cancelled()
+        now = time.monotonic()
+        if now - self.last_progress >= self.progress_interval or (total and done >= total):
+            self.last_progress = now
+            self.signals.progress.emit(done, total)
+
+    def report_partial(self, value):
+        self.check_cancelled()
+        self.signals.partial.emit(value)
+
+    def run(self):
+        try:
+            result = profiler.profile_call(self.function, self, *self.args, **self.kwargs)
+            self.check_cancelled()
+        except Cancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            traceback.print_exc()
+            self.signals.failed.emit(f"{type(error).__name__}: {error}")
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            self.signals.done.emit()
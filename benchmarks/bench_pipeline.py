@@ -0,0 +1,140 @@
+"""
+Benchmarks of the extraction, dictionary building and html generation.
+
+Requires pytest-benchmark. Runs headless (offscreen Qt platform):
+    python -m pytest benchmarks/bench_pipeline.py
+    python -m pytest benchmarks/bench_pipeline.py --benchmark-autosave --benchmark-compare
+
+Every benchmark records the throughput (lines per second) and the peak memory (tracemalloc) in extra_info.
+"""
+from notification_generator import generate_notification
+from ILX_translator_engine import ReplacementEngine, TemplateStructure
+from ILX_translator_extract import extract_lines
+import pytest
+import tracemalloc
+
+LINE_COUNTS = [50, 400, 2000]
+
+SCENARIOS = {
+    "plain": dict(field_density=0.0, repeated_ratio=0.0, nested_tables=0),
+    "fields": dict(field_density=0.3, repeated_ratio=0.0, nested_tables=0),
+    "tables": dict(field_density=0.1, repeated_ratio=0.0, nested_tables=3),
+    "repeated": dict(field_density=0.1, repeated_ratio=0.5, nested_tables=0),
+}
+
+
+@pytest.fixture(scope="session")
+def app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def window(app, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))  # Translation memory in a temporary folder
+    from ILX_translator_functions import MyMainWindow
+    window = MyMainWindow()
+    yield window
+    window.deleteLater()
+
+
+def record(benchmark, line_count, function, *args):
+    """
+    :return: Runs the benchmark, and adds throughput and peak memory of a single (extra) run to extra_info
+    """
+    result = benchmark(function, *args)
+    if benchmark.stats is None:  # --benchmark-disable: the function only ran once, nothing to report
+        return result
+    tracemalloc.start()
+    function(*args)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    benchmark.extra_info["lines"] = line_count
+    benchmark.extra_info["lines_per_second"] = line_count / benchmark.stats.stats.mean
+    benchmark.extra_info["peak_memory_kib"] = peak_memory / 1024
+    return result
+
+
+def translation_dict(lines):
+    return {line: f"[fr] {line}" for line in lines}
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+@pytest.mark.parametrize("line_count", LINE_COUNTS)
+def test_extract_lines(benchmark, scenario, line_count):
+    html = generate_notification(line_count, **SCENARIOS[scenario])
+    lines = record(benchmark, line_count, extract_lines, html)
+    assert lines
+
+
+@pytest.mark.parametrize("line_count", LINE_COUNTS)
+def test_extract_translation_lines(benchmark, window, line_count):
+    # Translation tab: html pasted in textEdit_eng, all rows inserted from an empty table
+    html = generate_notification(line_count, **SCENARIOS["fields"])
+
+    def extract():
+        window.translation_model.clear()
+        window.textEdit_eng.setPlainText(html)
+        window.extract_translation_lines()
+
+    record(benchmark, line_count, extract)
+    assert window.translation_model.rowCount() > 0
+
+
+@pytest.mark.parametrize("line_count", LINE_COUNTS)
+def test_extract_translation_lines_single_edit(benchmark, window, line_count):
+    # Translation tab: one line of a large template is edited
+    html = generate_notification(line_count, **SCENARIOS["fields"])
+    edited_html = html.replace("<p", "<p>Edited line</p><p", 1)
+    window.textEdit_eng.setPlainText(html)
+    window.extract_translation_lines()
+
+    def edit():
+        window.textEdit_eng.setPlainText(edited_html)
+        window.extract_translation_lines()
+        window.textEdit_eng.setPlainText(html)
+        window.extract_translation_lines()
+
+    record(benchmark, line_count, edit)
+
+
+@pytest.mark.parametrize("line_count", LINE_COUNTS)
+def test_create_dictionary(benchmark, window, line_count):
+    html = generate_notification(line_count, **SCENARIOS["repeated"])
+    window.textEdit_eng.setPlainText(html)
+    window.extract_translation_lines()
+    result = record(benchmark, line_count, window.create_dictionary, False)
+    assert result
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+@pytest.mark.parametrize("line_count", LINE_COUNTS)
+def test_generate_html(benchmark, scenario, line_count):
+    # Structure extracted once per template and reused for every locale, like the batch translator
+    html = generate_notification(line_count, **SCENARIOS[scenario])
+    structure = TemplateStructure(html)
+    translated_html = record(benchmark, line_count, structure.generate, translation_dict(structure.english_lines()))
+    assert translated_html != html
+
+
+@pytest.mark.parametrize("line_count", LINE_COUNTS)
+def test_build_structure(benchmark, line_count):
+    html = generate_notification(line_count, **SCENARIOS["fields"])
+    record(benchmark, line_count, TemplateStructure, html)
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+@pytest.mark.parametrize("line_count", LINE_COUNTS)
+def test_generate_html_text_search(benchmark, scenario, line_count):
+    # Text search fallback, used for translations of lines which are not in the html
+    html = generate_notification(line_count, **SCENARIOS[scenario])
+    lines = extract_lines(html)
+    engine = ReplacementEngine(lines)
+    translated_html = record(benchmark, line_count, engine.generate, html, translation_dict(lines))
+    assert translated_html != html
+
+
+@pytest.mark.parametrize("line_count", LINE_COUNTS)
+def test_build_engine(benchmark, line_count):
+    lines = extract_lines(generate_notification(line_count, **SCENARIOS["fields"]))
+    record(benchmark, line_count, ReplacementEngine, lines)
@@ -0,0 +1,62 @@
+"""
+Synthetic Intelex notification templates for the benchmarks.
+Deterministic for a given seed, so results of different runs can be compared.
+"""
+import random
+
+WORDS = ["incident", "report", "review", "action", "required", "please", "the", "of", "investigation", "safety",
+         "assigned", "to", "you", "has", "been", "due", "date", "overdue", "audit", "finding", "corrective",
+         "environmental", "permit", "inspection", "completed", "location", "department", "manager", "task"]
+
+FIELDS = ["{#Name}", "{#RecordID}", "{#DueDate}", "{#Location}", "{#AssignedTo}", "{#Status}", "{#Link}"]
+
+REPEATED_LINES = ["Click here to open the record.", "Kind regards,", "Health & Safety Team",
+                  "This is an automatically generated e-mail, please do not reply.", "Dear {#Name},"]
+
+
+def generate_line(rng, field_density):
+    """
+    :param rng: random.Random
+    :param field_density: Chance (0-1) that a word is replaced by an ILX field
+    :return: One line of text
+    """
+    words = []
+    for _ in range(rng.randint(4, 16)):
+        words.append(rng.choice(FIELDS) if rng.random() < field_density else rng.choice(WORDS))
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+
+def generate_notification(lines=100, field_density=0.1, repeated_ratio=0.1, nested_tables=0, seed=0):
+    """
+    :param lines: Number of text lines in the body
+    :param field_density: Chance (0-1) that a word is an ILX field ({#[text]})
+    :param repeated_ratio: Chance (0-1) that a line is a repeated phrase (signature, "Click here", ...)
+    :param nested_tables: Depth of nested tables around every tenth line
+    :param seed: Seed of the random generator
+    :return: Notification template html, in the style of the Intelex html editor
+    """
+    rng = random.Random(seed)
+    body = []
+    for number in range(lines):
+        if rng.random() < repeated_ratio:
+            text = rng.choice(REPEATED_LINES)
+        else:
+            text = generate_line(rng, field_density)
+
+        if rng.random() < 0.2:  # Inline formatting within a line
+            words = text.split(" ")
+            position = rng.randrange(len(words))
+            words[position] = f"<b>{words[position]}</b>"
+            text = " ".join(words)
+
+        if nested_tables and number % 10 == 0:
+            cell = f"<p>{text}</p>"
+            for _ in range(nested_tables):
+                cell = f"<table border=\"0\"><tr><td>{cell}</td></tr></table>"
+            body.append(cell)
+        else:
+            body.append(f"<p style=\"font-family: Arial; font-size: 10pt;\">{text}</p>")
+
+    return ("<html><head><style type=\"text/css\">p { margin: 0; }</style></head><body>\n"
+            + "\n".join(body) + "\n</body></html>")
@@ -0,0 +1,185 @@
+"""
+Load test of the local HTTP/JSON service (ILX_translator_service.py).
+
+Starts the service on a free port (or uses a running one with --url), and sends /generate requests with the
+synthetic notifications of notification_generator from concurrent keep-alive connections.
+Reports the throughput and latency percentiles, and the time to the first and last line of a streamed batch.
+
+Usage:
+    python benchmarks/service_load_test.py [--requests N] [--concurrency N] [--lines N] [--workers N]
+                                           [--max-batch N] [--url http://127.0.0.1:8766]
+"""
+from notification_generator import generate_notification
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Connection:
+    """
+    Minimal keep-alive HTTP/1.1 client, enough for the JSON and chunked NDJSON responses of the service
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def post(self, path, document, on_line=None):
+        """
+        :param on_line: Called for every line of a chunked (streamed) response
+        :return: (status, body)
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(document).encode("utf-8")
+        self.writer.write(f"POST {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int(await self.reader.readline(), 16)
+                chunk = (await self.reader.readexactly(size + 2))[:-2]  # Without the CRLF after the chunk
+                if size == 0:
+                    break
+                chunks.append(chunk)
+                if on_line is not None:
+                    on_line(chunk)
+            return status, b"".join(chunks)
+        return status, await self.reader.readexactly(int(headers["content-length"]))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def load_test(host, port, requests, concurrency, documents):
+    """
+    :return: List of request latencies in seconds, total seconds
+    """
+    latencies = []
+    queue = asyncio.Queue()
+    for number in range(requests):
+        queue.put_nowait(documents[number % len(documents)])
+
+    async def client():
+        connection = Connection(host, port)
+        try:
+            while not queue.empty():
+                document = queue.get_nowait()
+                start = time.perf_counter()
+                status, body = await connection.post("/generate", document)
+                if status != 200:
+                    raise RuntimeError(f"HTTP {status}: {body[:200]}")
+                latencies.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+async def stream_test(host, port, documents):
+    """
+    :return: Seconds until the first and the last streamed result of a batch of jobs
+    """
+    connection = Connection(host, port)
+    first = []
+    start = time.perf_counter()
+    try:
+        status, body = await connection.post("/generate", {"jobs": documents},
+                                             on_line=lambda line: first or first.append(time.perf_counter()))
+    finally:
+        connection.close()
+    return first[0] - start, time.perf_counter() - start
+
+
+def start_service(workers, max_batch):
+    """
+    :return: (Popen, port) of a service on a free port
+    """
+    arguments = [sys.executable, "-c",
+                 "import asyncio, sys; from ILX_translator_service import TranslationService; "
+                 f"service = TranslationService({workers}, None, {max_batch}); "
+                 "asyncio.run(service.serve_until_stopped('127.0.0.1', 0, ready=lambda port: print(port, flush=True)))"]
+    process = subprocess.Popen(arguments, cwd=PROJECT_FOLDER, stdout=subprocess.PIPE, text=True)
+    return process, int(process.stdout.readline())
+
+
+def stop_service(process):
+    """
+    Stops a service started by start_service like Ctrl+C, so it shuts down its worker processes
+    """
+    process.send_signal(signal.SIGINT if os.name != "nt" else signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test of the ILX translator service")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent connections")
+    parser.add_argument("--lines", type=int, default=100, help="Lines per notification")
+    parser.add_argument("--templates", type=int, default=20, help="Number of different notifications")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes of the started service")
+    parser.add_argument("--max-batch", type=int, default=32, help="Batched requests of the started service")
+    parser.add_argument("--url", help="Use a running service instead of starting one")
+    args = parser.parse_args(argv)
+
+    documents = []
+    for seed in range(args.templates):
+        html = generate_notification(lines=args.lines, seed=seed)
+        documents.append({"record_id": str(seed), "locale": "fr-FR", "html": html,
+                          "translations": {"Dear": "Cher"}})
+
+    process = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    else:
+        process, port = start_service(args.workers, args.max_batch)
+        host = "127.0.0.1"
+    try:
+        latencies, seconds = asyncio.run(load_test(host, port, args.requests, args.concurrency, documents))
+        print(f"/generate: {args.requests} requests in {seconds:.2f} s, {args.requests / seconds:.0f} requests/s "
+              f"({args.concurrency} connections, {args.lines} lines per notification)")
+        print(f"latency: median {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+        first, last = asyncio.run(stream_test(host, port, documents * 10))
+        print(f"streamed {len(documents) * 10} jobs: first result after {first * 1000:.0f} ms, "
+              f"last after {last * 1000:.0f} ms")
+    finally:
+        if process is not None:
+            stop_service(process)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Start-up benchmark of the ILX html Replacer.
+
+Reports (python -X importtime style) which modules are imported when the program starts, and how long it
+takes until the main window is shown. Fails when a heavy dependency, which should only be imported on first use,
+is imported at start-up.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs N] [--top N]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by the import/export buttons and the batch translator
+LAZY_MODULES = ["pandas", "numpy", "openpyxl"]
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+SHOW_WINDOW = """
+import time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+from ILX_translator_functions import MyMainWindow
+app = QApplication([])
+window = MyMainWindow()
+window.show()
+app.processEvents()
+print(time.perf_counter() - start)
+"""
+
+
+def run_python(arguments):
+    environment = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    return subprocess.run([sys.executable, *arguments], cwd=PROJECT_FOLDER, env=environment,
+                          capture_output=True, text=True, check=True)
+
+
+def importtime():
+    """
+    :return: List of (module, self time in us, cumulative time in us, depth) when importing ILX_translator_functions
+    """
+    stderr = run_python(["-X", "importtime", "-c", "import ILX_translator_functions"]).stderr
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_time, cumulative_time, indent, module = match.groups()
+            modules.append((module, int(self_time), int(cumulative_time), len(indent) // 2))
+    return modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Start-up benchmark of the ILX html Replacer")
+    parser.add_argument("--runs", type=int, default=5, help="Number of measured start-ups")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to report")
+    args = parser.parse_args(argv)
+
+    modules = importtime()
+    total = sum(self_time for module, self_time, cumulative_time, depth in modules)
+    print(f"Import of ILX_translator_functions: {total / 1000:.1f} ms, {len(modules)} modules")
+    print(f"{'self [us]':>10} | {'cumulative':>10} | module")
+    for module, self_time, cumulative_time, depth in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+        print(f"{self_time:>10} | {cumulative_time:>10} | {'  ' * depth}{module}")
+
+    timings = [float(run_python(["-c", SHOW_WINDOW]).stdout) for _ in range(args.runs)]
+    print(f"\nMain window shown after: median {statistics.median(timings) * 1000:.0f} ms, "
+          f"max {max(timings) * 1000:.0f} ms ({args.runs} runs)")
+
+    imported = {module.split(".")[0] for module, self_time, cumulative_time, depth in modules}
+    eager = [module for module in LAZY_MODULES if module in imported]
+    if eager:
+        print(f"\nFAILED: imported at start-up, should be imported on first use: {', '.join(eager)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
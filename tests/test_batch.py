@@ -0,0 +1,63 @@
+"""
+Template file names, matching the templates of a folder with the English html of an export,
+and generating the templates over the process pool
+"""
+from ILX_translator_batch import TranslationJob, collect_jobs, generate_all, RECORD_ID_COLUMN, LOCALE_COLUMN, \
+    ENGLISH_COLUMN, TRANSLATED_COLUMN
+from ILX_translator_excel import parse_template_filename, write_translation_template, write_locale_template
+import pytest
+
+RECORD_ID = "3f2504e0-4f89-11d3-9a0c-0305e82c3301"
+
+
+@pytest.mark.parametrize("filename, expected", [
+    (f"{RECORD_ID}_fr-FR.xlsx", (RECORD_ID, "fr-FR")),
+    (f"folder/{RECORD_ID}_de-DE.XLSX", (RECORD_ID, "de-DE")),
+    (f"{RECORD_ID}_pt-BR.xls", (RECORD_ID, "pt-BR")),
+    (f"{RECORD_ID}_zh-Hant_TW.xlsx", (RECORD_ID, "zh-Hant_TW")),  # Split at the first underscore
+    (f"{RECORD_ID}.xlsx", None),  # Multi-locale template
+    (f"{RECORD_ID}_fr-FR.html", None),
+    ("_fr-FR.xlsx", None),
+    (f"{RECORD_ID}_.xlsx", None),
+])
+def test_parse_template_filename(filename, expected):
+    assert parse_template_filename(filename) == expected
+
+
+def test_collect_jobs(tmp_path):
+    pd = pytest.importorskip("pandas")
+    export_df = pd.DataFrame({
+        RECORD_ID_COLUMN: [RECORD_ID, RECORD_ID, "other"],
+        LOCALE_COLUMN: ["fr-FR", "fr-FR", "fr-FR"],
+        ENGLISH_COLUMN: ["Subject", "<p>Hello</p>", "<p>Other</p>"],
+        TRANSLATED_COLUMN: ["", "", ""],
+    })
+    write_translation_template(str(tmp_path / f"{RECORD_ID}_fr-FR.xlsx"), {"Hello": "Bonjour"})
+    write_locale_template(str(tmp_path / f"{RECORD_ID}.xlsx"),
+                          {"de-DE": {"Hello": "Hallo"}, "it-IT": {"Hello": "Ciao"}})
+    write_translation_template(str(tmp_path / "unknown_fr-FR.xlsx"), {"Hello": "Bonjour"})
+    (tmp_path / "notes.txt").write_text("not a template")
+
+    jobs, skipped = collect_jobs(export_df, str(tmp_path))
+    assert [(job.record_id, job.locale, job.english_html, job.translation_dict) for job in jobs] == [
+        (RECORD_ID, "de-DE", "<p>Hello</p>", {"Hello": "Hallo"}),
+        (RECORD_ID, "fr-FR", "<p>Hello</p>", {"Hello": "Bonjour"}),
+        (RECORD_ID, "it-IT", "<p>Hello</p>", {"Hello": "Ciao"}),
+    ]
+    assert skipped == ["notes.txt", "unknown_fr-FR.xlsx"]
+
+
+def test_generate_all_keeps_the_job_order():
+    # The first job is the largest, so it is not the first to finish on a pool of two workers
+    jobs = [TranslationJob("rec-1", "fr-FR", "".join(f"<p>Line {number}</p>" for number in range(3000)),
+                           {"Line 0": "Ligne 0"}),
+            TranslationJob("rec-2", "fr-FR", "<p>Hello</p><p>World</p>", {"Hello": "Bonjour", "World": "Monde"}),
+            TranslationJob("rec-3", "de-DE", "<p>Hello {#Name}</p><p>Closed</p>", {"Hello {#Name}": "Hallo {#Name}"})]
+    results = generate_all(jobs, workers=2, chunksize=1)
+    assert [(result.record_id, result.locale) for result in results] == \
+        [("rec-1", "fr-FR"), ("rec-2", "fr-FR"), ("rec-3", "de-DE")]
+    assert results == generate_all(jobs, workers=1)
+    assert results[1].translated_html == "<p>Bonjour</p><p>Monde</p>" and results[1].missing_lines == []
+    assert results[2].translated_html == "<p>Hallo {#Name}</p><p></p>"
+    assert results[2].missing_lines == ["Closed"]
+    assert len(results[0].missing_lines) == 2999
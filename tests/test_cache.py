@@ -0,0 +1,80 @@
+"""
+Content keys and the memory and on-disk tiers of ContentCache
+"""
+from ILX_translator_cache import content_key, ContentCache
+import os
+
+
+def test_content_key():
+    assert content_key("<p>a</p>", {"a": "b"}) == content_key("<p>a</p>", {"a": "b"})
+    assert content_key("<p>a</p>", {"a": "b"}) != content_key("<p>a</p>", {"a": "c"})
+    assert content_key("ab", "c") != content_key("a", "bc")  # Parts are separated
+    assert content_key("a") != content_key("a", "")
+    assert len(content_key("a")) == 64
+
+
+def test_memory_tier_drops_least_recently_used():
+    cache = ContentCache("test", max_items=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_get_or_compute():
+    cache = ContentCache("test")
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute(content_key("x"), lambda: calls.append(1) or "value") == "value"
+    assert len(calls) == 1
+
+
+def test_disk_tier_is_shared(tmp_path):
+    key = content_key("<p>a</p>")
+    ContentCache("test", folder=str(tmp_path)).put(key, ["a"])
+    other = ContentCache("test", folder=str(tmp_path))  # E.g. another process, or the next start
+    assert other.get(key) == ["a"]
+    assert ContentCache("other", folder=str(tmp_path)).get(key) is None
+
+
+def test_disk_tier_eviction(tmp_path):
+    cache = ContentCache("test", max_items=1, folder=str(tmp_path), max_disk_bytes=10000)
+    keys = [content_key(str(number)) for number in range(20)]
+    for key in keys:
+        cache.put(key, "x" * 1000)
+    assert cache.disk_bytes <= 10000
+    assert sum(size for path, size, modified in cache.disk_files()) == cache.disk_bytes
+    assert os.path.exists(cache.disk_path(keys[-1]))
+    assert not os.path.exists(cache.disk_path(keys[0]))
+
+
+def test_damaged_disk_file_is_a_miss(tmp_path):
+    cache = ContentCache("test", folder=str(tmp_path))
+    key = content_key("a")
+    cache.put(key, "value")
+    with open(cache.disk_path(key), "wb") as f:
+        f.write(b"not a pickle")
+    assert ContentCache("test", folder=str(tmp_path)).get(key) is None
+
+
+def test_structure_cache_key_is_versioned(monkeypatch):
+    import ILX_translator_engine as engine
+    html = "<p>Versioned structure</p>"
+    structure = engine.get_structure(html)
+    assert engine.get_structure(html) is structure
+    monkeypatch.setattr(engine, "STRUCTURE_FORMAT", engine.STRUCTURE_FORMAT + " next")
+    assert engine.get_structure(html) is not structure
+
+
+def test_generation_cache_key_is_versioned(monkeypatch):
+    import ILX_translator_engine as engine
+    html = "<p>Versioned generation</p>"
+    translation_dict = {"Versioned generation": "Génération versionnée"}
+    # Html generated by older splicing rules, cached under the key of the current format
+    engine.generation_cache.put(content_key(engine.GENERATION_FORMAT, html, translation_dict), "<p>stale</p>")
+    assert engine.generate_html(html, translation_dict) == "<p>stale</p>"
+    monkeypatch.setattr(engine, "GENERATION_FORMAT", engine.GENERATION_FORMAT + " next")
+    assert engine.generate_html(html, translation_dict) == "<p>Génération versionnée</p>"
@@ -0,0 +1,87 @@
+"""
+Generation of translated html: the extractor and splicer round trip, and the text-search fallback
+"""
+from ILX_translator_engine import TemplateStructure, ReplacementEngine
+from ILX_translator_extract import extract_lines
+import pytest
+
+HTMLS = [
+    "<p>Dear {#Name},</p><p>Your incident was closed.</p>",
+    "<html><head><title>Title</title></head><body><p>Dear <b>{#Name}</b>,</p>"
+    "<table><tr><td>Incident</td><td>{#Incident Number}</td></tr></table></body></html>",
+    "<div><p>First</p>Second</div>Third",
+    "<p>a&nbsp;&amp;&nbsp;b</p><p>Line<br>break</p>",
+    "<ul><li>One</li><li>Two</li><li>One</li></ul>",
+    "<p>  Spaced\n   out   text </p>",
+]
+
+
+def translated(line):
+    return f"[fr] {line}"
+
+
+@pytest.mark.parametrize("html", HTMLS)
+def test_identity_translation_keeps_lines(html):
+    structure = TemplateStructure(html)
+    assert extract_lines(structure.generate({line: line for line in structure.unique_lines()})) == \
+        extract_lines(html)
+
+
+def test_untranslated_html_is_unchanged():
+    html = HTMLS[1]
+    assert TemplateStructure(html).generate({}) == html
+
+
+@pytest.mark.parametrize("html", HTMLS)
+def test_generated_lines_are_translations(html):
+    structure = TemplateStructure(html)
+    translation_dict = {line: translated(line) for line in structure.unique_lines()}
+    expected = [line if line.startswith("{#") and line.endswith("}") else translated(line)
+                for line in extract_lines(html)]
+    assert extract_lines(structure.generate(translation_dict)) == expected
+
+
+def test_line_of_several_text_nodes():
+    structure = TemplateStructure("<p>Dear <b>{#Name}</b>, welcome</p>")
+    assert structure.unique_lines() == ["Dear {#Name}, welcome"]
+    html = structure.generate({"Dear {#Name}, welcome": "Bonjour {#Name}, bienvenue"})
+    # The other text nodes are emptied, the formatting of the line is lost
+    assert html == "<p>Bonjour {#Name}, bienvenue <b></b></p>"
+
+
+def test_repeated_lines_and_spelling():
+    structure = TemplateStructure("<p>Closed</p><p>closed</p><p>Open</p>")
+    assert structure.unique_lines() == ["Closed", "Open"]
+    html = structure.generate({"CLOSED": "Fermé", "Closed": "Clôturé"})  # The exact English text wins
+    assert html == "<p>Clôturé</p><p>Clôturé</p><p>Open</p>"
+
+
+def test_translations_are_escaped():
+    structure = TemplateStructure("<p>Terms</p><p>Rock &amp; Roll</p>")
+    html = structure.generate({"Terms": "A < B", "Rock & Roll": "Rock & Roll"})
+    assert html == "<p>A &lt; B</p><p>Rock &amp; Roll</p>"
+
+
+def test_translation_markup_is_text():
+    structure = TemplateStructure("<p>Terms</p><p>Closed</p>")
+    html = structure.generate({"Terms": "<b>Conditions</b>", "Closed": "Fermé &amp; archivé"})
+    assert html == "<p>&lt;b&gt;Conditions&lt;/b&gt;</p><p>Fermé &amp;amp; archivé</p>"
+
+
+def test_multiple_spaces_are_collapsed():
+    structure = TemplateStructure("<p>Hello</p>   <p>World</p>")
+    assert structure.generate({"Hello": "Bonjour"}) == "<p>Bonjour</p> <p>World</p>"
+    # Same result when the text-search fallback runs (a template line which is not in the html)
+    assert structure.generate({"Hello": "Bonjour", "Old text": "Ancien"}) == "<p>Bonjour</p> <p>World</p>"
+
+
+def test_text_search_fallback_is_escaped():
+    # "Old text" is not a line of the html (e.g. template of an older html version), it is searched in the html
+    structure = TemplateStructure("<p>Old text, and more</p>")
+    assert structure.generate({"Old text": "A & B"}) == "<p>A &amp; B, and more</p>"
+
+
+def test_replacement_engine_is_leftmost_longest():
+    engine = ReplacementEngine(["World", "Hello World"])
+    assert engine.generate("Hello World World", {"World": "W", "Hello World": "HW"}) == "HW W"
+    assert engine.generate("hello   world", {"Hello World": "HW"}) == "HW"
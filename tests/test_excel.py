@@ -0,0 +1,79 @@
+"""
+Reading and writing Translation templates
+"""
+from ILX_translator_excel import iter_template_rows, read_translation_template, read_locale_template, \
+    write_translation_template, write_locale_template, write_translation_template_files, column_width
+import os
+import pytest
+
+
+def write_sheet(filename, rows):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(filename)
+
+
+def test_iter_template_rows(tmp_path):
+    filename = str(tmp_path / "template.xlsx")
+    write_sheet(filename, [["Translation", "English", "Notes"], ["Bonjour", "Hello", "x"], [None, "World"],
+                           [None, None], ["Fermé", "Closed"]])
+    # Columns are found by name, empty English rows are skipped, empty cells are empty strings
+    assert list(iter_template_rows(filename)) == [("Hello", "Bonjour"), ("World", ""), ("Closed", "Fermé")]
+
+
+def test_missing_columns(tmp_path):
+    filename = str(tmp_path / "template.xlsx")
+    write_sheet(filename, [["English", "Translated"], ["Hello", "Bonjour"]])
+    with pytest.raises(ValueError, match="not a Translation template"):
+        read_translation_template(filename)
+    with pytest.raises(ValueError, match="not a Translation template"):
+        list(iter_template_rows(filename, columns=("fr-FR",)))
+
+
+def test_missing_columns_xls(tmp_path, monkeypatch):
+    # .xls templates are read with pandas (xlrd), the same columns are required
+    import pandas as pd
+    filename = tmp_path / "template.xls"
+    filename.write_bytes(b"")
+    monkeypatch.setattr(pd, "read_excel", lambda *args, **kwargs: pd.DataFrame({"English": ["Hello"], "fr": ["x"]}))
+    with pytest.raises(ValueError, match="not a Translation template"):
+        read_translation_template(str(filename))
+    assert list(iter_template_rows(str(filename), columns=("fr",))) == [("Hello", "x")]
+
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / "template.xlsx")
+    write_translation_template(filename, {"Hello": "Bonjour", "World": ""})
+    assert read_translation_template(filename) == {"Hello": "Bonjour", "World": ""}
+    assert read_locale_template(filename) == {}  # Not a multi-locale template
+
+
+def test_multi_locale_template(tmp_path):
+    filename = str(tmp_path / "template.xlsx")
+    write_locale_template(filename, {"fr-FR": {"Hello": "Bonjour", "World": "Monde"}, "de-DE": {"Hello": "Hallo"}})
+    assert read_locale_template(filename) == {"fr-FR": {"Hello": "Bonjour", "World": "Monde"},
+                                              "de-DE": {"Hello": "Hallo", "World": ""}}
+    assert list(iter_template_rows(filename, columns=("de-DE",))) == [("Hello", "Hallo"), ("World", "")]
+
+
+def test_template_files_stay_in_the_folder(tmp_path):
+    folder = tmp_path / "templates"
+    rows = [("Hello", "Bonjour")]
+    filenames = write_translation_template_files(str(folder), [(name, rows) for name in
+                                                               ("Welcome", "../outside", "a/b\\c:d", "..", "CON")])
+    assert [os.path.basename(filename) for filename in filenames] == \
+        ["Welcome.xlsx", "_outside.xlsx", "a_b_c_d.xlsx", "Notification.xlsx", "_CON.xlsx"]
+    assert sorted(os.listdir(tmp_path)) == ["templates"]
+    assert all(os.path.dirname(filename) == str(folder) for filename in filenames)
+    assert read_translation_template(filenames[1]) == {"Hello": "Bonjour"}
+
+
+def test_column_widths(tmp_path):
+    from openpyxl import load_workbook
+    filename, = write_translation_template_files(str(tmp_path), [("Welcome", [("A longer English line", "Bonjour"),
+                                                                              ("Hello", "")])])
+    worksheet = load_workbook(filename).active
+    assert worksheet.column_dimensions["A"].width == pytest.approx(column_width(len("A longer English line")))
+    assert worksheet.column_dimensions["B"].width == pytest.approx(column_width(len("Translation")))  # The header
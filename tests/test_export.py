@@ -0,0 +1,79 @@
+"""
+Indexing an Application Translation export by RecordID
+"""
+from ILX_translator_export import ExportIndex, read_export_index, iter_export_rows, is_html, \
+    RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, TRANSLATED_COLUMN
+import pytest
+
+
+def write_export(filename, header, rows):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    workbook.active.append(header)
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(filename)
+
+
+@pytest.fixture
+def export(tmp_path):
+    filename = str(tmp_path / "export.xlsx")
+    write_export(filename, ["Notes", RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, TRANSLATED_COLUMN], [
+        ["", "rec-1", "fr-FR", "<p>Incident closed</p>", "<p>Incident clôturé</p>"],
+        ["", "rec-1", "fr-FR", "Incident closed", "Incident clôturé"],
+        ["", "rec-1", "de-DE", "<p>Incident closed</p>", None],
+        ["", "rec-2", "fr-FR", "<p>Safety notice</p>", "<p>Avis de sécurité</p>"],
+        ["", "rec-2", "fr-FR", "Safety Notice", ""],
+        ["", None, "fr-FR", "<p>No RecordID</p>", ""],
+    ])
+    return filename
+
+
+def test_is_html():
+    assert is_html("<p>Incident closed</p>")
+    assert not is_html("Incident closed")
+    assert not is_html("a < b")
+    assert not is_html(None)
+
+
+def test_iter_export_rows(export):
+    rows = list(iter_export_rows(export))
+    assert rows[0] == ("rec-1", "fr-FR", "<p>Incident closed</p>", "<p>Incident clôturé</p>")
+    assert rows[2] == ("rec-1", "de-DE", "<p>Incident closed</p>", "")  # Empty cells are empty strings
+    assert len(rows) == 6
+
+
+def test_missing_columns(tmp_path):
+    filename = str(tmp_path / "template.xlsx")
+    write_export(filename, ["English", "Translation"], [["Hello", "Bonjour"]])
+    with pytest.raises(ValueError, match="missing column"):
+        read_export_index(filename)
+
+
+def test_lookup_record(export):
+    index = read_export_index(export)
+    assert len(index) == 2 and "rec-1" in index and "" not in index
+    record = index["rec-1"]
+    assert record.english_html == "<p>Incident closed</p>"
+    assert record.subject == "Incident closed"
+    assert record.translated_htmls() == {"fr-FR": "<p>Incident clôturé</p>"}  # de-DE is not translated
+    assert record.locales() == ["fr-FR"]
+    assert [record.record_id for record in index] == ["rec-1", "rec-2"]
+
+
+def test_search(export):
+    index = read_export_index(export)
+    assert [record.record_id for record in index.search("safety")] == ["rec-2"]  # Subject title
+    assert [record.record_id for record in index.search(" REC-1 ")] == ["rec-1"]  # RecordID
+    assert [record.record_id for record in index.search("")] == ["rec-1", "rec-2"]
+    assert index.search("clôturé") == []  # Translations are not searched
+    assert index.search("missing") == []
+
+
+def test_add_row():
+    index = ExportIndex()
+    index.add_row("rec-1", "", "Subject", "")
+    index.add_row("rec-1", "fr-FR", "<p>Body</p>", "<p>Corps</p>")
+    index.finish()
+    assert index["rec-1"].english == {"subject": "Subject", "body": "<p>Body</p>"}
+    assert index["rec-1"].translations == {"body": {"fr-FR": "<p>Corps</p>"}}
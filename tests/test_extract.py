@@ -0,0 +1,65 @@
+"""
+The html.parser extractor must give the same lines as the QTextDocument extraction it replaced
+"""
+from ILX_translator_extract import extract_lines, iter_lines
+import pytest
+import re
+
+HTMLS = [
+    "<p>Dear {#Name},</p><p>Your incident was closed.</p>",
+    "<p>a</p>b",
+    "<div>a</div>b",
+    "<div>a</div><div>b</div>c",
+    "<div><p>a</p>b</div>c",
+    "<div>a<p>b</p>c</div>d",
+    "<div><div>a</div>b</div>c",
+    "<div>x<div>a</div>b</div>c",
+    "<div><b>a</b></div>b",
+    "<div><span>a</span>b</div>c",
+    "<div><h1>a</h1>b</div>c",
+    "<div>a<br>b</div>c",
+    "<td><div><b>a</b></div>b</td>",
+    "<ul><li>a</li>b</ul>c",
+    "<table><tr><td>a</td><td>b</td></tr></table>c",
+    "<blockquote><p>a</p>b</blockquote>c",
+    "<p>a<br>b</p>",
+    "<p>a   b</p>",
+    "<p>a\u2028b</p>",
+    "<p>a \u2028 b</p>",
+    "<p>a&#x2028;b</p>",
+    "<p>a\u2029b</p>",
+    "<pre>a\u2028b\u2029c\n  d</pre>",
+    "<p>a&nbsp;&amp;&nbsp;b</p>",
+    "<p>Logo <img src='logo.png'> text</p>",
+    "<html><head><title>Title</title><style>p {}</style></head><body><p>a</p></body></html>",
+]
+
+
+def qt_lines(html):
+    """
+    Extraction of the original Translation tab: QTextDocument.toPlainText split on line breaks
+    """
+    from PyQt5.QtGui import QTextDocument
+    document = QTextDocument()
+    document.setHtml(html)
+    return [line.strip() for line in re.split(r'[\r\n]', document.toPlainText()) if line.strip()]
+
+
+@pytest.mark.parametrize("html", HTMLS)
+def test_same_lines_as_qtextdocument(app, html):
+    assert extract_lines(html) == qt_lines(html)
+
+
+def test_chunked_parsing():
+    html = "".join(f"<p>Line {number} of the <b>notification</b></p>" for number in range(500))
+    assert [line.text for line in iter_lines(html, chunk_size=7)] == extract_lines(html)
+
+
+def test_segments_are_source_spans():
+    html = "<p>Dear <b>{#Name}</b>,</p><div>a &amp; b</div>"
+    for line in iter_lines(html):
+        assert line.segments
+        for segment in line.segments:
+            assert html[segment.start:segment.end].strip() == html[segment.start:segment.end]
+    assert [[html[s.start:s.end] for s in line.segments] for line in iter_lines(html)] == \
+        [["Dear", "{#Name}", ","], ["a &amp; b"]]
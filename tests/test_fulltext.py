@@ -0,0 +1,131 @@
+"""
+Updating and searching the full-text index of exports and html files
+"""
+from ILX_translator_fulltext import SearchIndex, fts_query, html_filename_parts, field_tokens
+from ILX_translator_export import RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, TRANSLATED_COLUMN
+import ILX_translator_fulltext
+import os
+import pytest
+
+
+def write_export(filename, rows):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append([RECORD_ID_COLUMN, LOCALE_COLUMN, ENGLISH_COLUMN, TRANSLATED_COLUMN])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(filename)
+
+
+def touch(path, seconds):
+    """
+    Moves the modification time, a rewrite within the same clock tick would not be seen as a change
+    """
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + seconds))
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex(":memory:")
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def folder(tmp_path):
+    write_export(str(tmp_path / "export.xlsx"), [
+        ["rec-1", "fr-FR", "<p>Privacy disclaimer for {#Incident Number}</p>", "<p>Avis de confidentialité</p>"],
+        ["rec-1", "fr-FR", "Incident closed", "Incident clôturé"],
+        ["rec-2", "fr-FR", '<p class="footer">Safety notice</p>', ""],
+    ])
+    (tmp_path / "Welcome_de-DE.html").write_text("<p>Willkommen {#Name}</p>", encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("Privacy disclaimer", encoding="utf-8")  # Not indexed
+    return tmp_path
+
+
+def records(hits):
+    return sorted((hit.record_id, hit.locale, hit.field) for hit in hits)
+
+
+def test_update_indexes_exports_and_html(index, folder):
+    assert index.update([str(folder)]) == (2, 0)
+    # Export: English body and subject of rec-1 and their translations, English body of rec-2. One html file.
+    assert index.document_count() == 6
+    assert records(index.search("disclaimer")) == [("rec-1", "", "body")]
+    assert records(index.search('"privacy disclaimer"')) == [("rec-1", "", "body")]
+    assert records(index.search("{#Incident Number}")) == [("rec-1", "", "body")]
+    assert records(index.search("confidential")) == [("rec-1", "fr-FR", "body")]  # Prefix of the last word
+    assert records(index.search("closed")) == [("rec-1", "", "subject")]
+    assert records(index.search("willkommen")) == [("Welcome", "de-DE", "body")]
+    assert index.search("footer") == []  # Tags and attributes are not indexed
+    hit, = index.search("safety")
+    assert index.document_html(hit.document_id) == '<p class="footer">Safety notice</p>'
+    assert index.record_htmls(hit.source, "rec-1") == {"": "<p>Privacy disclaimer for {#Incident Number}</p>",
+                                                        "fr-FR": "<p>Avis de confidentialité</p>"}
+
+
+def test_update_only_reads_changed_files(index, folder):
+    index.update([str(folder)])
+    assert index.update() == (0, 0)
+
+    (folder / "Welcome_de-DE.html").write_text("<p>Guten Tag {#Name}</p>", encoding="utf-8")
+    touch(folder / "Welcome_de-DE.html", 10)
+    (folder / "Reminder.htm").write_text("<p>Reminder</p>", encoding="utf-8")  # New file of a watched folder
+    assert index.update() == (2, 0)
+    assert index.search("willkommen") == []
+    assert records(index.search("guten")) == [("Welcome", "de-DE", "body")]
+    assert records(index.search("reminder")) == [("Reminder", "", "body")]
+
+    os.remove(folder / "export.xlsx")
+    assert index.update() == (0, 1)
+    assert index.search("disclaimer") == []
+    assert index.document_count() == 2
+
+
+def test_unreadable_files_are_indexed_without_documents(index, folder):
+    (folder / "damaged.xlsx").write_bytes(b"not a workbook")
+    from openpyxl import Workbook
+    workbook = Workbook()
+    workbook.active.append(["English", "Translation"])  # Translation template, not an export
+    workbook.save(str(folder / "template.xlsx"))
+
+    assert index.update([str(folder)]) == (4, 0)
+    documents = dict(index.connection.execute("SELECT path, documents FROM sources"))
+    assert documents[str(folder / "damaged.xlsx")] == 0
+    assert documents[str(folder / "template.xlsx")] == 0
+    assert documents[str(folder / "export.xlsx")] == 5
+    assert index.update() == (0, 0)  # Not read again until they change
+
+
+def test_other_errors_are_not_hidden(index, folder, monkeypatch):
+    def fail(path):
+        raise RuntimeError("Bug")
+
+    monkeypatch.setattr(ILX_translator_fulltext, "export_documents", fail)
+    with pytest.raises(RuntimeError):
+        index.update([str(folder)])
+
+
+def test_fts_query():
+    assert fts_query("privacy disc") == 'text : "privacy" AND text : "disc"*'
+    assert fts_query('"privacy disclaimer" notice') == 'text : "privacy disclaimer" AND text : "notice"*'
+    assert fts_query("{#Incident Number}") == 'fields : "incident_number"'
+    assert fts_query('" - "') is None
+    assert fts_query("") is None
+
+
+def test_field_tokens():
+    assert field_tokens("<p>{#Incident Number} at {#Location.Name}</p>") == "incident_number location_name"
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("Welcome.html", ("Welcome", "")),
+    ("folder/Welcome_fr-FR.htm", ("Welcome", "fr-FR")),
+    ("Incident_closed_zh-Hant-TW.html", ("Incident_closed", "zh-Hant-TW")),
+    ("Incident_closed.html", ("Incident_closed", "")),
+    ("Incident_2024.html", ("Incident_2024", "")),
+])
+def test_html_filename_parts(filename, expected):
+    assert html_filename_parts(filename) == expected
@@ -0,0 +1,70 @@
+"""
+Exact and fuzzy lookups of the translation memory
+"""
+from ILX_translator_memory import TranslationMemory, is_translated, trigrams
+import pytest
+
+
+@pytest.fixture
+def memory():
+    memory = TranslationMemory(":memory:")
+    yield memory
+    memory.close()
+
+
+def test_exact_lookup_ignores_case_and_spaces(memory):
+    assert memory.add("fr-FR", {"Your incident was closed.": "Votre incident a été clôturé."}) == 1
+    assert memory.lookup("fr-FR", "Your incident was closed.") == "Votre incident a été clôturé."
+    assert memory.lookup("fr-FR", "  your   INCIDENT was closed. ") == "Votre incident a été clôturé."
+    assert memory.lookup("de-DE", "Your incident was closed.") is None
+    assert memory.lookup("fr-FR", "Your incident was opened.") is None
+
+
+def test_latest_translation_wins(memory):
+    memory.add("fr-FR", {"Closed": "Fermé"})
+    memory.add("fr-FR", {"closed": "Clôturé"})
+    assert memory.lookup("fr-FR", "Closed") == "Clôturé"
+
+
+def test_untranslated_rows_are_not_stored(memory):
+    stored = memory.add("fr-FR", {"Dear {#Name},": "{#Name}", "Empty": " ", "{#Incident Number}": "{#Incident Number}"})
+    assert stored == 1  # Only the line which is only a field, its translation is the line itself
+    assert memory.lookup("fr-FR", "Dear {#Name},") is None
+    assert memory.lookup("fr-FR", "{#Incident Number}") == "{#Incident Number}"
+
+
+def test_is_translated():
+    assert is_translated("Dear {#Name},", "Cher {#Name},")
+    assert not is_translated("Dear {#Name},", "{#Name}")
+    assert not is_translated("Hello", "   ")
+    assert is_translated("{#Name}", "{#Name}")
+
+
+def test_fuzzy_suggestions(memory):
+    memory.add("fr-FR", {
+        "Your incident was closed.": "Votre incident a été clôturé.",
+        "Your incident was closed today.": "Votre incident a été clôturé aujourd'hui.",
+        "Please contact the safety manager.": "Veuillez contacter le responsable sécurité.",
+    })
+    suggestions = memory.suggest("fr-FR", "Your incident has been closed.")
+    assert [english for similarity, english, translation in suggestions] == \
+        ["Your incident was closed.", "Your incident was closed today."]
+    assert all(0.75 <= similarity < 1 for similarity, english, translation in suggestions)
+    assert suggestions == sorted(suggestions, reverse=True)
+    assert memory.suggest("fr-FR", "Something else entirely") == []
+    assert memory.suggest("de-DE", "Your incident was closed.") == []
+    assert len(memory.suggest("fr-FR", "Your incident was closed.", limit=1)) == 1
+
+
+def test_memory_is_persistent(tmp_path):
+    path = str(tmp_path / "memory" / "translation_memory.sqlite")
+    memory = TranslationMemory(path)
+    memory.add("fr-FR", {"Hello": "Bonjour"})
+    memory.close()
+    memory = TranslationMemory(path)
+    assert memory.lookup("fr-FR", "hello") == "Bonjour"
+    memory.close()
+
+
+def test_trigrams():
+    assert trigrams("abc") == {"  a", " ab", "abc", "bc "}
@@ -0,0 +1,58 @@
+"""
+Translation columns of the Translation tab model, one per locale
+"""
+from ILX_translator_excel import write_locale_template, read_locale_template
+from ILX_translator_model import TranslationTableModel
+import pytest
+
+
+@pytest.fixture
+def model(app):
+    model = TranslationTableModel()
+    model.default_translation = lambda line, locale: f"<{locale}>"
+    model.set_rows([["Hello", "Bonjour"], ["World", "Monde"]])
+    return model
+
+
+def test_single_to_multiple_columns_keeps_the_first(model):
+    model.set_locales(["fr-FR", "de-DE"])
+    assert model.headers == ["English", "fr-FR", "de-DE"]
+    assert model.rows == [["Hello", "Bonjour", "<de-DE>"], ["World", "Monde", "<de-DE>"]]
+    assert model.columnCount() == 3
+    assert [model.column_locale(column) for column in model.translation_columns()] == ["fr-FR", "de-DE"]
+
+
+def test_remaining_locales_are_kept(model):
+    model.set_locales(["fr-FR", "de-DE"])
+    model.setData(model.index(0, 2), "Hallo")
+    model.set_locales(["nl-NL", "de-DE"])  # fr-FR removed, de-DE moves to the second column
+    assert model.rows == [["Hello", "<nl-NL>", "Hallo"], ["World", "<nl-NL>", "<de-DE>"]]
+    model.set_locales(["de-DE", "nl-NL"])  # Reordered
+    assert model.rows == [["Hello", "Hallo", "<nl-NL>"], ["World", "<de-DE>", "<nl-NL>"]]
+
+
+def test_multiple_to_single_column_keeps_the_first(model):
+    model.set_locales(["fr-FR", "de-DE"])
+    model.set_locales([])
+    assert model.headers == ["English", "Translation"]
+    assert model.rows == [["Hello", "Bonjour"], ["World", "Monde"]]
+    assert model.column_locale(1) is None
+
+
+def test_other_locales_get_the_default(model):
+    model.set_locales(["fr-FR", "de-DE"])
+    model.set_locales(["es-ES", "it-IT"])  # No locale remains
+    assert model.rows == [["Hello", "<es-ES>", "<it-IT>"], ["World", "<es-ES>", "<it-IT>"]]
+
+
+def test_multi_locale_export(model, tmp_path):
+    model.set_locales(["fr-FR", "de-DE"])
+    model.setData(model.index(1, 2), "Welt")
+    # Same as MyMainWindow.create_dictionaries: one dictionary per Translation column
+    translation_dicts = {model.column_locale(column): model.translation_dict(column)
+                         for column in model.translation_columns()}
+    assert translation_dicts == {"fr-FR": {"Hello": "Bonjour", "World": "Monde"},
+                                 "de-DE": {"Hello": "<de-DE>", "World": "Welt"}}
+    filename = str(tmp_path / "template.xlsx")
+    write_locale_template(filename, translation_dicts)
+    assert read_locale_template(filename) == translation_dicts
@@ -0,0 +1,151 @@
+"""
+Machine translation against the stub service (ILX_translator_mt.stub_server), which fails a part of the requests
+"""
+from ILX_translator_mt import machine_translate, make_batches, mask_fields, unmask_fields, stub_server, \
+    translate_with_retry, HttpJsonProvider, MachineTranslationCache, MachineTranslationProvider, TransientError
+import asyncio
+import pytest
+import threading
+
+FAIL_RATE = 0.3
+
+
+class CountingProvider(HttpJsonProvider):
+    """
+    HttpJsonProvider which records the batch of every request
+    """
+    max_batch_lines = 5
+
+    def __init__(self, url):
+        super().__init__(url, timeout=10)
+        self.requests = []
+
+    def post(self, document):
+        self.requests.append(list(document["texts"]))
+        return super().post(document)
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = stub_server(0, fail_rate=FAIL_RATE)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/translate"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache():
+    cache = MachineTranslationCache(":memory:")
+    yield cache
+    cache.close()
+
+
+def english_lines(count):
+    return [f"Line {number} of the notification" for number in range(count)]
+
+
+def test_retries_failed_requests(stub_url, cache):
+    provider = CountingProvider(stub_url)
+    lines = english_lines(200)  # 40 batches: without a single failure with a fail rate of 0.3 is very unlikely
+    result = machine_translate(lines, "fr-FR", provider, cache, retries=20, backoff=0.001)
+    assert result.errors == []
+    assert result.translations == {line: f"[fr-FR] {line}" for line in lines}
+    assert (result.cached, result.requested) == (0, 200)
+    assert len(provider.requests) > 40  # Every batch once, and the retries of the failed requests
+
+
+def test_second_run_uses_cache(stub_url, cache):
+    lines = english_lines(30)
+    first = machine_translate(lines, "fr-FR", CountingProvider(stub_url), cache, retries=20, backoff=0.001)
+    provider = CountingProvider(stub_url)
+    second = machine_translate(lines, "fr-FR", provider, cache, retries=20, backoff=0.001)
+    assert (second.cached, second.requested) == (30, 0)
+    assert provider.requests == []
+    assert second.translations == first.translations
+    # Another locale is not in the cache
+    assert machine_translate(lines, "de-DE", provider, cache, retries=20, backoff=0.001).requested == 30
+
+
+def test_batches(stub_url, cache):
+    provider = CountingProvider(stub_url)
+    lines = english_lines(23)
+    machine_translate(lines, "fr-FR", provider, cache, retries=20, backoff=0.001)
+    batches = {tuple(batch) for batch in provider.requests}  # A retried batch is sent again unchanged
+    assert sorted(len(batch) for batch in batches) == [3, 5, 5, 5, 5]
+    assert sorted(text for batch in batches for text in batch) == sorted(lines)
+
+
+def test_make_batches():
+    assert make_batches(["a", "b", "c"], 2, 100) == [["a", "b"], ["c"]]
+    assert make_batches(["aaaa", "b", "cccccc", "d"], 10, 5) == [["aaaa", "b"], ["cccccc"], ["d"]]
+    assert make_batches([], 2, 100) == []
+
+
+def test_fields_are_kept(stub_url, cache):
+    provider = CountingProvider(stub_url)
+    lines = ["Dear {#Name},", "Dear {#Requester},", "{#Incident Number}", "Incident {#Number} of {#Location}", "2024"]
+    result = machine_translate(lines, "fr-FR", provider, cache, retries=20, backoff=0.001)
+    assert result.translations == {
+        "Dear {#Name},": "[fr-FR] Dear {#Name},",
+        "Dear {#Requester},": "[fr-FR] Dear {#Requester},",
+        "Incident {#Number} of {#Location}": "[fr-FR] Incident {#Number} of {#Location}",
+    }
+    # Only the masked texts are sent: lines which only differ in their fields share one text, no field is sent
+    texts = {text for batch in provider.requests for text in batch}
+    assert texts == {'Dear <x id="0"/>,', 'Incident <x id="0"/> of <x id="1"/>'}
+
+
+def test_translation_without_placeholder_is_rejected(cache):
+    class DroppingProvider(MachineTranslationProvider):
+        async def translate(self, texts, source_locale, target_locale):
+            return [text.split("<")[0] for text in texts]
+
+    result = machine_translate(["Dear {#Name},"], "fr-FR", DroppingProvider(), cache)
+    assert result.translations == {}
+    assert result.errors == ["Rejected, ILX fields changed: Dear {#Name},"]
+
+
+def test_mask_fields():
+    text, fields = mask_fields("{#Name} reported {#Incident Number}")
+    assert text == '<x id="0"/> reported <x id="1"/>'
+    assert unmask_fields('<x id="1"/> : <x id="0"/>', fields) == "{#Incident Number} : {#Name}"
+    assert unmask_fields('<x id="0"/>', fields) is None
+    assert unmask_fields('<x id="0"/> <x id="0"/>', fields) is None
+
+
+def test_exponential_backoff(monkeypatch):
+    class FailingProvider(MachineTranslationProvider):
+        attempts = 0
+
+        async def translate(self, texts, source_locale, target_locale):
+            self.attempts += 1
+            if self.attempts <= 3:
+                raise TransientError("HTTP 503", retry_after=5.0 if self.attempts == 3 else None)
+            return texts
+
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    provider = FailingProvider()
+    translations = asyncio.run(translate_with_retry(provider, ["a"], "en", "fr-FR", asyncio.Semaphore(1),
+                                                    retries=3, backoff=1.0))
+    assert translations == ["a"]
+    assert provider.attempts == 4
+    # Backoff doubles (with up to 50 % jitter), a Retry-After of the provider wins
+    for delay, base in zip(delays, [1.0, 2.0, 5.0]):
+        assert base <= delay <= base * 1.5
+
+
+def test_gives_up_after_retries():
+    class FailingProvider(MachineTranslationProvider):
+        async def translate(self, texts, source_locale, target_locale):
+            raise TransientError("HTTP 503")
+
+    result = machine_translate(["Hello"], "fr-FR", FailingProvider(), retries=2, backoff=0.001)
+    assert result.translations == {}
+    assert result.errors == ["1 line(s) failed: HTTP 503"]
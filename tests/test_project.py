@@ -0,0 +1,83 @@
+"""
+Saving and opening the templates of a project file
+"""
+from ILX_translator_engine import TemplateStructure
+from ILX_translator_project import TemplateSession, save_template, load_template, project_template_names, \
+    session_to_json, session_from_json
+import ILX_translator_project
+import os
+import pytest
+import zipfile
+
+
+def session(name, html, translation, locales=()):
+    structure = TemplateStructure(html)
+    rows = [[line, translation] for line in structure.unique_lines()]
+    return TemplateSession(name, ", ".join(locales), list(locales), rows,
+                           {locale: structure.generate({"Hello": translation}) for locale in locales or [""]},
+                           structure)
+
+
+def assert_same_session(loaded, expected):
+    assert session_to_json(loaded) == session_to_json(expected)
+    assert loaded.structure.lines == expected.structure.lines
+
+
+def test_session_json_round_trip():
+    expected = session("Welcome", "<p>Hello <b>dear</b> {#Name}</p><p>Hello</p>", "Bonjour", ["fr-FR", "fr-CA"])
+    loaded = session_from_json(session_to_json(expected))
+    assert_same_session(loaded, expected)
+    assert loaded.structure.generate({"Hello": "Salut"}) == expected.structure.generate({"Hello": "Salut"})
+
+
+def test_save_replace_and_load(tmp_path):
+    filename = str(tmp_path / "project.ilxproj")
+    welcome = session("Welcome", "<p>Hello</p>", "Bonjour", ["fr-FR"])
+    closed = session("Incident closed", "<p>Hello</p><p>Closed</p>", "Hallo", ["de-DE"])
+    save_template(filename, welcome)
+    save_template(filename, closed)
+    assert project_template_names(filename) == ["Welcome", "Incident closed"]
+
+    replaced = session("Welcome", "<p>Hello again</p>", "Rebonjour")
+    save_template(filename, replaced)
+    assert project_template_names(filename) == ["Welcome", "Incident closed"]  # Replaced by name, order is kept
+    assert_same_session(load_template(filename, "Welcome"), replaced)
+    assert_same_session(load_template(filename, "Incident closed"), closed)
+    assert_same_session(load_template(filename), replaced)  # First template
+    assert os.listdir(tmp_path) == ["project.ilxproj"]  # No temporary files left
+
+
+def test_failed_save_keeps_the_previous_project(tmp_path, monkeypatch):
+    filename = str(tmp_path / "project.ilxproj")
+    welcome = session("Welcome", "<p>Hello</p>", "Bonjour")
+    save_template(filename, welcome)
+
+    def fail(source, destination):
+        raise OSError("Disk full")
+
+    monkeypatch.setattr(ILX_translator_project.os, "replace", fail)
+    with pytest.raises(OSError):
+        save_template(filename, session("Other", "<p>Other</p>", ""))
+    monkeypatch.undo()
+    assert project_template_names(filename) == ["Welcome"]
+    assert os.listdir(tmp_path) == ["project.ilxproj"]
+
+
+def test_missing_or_corrupt_project(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_template(str(tmp_path / "missing.ilxproj"))
+
+    corrupt = tmp_path / "corrupt.ilxproj"
+    corrupt.write_bytes(b"Not a zip archive")
+    with pytest.raises(ValueError, match="not an ILX translator project"):
+        load_template(str(corrupt))
+    with pytest.raises(ValueError, match="not an ILX translator project"):
+        project_template_names(str(corrupt))
+    with pytest.raises(ValueError, match="not an ILX translator project"):
+        save_template(str(corrupt), session("Welcome", "<p>Hello</p>", "Bonjour"))
+    assert corrupt.read_bytes() == b"Not a zip archive"
+
+    with zipfile.ZipFile(tmp_path / "other.zip", "w") as archive:
+        archive.writestr("readme.txt", "Not a project")
+    with pytest.raises(ValueError, match="project.json is missing"):
+        load_template(str(tmp_path / "other.zip"))
@@ -0,0 +1,167 @@
+"""
+HTTP/JSON service: endpoints, errors and the Content-Disposition of exported templates
+"""
+from ILX_translator_service import TranslationService, HTTPError, content_disposition, read_request, run_batch
+from urllib.request import Request, urlopen
+import asyncio
+import json
+import os
+import pytest
+import signal
+import subprocess
+import sys
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = TranslationService(workers=1)
+    yield service
+    service.close()
+
+
+async def post(port, path, body, headers=""):
+    """
+    :return: (status, headers, body) of one request on a new connection
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n{headers}"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    response_headers = dict(line.split(": ", 1) for line in header_lines)
+    if response_headers.get("Transfer-Encoding") == "chunked":
+        chunks = []
+        while True:
+            size, _, content = content.partition(b"\r\n")
+            if int(size, 16) == 0:
+                break
+            chunks.append(content[:int(size, 16)])
+            content = content[int(size, 16) + 2:]
+        content = b"".join(chunks)
+    return int(status_line.split()[1]), response_headers, content
+
+
+def request(service, path, body, headers=""):
+    async def run():
+        ports = []
+        serving = asyncio.ensure_future(service.serve("127.0.0.1", 0, ready=ports.append))
+        while not ports:
+            await asyncio.sleep(0.01)
+        try:
+            return await post(ports[0], path, body, headers)
+        finally:
+            serving.cancel()
+
+    return asyncio.run(run())
+
+
+def test_generate(service):
+    status, headers, body = request(service, "/generate", {"html": "<p>Hello</p><p>World</p>",
+                                                           "translations": {"Hello": "Bonjour"}})
+    assert status == 200
+    # Like the Translation tab, a line without translation gets its ILX fields (here none)
+    assert json.loads(body) == {"html": "<p>Bonjour</p><p></p>", "missing_lines": ["World"]}
+
+
+def test_generate_jobs_stream(service):
+    jobs = [{"record_id": str(number), "locale": "fr-FR", "html": f"<p>Line {number}</p>",
+             "translations": {f"Line {number}": f"Ligne {number}"}} for number in range(5)]
+    status, headers, body = request(service, "/generate", {"jobs": jobs})
+    assert status == 200
+    results = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert [(result["record_id"], result["html"]) for result in results] == \
+        [(str(number), f"<p>Ligne {number}</p>") for number in range(5)]
+
+
+def test_extract(service):
+    status, headers, body = request(service, "/extract", {"html": "<p>Dear {#Name},</p><p>Bye</p><p>Bye</p>"})
+    assert status == 200
+    assert json.loads(body) == {"lines": ["Dear {#Name},", "Bye"]}
+
+
+def test_invalid_requests(service):
+    assert request(service, "/generate", b"not json")[0] == 400
+    assert request(service, "/generate", {"translations": {}})[0] == 400  # Missing html
+    assert request(service, "/unknown", {})[0] == 404
+    assert request(service, "/import-template", b"not a workbook")[0] == 400
+
+
+def test_invalid_translations(service):
+    assert request(service, "/generate", {"html": "<p>Hello</p>", "translations": {"Hello": 5}})[0] == 400
+    assert request(service, "/generate", {"jobs": [{"html": "<p>Hello</p>", "translations": ["Hello"]}]})[0] == 400
+    assert request(service, "/export-template", {"html": "<p>Hello</p>", "locales": ["fr"],
+                                                 "translations": {"fr": "x"}})[0] == 400
+    assert request(service, "/export-template", {"html": "<p>Hello</p>", "locales": ["fr", 1]})[0] == 400
+    assert request(service, "/export-template", {"html": "<p>Hello</p>", "sheet_name": 1})[0] == 400
+
+
+def test_header_too_long():
+    async def run(head):
+        reader = asyncio.StreamReader(limit=64)
+        reader.feed_data(head)
+        reader.feed_eof()
+        with pytest.raises(HTTPError) as error:
+            await read_request(reader)
+        return error.value.status
+
+    assert asyncio.run(run(b"POST /generate HTTP/1.1\r\nX-Long: " + b"a" * 100 + b"\r\n\r\n")) == 400
+    assert asyncio.run(run(b"POST /" + b"a" * 100 + b" HTTP/1.1\r\n\r\n")) == 400
+
+
+def test_export_template(service):
+    status, headers, body = request(service, "/export-template",
+                                    {"html": "<p>Hello</p>", "name": 'Avis "final"\r\nSet-Cookie: x=1'})
+    assert status == 200
+    assert body.startswith(b"PK")  # .xlsx is a zip file
+    assert "Set-Cookie" not in headers
+    assert headers["Content-Disposition"] == (
+        "attachment; filename=\"Avis finalSet-Cookie: x=1.xlsx\"; "
+        "filename*=UTF-8''Avis%20finalSet-Cookie%3A%20x%3D1.xlsx")
+
+    status, headers, body = request(service, "/import-template", body)
+    assert status == 200
+    assert json.loads(body) == {"translations": {"": {"Hello": ""}}}
+
+
+def test_content_disposition():
+    assert content_disposition("Notification.xlsx") == \
+        "attachment; filename=\"Notification.xlsx\"; filename*=UTF-8''Notification.xlsx"
+    assert content_disposition("Avis été.xlsx") == \
+        "attachment; filename=\"Avis ?t?.xlsx\"; filename*=UTF-8''Avis%20%C3%A9t%C3%A9.xlsx"
+    assert content_disposition('../"\x00\r\n') == \
+        "attachment; filename=\"..\"; filename*=UTF-8''.."
+    assert content_disposition("\r\n") == \
+        "attachment; filename=\"Notification.xlsx\"; filename*=UTF-8''Notification.xlsx"
+
+
+def test_run_batch_status():
+    def task(item):
+        if item == "invalid":
+            raise ValueError("invalid html")
+        if item == "bug":
+            raise RuntimeError("bug")
+        return item.upper()
+
+    assert run_batch(task, ["ok", "invalid", "bug"]) == [
+        (200, "OK"), (400, "ValueError: invalid html"), (500, "RuntimeError: bug")]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="SIGTERM terminates the process on Windows")
+def test_sigterm_stops_service():
+    folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, "ILX_translator_service.py", "--port", "0", "--workers", "1"],
+                               cwd=folder, stderr=subprocess.PIPE, text=True)
+    try:
+        port = int(process.stderr.readline().rsplit(":", 1)[1])  # Serving on http://127.0.0.1:<port>
+        with urlopen(Request(f"http://127.0.0.1:{port}/extract", b'{"html": "<p>a</p>"}', method="POST")) as response:
+            assert json.loads(response.read()) == {"lines": ["a"]}  # The worker process is started
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
+        assert "Stopping" in process.stderr.read()
+    finally:
+        process.kill()
+        process.wait()
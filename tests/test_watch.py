@@ -0,0 +1,113 @@
+"""
+Processing new, changed, removed and unreadable files of the watch folder
+"""
+from ILX_translator_excel import write_translation_template
+from ILX_translator_watch import FolderWatcher
+import os
+import pytest
+
+
+def touch(path, seconds):
+    """
+    Moves the modification time, a rewrite within the same clock tick would not be seen as a change
+    """
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + seconds))
+
+
+def process(watcher):
+    """
+    :return: Number of generated translations. The first scan marks the changes as pending (settle = 0).
+    """
+    watcher.settled_changes()
+    return watcher.poll()
+
+
+@pytest.fixture
+def folders(tmp_path):
+    watch_folder, output_folder = tmp_path / "watch", tmp_path / "output"
+    watch_folder.mkdir()
+    return watch_folder, output_folder
+
+
+@pytest.fixture
+def watcher(folders):
+    watcher = FolderWatcher(str(folders[0]), str(folders[1]), settle=0, workers=1)
+    yield watcher
+    watcher.close()
+
+
+def read_output(folders, name):
+    return (folders[1] / name).read_text(encoding="utf-8")
+
+
+def test_new_html_and_template(watcher, folders):
+    watch_folder, output_folder = folders
+    write_translation_template(str(watch_folder / "rec-1_fr-FR.xlsx"), {"Hello": "Bonjour"})
+    assert process(watcher) == 0  # Waiting for the English html
+    (watch_folder / "rec-1.htm").write_text("<p>Hello</p><p>World</p>", encoding="utf-8")
+    assert process(watcher) == 1
+    assert read_output(folders, "rec-1_fr-FR.html") == "<p>Bonjour</p><p></p>"  # Missing lines are emptied
+    assert watcher.results[("rec-1", "fr-FR")].missing_lines == ["World"]
+    assert (output_folder / "import.xlsx").exists()
+    assert process(watcher) == 0  # Nothing changed
+
+
+def test_changed_template(watcher, folders):
+    watch_folder = folders[0]
+    (watch_folder / "rec-1.htm").write_text("<p>Hello</p>", encoding="utf-8")
+    template = watch_folder / "rec-1_fr-FR.xlsx"
+    write_translation_template(str(template), {"Hello": "Bonjour"})
+    assert process(watcher) == 1
+    write_translation_template(str(template), {"Hello": "Salut"})
+    touch(template, 10)
+    assert process(watcher) == 1
+    assert read_output(folders, "rec-1_fr-FR.html") == "<p>Salut</p>"
+
+
+def test_removed_files(watcher, folders):
+    watch_folder = folders[0]
+    html = watch_folder / "rec-1.htm"
+    html.write_text("<p>Hello</p>", encoding="utf-8")
+    template = watch_folder / "rec-1_fr-FR.xlsx"
+    write_translation_template(str(template), {"Hello": "Bonjour"})
+    assert process(watcher) == 1
+    template.unlink()
+    assert process(watcher) == 0
+    assert watcher.templates == {} and watcher.results == {}
+    html.unlink()
+    process(watcher)
+    assert watcher.html_files == {} and watcher.signatures == {}
+
+
+def test_unreadable_file_is_not_retried_until_changed(watcher, folders, caplog):
+    watch_folder = folders[0]
+    (watch_folder / "rec-1.htm").write_text("<p>Hello</p>", encoding="utf-8")
+    template = watch_folder / "rec-1_fr-FR.xlsx"
+    template.write_bytes(b"Not a workbook")
+    assert process(watcher) == 0
+    assert "Could not read rec-1_fr-FR.xlsx" in caplog.text
+    caplog.clear()
+    assert process(watcher) == 0
+    assert "Could not read" not in caplog.text  # Same version of the file, not read again
+
+    write_translation_template(str(template), {"Hello": "Bonjour"})
+    touch(template, 10)
+    assert process(watcher) == 1
+    assert watcher.failed == {}
+
+
+def test_html_which_is_not_utf8(watcher, folders):
+    watch_folder = folders[0]
+    (watch_folder / "rec-1.htm").write_bytes("<p>Hello</p><p>Café</p>".encode("cp1252"))
+    write_translation_template(str(watch_folder / "rec-1_fr-FR.xlsx"), {"Hello": "Bonjour"})
+    assert process(watcher) == 1
+    assert read_output(folders, "rec-1_fr-FR.html").startswith("<p>Bonjour</p>")
+
+
+def test_output_folder_in_watch_folder(folders):
+    watch_folder = folders[0]
+    with pytest.raises(ValueError):
+        FolderWatcher(str(watch_folder), str(watch_folder))
+    with pytest.raises(ValueError):
+        FolderWatcher(str(watch_folder), str(watch_folder / "output"))
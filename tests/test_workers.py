@@ -0,0 +1,87 @@
+"""
+Background tasks of the main window: importing a template in chunks, cancelled and replaced tasks
+"""
+from ILX_translator_memory import TranslationMemory
+import threading
+import pytest
+
+
+@pytest.fixture
+def window(app):
+    from ILX_translator_functions import MyMainWindow
+    window = MyMainWindow()
+    window._translation_memory = TranslationMemory(":memory:")
+    yield window
+    window.cancel_workers()
+    window.thread_pool.waitForDone()
+    app.processEvents()
+    window._translation_memory.close()
+    window.deleteLater()
+
+
+def wait_for(app, window, name):
+    window.thread_pool.waitForDone()
+    while name in window.workers:
+        app.processEvents()
+
+
+def import_rows(worker, rows, cancel=False):
+    worker.report_partial(rows)
+    if cancel:
+        worker.cancel()
+        worker.check_cancelled()
+    return len(rows)
+
+
+def start_import(window, *args):
+    window.import_backup = (window.lineEdit_locale.text(), list(window.translation_model.locales),
+                            [list(row) for row in window.translation_model.rows])
+    window.clear_translation_rows()
+    return window.start_worker("import", "Importing", import_rows, *args,
+                               partial=window.translation_model.append_rows, aborted=window.restore_import_backup)
+
+
+def test_import_appends_rows(app, window):
+    start_import(window, [["Hello", "Bonjour"], ["World", "Monde"]])
+    wait_for(app, window, "import")
+    assert window.translation_model.rows == [["Hello", "Bonjour"], ["World", "Monde"]]
+
+
+def test_cancelled_import_restores_the_rows(app, window):
+    window.lineEdit_locale.setText("de-DE")
+    window.translation_model.set_rows([["Hello", "Hallo"]])
+    start_import(window, [["Partial", "Partiel"]], True)
+    wait_for(app, window, "import")
+    assert window.translation_model.rows == [["Hello", "Hallo"]]
+    assert window.lineEdit_locale.text() == "de-DE"
+    assert window.statusbar.currentMessage() == "Importing: cancelled"
+
+
+def test_replaced_worker_is_ignored(app, window):
+    results = []
+    window.start_worker("import", "Old import", lambda worker: "old", finished=results.append,
+                        aborted=lambda: results.append("aborted"))
+    window.thread_pool.waitForDone()  # Finished, but its signals are still queued
+    release = threading.Event()
+    window.start_worker("import", "New import", lambda worker: release.wait(5) and "new", finished=results.append)
+    app.processEvents()
+    assert results == []  # The replaced import neither finishes nor restores the rows
+    assert window.statusbar.currentMessage() == "New import..."
+    release.set()
+    wait_for(app, window, "import")
+    assert results == ["new"]
+
+
+def test_detached_import_does_not_restore_the_rows(app, window):
+    window.translation_model.set_rows([["Hello", "Hallo"]])
+    release = threading.Event()
+    window.import_backup = ("", [], [["Hello", "Hallo"]])
+    window.start_worker("import", "Importing", lambda worker: release.wait(5) and worker.check_cancelled(),
+                        aborted=window.restore_import_backup)
+    window.detach_worker("import")  # E.g. a project is opened
+    window.translation_model.set_rows([["Project", "Projet"]])
+    release.set()
+    window.thread_pool.waitForDone()
+    app.processEvents()
+    assert window.translation_model.rows == [["Project", "Projet"]]
+    assert "import" not in window.workers